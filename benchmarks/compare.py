@@ -0,0 +1,65 @@
+"""
+Compara dos archivos de resultados de `run.py` (p. ej. de dos commits) etapa por etapa.
+
+Uso:
+    python benchmarks/compare.py base.json nuevo.json --umbral 1.2
+
+Termina con código 1 si alguna etapa es más lenta que `umbral` veces la base (o su pico de
+memoria o su latencia p99 crecen en esa proporción), para usarlo en integración continua.
+"""
+import argparse
+import json
+import sys
+
+METRICAS = ['segundos', 'pico_memoria_mb', 'p99_ms']
+
+
+def clave(resultado):
+    return resultado['etapa'], resultado.get('modelo') or resultado.get('modulo'), resultado['escala']
+
+
+def comparar(base, nuevo, umbral=1.2):
+    """
+    Retorna una fila por (etapa, modelo, escala, métrica) presente en ambos archivos, con la razón
+    nuevo/base y si supera el umbral.
+    """
+    base = {clave(r): r for r in base['resultados']}
+    filas = []
+    for resultado in nuevo['resultados']:
+        anterior = base.get(clave(resultado))
+        if anterior is None:
+            continue
+        # La etapa de importación se identifica por módulo en lugar de por modelo
+        nombre = resultado.get('modelo') or resultado.get('modulo')
+        for metrica in METRICAS:
+            if metrica in resultado and anterior.get(metrica):
+                razon = resultado[metrica] / anterior[metrica]
+                filas.append({'etapa': resultado['etapa'], 'modelo': nombre,
+                              'escala': resultado['escala'], 'metrica': metrica, 'base': anterior[metrica],
+                              'nuevo': resultado[metrica], 'razon': razon, 'regresion': razon > umbral})
+    return filas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara dos ejecuciones de los benchmarks')
+    parser.add_argument('base')
+    parser.add_argument('nuevo')
+    parser.add_argument('--umbral', type=float, default=1.2, help='Razón nuevo/base considerada regresión')
+    parser.add_argument('--json', action='store_true', help='Imprimir la comparación en JSON')
+    args = parser.parse_args()
+
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.nuevo, encoding='utf-8') as f:
+        nuevo = json.load(f)
+    filas = comparar(base, nuevo, args.umbral)
+
+    if args.json:
+        print(json.dumps(filas, indent=2))
+    else:
+        print(f"base: {base['metadatos']['commit']}  nuevo: {nuevo['metadatos']['commit']}")
+        for fila in filas:
+            marca = '  <-- regresión' if fila['regresion'] else ''
+            print(f"{fila['etapa']:<32}{fila['modelo'] or '':<20}{fila['escala']:>6g}x {fila['metrica']:<16}"
+                  f"{fila['base']:>12.4g}{fila['nuevo']:>12.4g}{fila['razon']:>8.2f}{marca}")
+    sys.exit(1 if any(fila['regresion'] for fila in filas) else 0)
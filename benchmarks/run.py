@@ -0,0 +1,238 @@
+"""
+Benchmarks de cada etapa del proyecto con datos sintéticos a varias escalas.
+
+Etapas:
+- parseo: `limpiar_datos_fincaraiz` y `extraer_detalles_completos` sobre una respuesta de la API.
+- limpieza: `limpiar_datos` sobre los datos crudos.
+- preprocesamiento: ajuste y transformación del ColumnTransformer compartido.
+- modelos: entrenamiento y predicción de la regresión lineal, el Random Forest y la red neuronal.
+- inferencia: latencia de una fila (p50/p99) y throughput por lotes del modelo completo.
+- importacion: tiempo de importar cada módulo en un intérprete nuevo y librerías pesadas que carga
+  (no depende de la escala, se mide una vez).
+
+Para cada etapa se registran el tiempo de reloj y de CPU (mínimo de las repeticiones), las filas
+por segundo y el pico de memoria de Python medido con tracemalloc en una ejecución aparte. Los
+resultados se guardan en JSON junto con el commit y las versiones de las librerías, para comparar
+ejecuciones con `compare.py`.
+
+Uso:
+    python benchmarks/run.py --escalas 1 10 --salida benchmarks/results/base.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# synthetic agrega la raíz del proyecto al path de importación
+from synthetic import RAIZ, generar_crudo, generar_datos_modelo, generar_respuesta_api
+
+from src.data_collection import iterar_detalles_completos, limpiar_datos_fincaraiz
+from src.models.dataset import TARGET, build_preprocessor, split_data
+from src.preprocessing import limpiar_datos
+
+ETAPAS = ['parseo', 'limpieza', 'preprocesamiento', 'modelos', 'inferencia', 'importacion']
+MODELOS = ['linear_regression', 'random_forest', 'neural_network']
+
+# Módulos cuya importación se mide; la de los modelos lineal y Random Forest debe quedar en decenas
+# de milisegundos porque no carga scikit-learn, pandas, TensorFlow ni matplotlib
+MODULOS_IMPORTACION = ['src.models.linear_regression', 'src.models.random_forest', 'src.models.neural_network',
+                       'src.models.registry', 'src.data_collection', 'src.preprocessing']
+LIBRERIAS_PESADAS = ['numpy', 'pandas', 'sklearn', 'scipy', 'tensorflow', 'matplotlib', 'seaborn', 'textblob']
+FECHA_REFERENCIA = datetime.datetime(2025, 10, 1)
+
+# Filas del conjunto real (escala 1x)
+FILAS_BASE = 21_388
+
+
+def medir(funcion, repeticiones=1, memoria=True):
+    """
+    Ejecuta `funcion` y mide tiempo de reloj, tiempo de CPU y pico de memoria.
+
+    Retorna:
+    - tuple: (resultado de la última ejecución, dict con las medidas)
+    """
+    segundos, cpu = [], []
+    for _ in range(repeticiones):
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        resultado = funcion()
+        segundos.append(time.perf_counter() - inicio)
+        cpu.append(time.process_time() - inicio_cpu)
+    medidas = {'segundos': min(segundos), 'cpu_segundos': min(cpu)}
+    if memoria:
+        # tracemalloc hace más lenta la ejecución, por eso la memoria se mide en una ejecución aparte
+        tracemalloc.start()
+        funcion()
+        medidas['pico_memoria_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return resultado, medidas
+
+
+def metadatos():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = None
+    versiones = {}
+    for libreria in ('numpy', 'pandas', 'sklearn', 'pyarrow', 'tensorflow'):
+        try:
+            versiones[libreria] = __import__(libreria).__version__
+        except ImportError:
+            versiones[libreria] = None
+    return {
+        'commit': commit,
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'versiones': versiones,
+    }
+
+
+def tiempo_importacion(modulo, repeticiones=5):
+    """
+    Importa `modulo` en un intérprete nuevo (sin el costo de arranque de Python).
+
+    Retorna:
+    - dict: Segundos (mínimo de las repeticiones) y librerías pesadas que quedaron importadas.
+    """
+    codigo = (f"import sys, time; inicio = time.perf_counter(); import {modulo}; "
+              f"print(time.perf_counter() - inicio); "
+              f"print(','.join(l for l in {LIBRERIAS_PESADAS!r} if l in sys.modules))")
+    segundos = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True,
+                                check=True).stdout.splitlines()
+        segundos.append(float(salida[0]))
+    return {'segundos': min(segundos), 'librerias_pesadas': [l for l in salida[1].split(',') if l]}
+
+
+def ajustar_modelo(nombre, X, y, epocas_nn):
+    if nombre == 'linear_regression':
+        from src.models.linear_regression import build_linear_regression
+        return build_linear_regression().fit(X, y)
+    if nombre == 'random_forest':
+        from src.models.random_forest import build_random_forest
+        return build_random_forest().fit(X, y)
+    from src.models.neural_network import fit_neural_network
+    return fit_neural_network(X, y, max_epochs=epocas_nn)[0]
+
+
+def predecir(nombre, modelo, X):
+    if nombre == 'neural_network':
+        return modelo.predict(X, verbose=0).ravel()
+    return modelo.predict(X)
+
+
+def latencias_una_fila(funcion, filas, n=100):
+    # Latencia de predicciones de una fila, en milisegundos
+    tiempos = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        funcion(filas.iloc[[i % len(filas)]])
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {'p50_ms': float(np.percentile(tiempos, 50)), 'p99_ms': float(np.percentile(tiempos, 99))}
+
+
+def ejecutar(escalas, etapas=ETAPAS, modelos=MODELOS, filas_base=FILAS_BASE, repeticiones=1, memoria=True,
+             epocas_nn=2, llamadas_una_fila=100, semilla=0):
+    """
+    Corre las etapas pedidas en cada escala y retorna la lista de resultados (un dict por etapa).
+    """
+    resultados = []
+
+    def registrar(etapa, escala, filas, medidas, **extra):
+        resultado = {'etapa': etapa, 'escala': escala, 'filas': filas, **extra, **medidas}
+        if medidas.get('segundos'):
+            resultado['filas_por_segundo'] = filas / medidas['segundos']
+        resultados.append(resultado)
+        print(json.dumps(resultado, default=float), flush=True)
+
+    if 'importacion' in etapas:
+        for modulo in MODULOS_IMPORTACION:
+            resultado = {'etapa': 'importacion', 'escala': 1, 'filas': 0, 'modulo': modulo,
+                         **tiempo_importacion(modulo, max(repeticiones, 3))}
+            resultados.append(resultado)
+            print(json.dumps(resultado), flush=True)
+
+    for escala in escalas:
+        filas = int(round(filas_base * escala))
+
+        if 'parseo' in etapas:
+            respuesta = generar_respuesta_api(filas, semilla)
+            _, medidas = medir(lambda: limpiar_datos_fincaraiz(respuesta), repeticiones, memoria)
+            registrar('parseo_resumen', escala, filas, medidas)
+            _, medidas = medir(lambda: list(iterar_detalles_completos(respuesta)), repeticiones, memoria)
+            registrar('parseo_detalle', escala, filas, medidas)
+            del respuesta
+
+        if 'limpieza' in etapas:
+            crudo = generar_crudo(filas, semilla)
+            _, medidas = medir(lambda: limpiar_datos(crudo.copy(), fecha_referencia=FECHA_REFERENCIA),
+                               repeticiones, memoria)
+            registrar('limpieza', escala, filas, medidas)
+            del crudo
+
+        if not {'preprocesamiento', 'modelos', 'inferencia'} & set(etapas):
+            continue
+
+        df = generar_datos_modelo(filas, semilla)
+        df[TARGET] = np.log1p(df.pop('precio'))
+        X_train, X_test, y_train, y_test = split_data(df)
+        preprocesador, medidas = medir(lambda: build_preprocessor(df).fit(X_train, y_train), repeticiones, memoria)
+        if 'preprocesamiento' in etapas:
+            registrar('preprocesamiento_ajuste', escala, len(X_train), medidas)
+        X_train_t, medidas = medir(lambda: preprocesador.transform(X_train), repeticiones, memoria)
+        X_test_t = preprocesador.transform(X_test)
+        if 'preprocesamiento' in etapas:
+            registrar('preprocesamiento_transformacion', escala, len(X_train), medidas)
+
+        for nombre in modelos:
+            y = y_train.to_numpy()
+            modelo, medidas = medir(lambda: ajustar_modelo(nombre, X_train_t, y, epocas_nn), 1,
+                                    memoria and nombre != 'neural_network')
+            if 'modelos' in etapas:
+                registrar('ajuste', escala, len(X_train_t), medidas, modelo=nombre)
+                _, medidas = medir(lambda: predecir(nombre, modelo, X_test_t), repeticiones, memoria)
+                registrar('prediccion', escala, len(X_test_t), medidas, modelo=nombre)
+
+            if 'inferencia' in etapas:
+                def completo(X):
+                    return predecir(nombre, modelo, preprocesador.transform(X))
+                latencias = latencias_una_fila(completo, X_test, llamadas_una_fila)
+                registrar('inferencia_una_fila', escala, 1, {}, modelo=nombre, **latencias)
+                _, medidas = medir(lambda: completo(X_test), repeticiones, False)
+                registrar('inferencia_lote', escala, len(X_test), medidas, modelo=nombre)
+
+    return resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks de las etapas del proyecto con datos sintéticos')
+    parser.add_argument('--escalas', type=float, nargs='+', default=[1], help='Múltiplos del tamaño real (1 a 100)')
+    parser.add_argument('--etapas', nargs='+', default=ETAPAS, choices=ETAPAS)
+    parser.add_argument('--modelos', nargs='+', default=MODELOS, choices=MODELOS)
+    parser.add_argument('--filas-base', type=int, default=FILAS_BASE, help='Filas de la escala 1x')
+    parser.add_argument('--repeticiones', type=int, default=1)
+    parser.add_argument('--sin-memoria', action='store_true', help='No medir memoria con tracemalloc')
+    parser.add_argument('--epocas-nn', type=int, default=2, help='Épocas de la red en el benchmark')
+    parser.add_argument('--llamadas-una-fila', type=int, default=100, help='Predicciones para medir la latencia')
+    parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto benchmarks/results/)')
+    args = parser.parse_args()
+
+    informe = {'metadatos': metadatos(), 'parametros': vars(args)}
+    informe['resultados'] = ejecutar(args.escalas, args.etapas, args.modelos, args.filas_base, args.repeticiones,
+                                     not args.sin_memoria, args.epocas_nn, args.llamadas_una_fila)
+    salida = args.salida or RAIZ / 'benchmarks' / 'results' / \
+        f"{informe['metadatos']['fecha'].replace(':', '')}-{informe['metadatos']['commit']}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, default=float)
+    print(f"Resultados guardados en {salida}")
@@ -0,0 +1,116 @@
+"""
+Generadores de datos sintéticos para los benchmarks.
+
+- `generar_respuesta_api`: respuesta JSON de la API de FincaRaíz (`hits.hits[]._source.listing`),
+  la que consumen `limpiar_datos_fincaraiz` y `extraer_detalles_completos`.
+- `generar_crudo`: DataFrame con el formato de `propiedades_fincaraiz_completas.csv` (entrada de la
+  limpieza), leído de vuelta desde CSV como en la ejecución real.
+- `generar_datos_modelo`: DataFrame con el esquema de `data_arriendos_model.xlsx`, remuestreando las
+  filas del archivo real con ruido en coordenadas, área y precio.
+"""
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+from src.data_collection import CIUDADES, iterar_detalles_completos  # noqa: E402
+from src.models.dataset import DATA_PATH, TARGET, load_data  # noqa: E402
+from src.preprocessing import CATEGORIAS_FACILIDADES  # noqa: E402
+
+PALABRAS = ("hermoso apartamento amplio cerca del metro con vigilancia vista panorámica remodelado moderno "
+            "exclusivo penthouse de lujo buses vía principal acogedor luminoso para estrenar amoblado gran "
+            "vista casa bonita piscina gimnasio balcón parqueadero cubierto zona social").split()
+FACILIDADES = [facilidad for grupo in CATEGORIAS_FACILIDADES.values() for facilidad in grupo] + ["Chimenea"]
+TIPOS = ["Apartamento", "Casa", "Apartaestudio"]
+ANTIGUEDADES = ["menor a 1 año", "1 a 8 años", "9 a 15 años", "16 a 30 años", "más de 30 años"]
+
+
+def generar_listing(rng, i):
+    """
+    Genera un inmueble con la estructura de `_source.listing` de la API.
+    """
+    area = rng.integers(20, 400)
+    return {
+        "id": f"sintetico-{i}",
+        "title": "Apartamento en arriendo",
+        "description": " ".join(rng.choice(PALABRAS, size=rng.integers(5, 60))),
+        "address": f"Calle {rng.integers(1, 120)} # {rng.integers(1, 99)}-{rng.integers(1, 99)}",
+        "locations": {
+            "city": [{"name": str(rng.choice(CIUDADES))}],
+            "state": [{"name": "Antioquia"}],
+            "neighbourhood": [{"name": f"Barrio {rng.integers(1, 300)}"}],
+            "zone": [{"name": str(rng.choice(["Sur", "Norte", "Centro", "Occidente"]))}],
+            "commune": [{"name": f"Comuna {rng.integers(1, 16)}"}],
+        },
+        "latitude": float(6.15 + rng.random() * 0.2),
+        "longitude": float(-75.65 + rng.random() * 0.12),
+        "price": {"amount": int(rng.integers(8, 120)) * 100_000, "currency": {"name": "COP"}},
+        "technicalSheet": [
+            {"value": "x"},
+            {"value": str(rng.choice(TIPOS))},
+            {"value": str(rng.choice(["Usado", "Remodelado", "Nuevo"]))},
+            {"value": "x"},
+            {"value": f"{area} m2"},
+            {"value": f"{area - rng.integers(0, 10)} m2"},
+            {"value": str(rng.choice(ANTIGUEDADES))},
+        ],
+        "bedrooms": int(rng.integers(0, 6)),
+        "bathrooms": int(rng.integers(0, 5)),
+        "stratum": int(rng.integers(1, 7)),
+        "floorsCount": int(rng.integers(1, 30)),
+        "floor": int(rng.integers(1, 30)),
+        "garage": int(rng.integers(0, 3)),
+        "m2": int(area),
+        "commonExpenses": {"amount": int(rng.integers(0, 900)) * 1000},
+        "images": [{"image": f"https://img.example/{i}/{j}.jpg"} for j in range(rng.integers(0, 12))],
+        "link": f"/apartamento-en-arriendo/{i}",
+        "created_at": "2025-01-01T00:00:00",
+        "updated_at": f"2025-{rng.integers(1, 10):02d}-{rng.integers(1, 29):02d}T10:00:00",
+        "facilities": [{"name": f} for f in rng.choice(FACILIDADES, size=rng.integers(0, 12), replace=False)],
+        "socialMediaLinks": [],
+    }
+
+
+def generar_respuesta_api(n, semilla=0):
+    """
+    Respuesta de la API con `n` inmuebles.
+    """
+    rng = np.random.default_rng(semilla)
+    return {"hits": {"hits": [{"_source": {"listing": generar_listing(rng, i)}} for i in range(n)]}}
+
+
+def generar_crudo(n, semilla=0):
+    """
+    Datos crudos de detalle (como `propiedades_fincaraiz_completas.csv`) para `n` inmuebles.
+    """
+    detalles = pd.DataFrame(iterar_detalles_completos(generar_respuesta_api(n, semilla)))
+    csv = detalles.to_csv(sep=';', index=False)
+    return pd.read_csv(io.StringIO(csv), sep=';')
+
+
+def generar_datos_modelo(n, semilla=0, referencia=DATA_PATH):
+    """
+    Datos con el esquema de `data_arriendos_model.xlsx` (incluida la columna `precio`).
+
+    Las filas se remuestrean con reemplazo del archivo de referencia, así que las categorías y las
+    distribuciones son las reales; coordenadas, áreas y precios llevan ruido para que las filas
+    repetidas no sean idénticas.
+    """
+    rng = np.random.default_rng(semilla)
+    base = load_data(referencia)
+    df = base.iloc[rng.integers(0, len(base), size=n)].reset_index(drop=True)
+    df['latitud'] = df['latitud'] + rng.normal(0, 0.002, n)
+    df['longitud'] = df['longitud'] + rng.normal(0, 0.002, n)
+    factor_area = rng.uniform(0.9, 1.1, n)
+    for columna in ('area_construida_m2', 'area_privada_m2'):
+        df[columna] = (df[columna] * factor_area).round()
+    df['precio'] = np.round(np.expm1(df[TARGET]) * rng.lognormal(0, 0.1, n), -3)
+    # Mismo orden de columnas del archivo de referencia
+    columnas = pd.read_excel(referencia, nrows=0).columns if str(referencia).endswith('.xlsx') else None
+    df = df.drop(columns=[TARGET])
+    return df[list(columnas)] if columnas is not None else df
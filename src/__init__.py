@@ -0,0 +1,8 @@
+"""
+Predicción de precios de arriendo en el Valle de Aburrá.
+
+Importar el paquete o cualquiera de sus módulos no descarga datos, no entrena modelos ni abre
+ventanas: cada etapa se ejecuta desde su comando (`python -m src.data_collection`,
+`python -m src.preprocessing`, `python -m src.models.training`, ...). Las dependencias pesadas
+(TensorFlow, matplotlib, seaborn, TextBlob) se importan solo dentro de las funciones que las usan.
+"""
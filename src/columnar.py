@@ -0,0 +1,187 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Esquema de las propiedades de `limpiar_datos_fincaraiz`
+ESQUEMA_RESUMEN = pa.schema([
+    ("id", pa.string()),
+    ("titulo", pa.string()),
+    ("descripcion", pa.string()),
+    ("direccion", pa.string()),
+    ("ciudad", pa.string()),
+    ("estado", pa.string()),
+    ("barrio", pa.string()),
+    ("latitud", pa.float64()),
+    ("longitud", pa.float64()),
+    ("precio", pa.float64()),
+    ("moneda", pa.string()),
+    ("habitaciones", pa.int64()),
+    ("baños", pa.int64()),
+    ("parqueaderos", pa.int64()),
+    ("area_m2", pa.float64()),
+    ("imagenes", pa.list_(pa.string())),
+    ("url_anuncio", pa.string()),
+    ("fecha_actualizacion", pa.string()),
+])
+
+# Esquema de los detalles de `extraer_detalles_completos` (mismo orden que `CAMPOS_DETALLE`)
+ESQUEMA_DETALLE = pa.schema([
+    ("id", pa.string()),
+    ("titulo", pa.string()),
+    ("descripcion", pa.string()),
+    ("direccion", pa.string()),
+    ("ciudad", pa.string()),
+    ("departamento", pa.string()),
+    ("barrio", pa.string()),
+    ("Zona", pa.string()),
+    ("Comuna", pa.string()),
+    ("latitud", pa.float64()),
+    ("longitud", pa.float64()),
+    ("precio", pa.float64()),
+    ("moneda", pa.string()),
+    ("tipo_de_inmueble", pa.string()),
+    ("estado", pa.string()),
+    ("habitaciones", pa.int64()),
+    ("baños", pa.int64()),
+    ("area_construida_m2", pa.string()),
+    ("area_privada_m2", pa.string()),
+    ("estrato", pa.int64()),
+    ("pisos_edificio", pa.int64()),
+    ("piso_ubicacion", pa.int64()),
+    ("parqueaderos", pa.int64()),
+    ("antigüedad", pa.string()),
+    ("gastos_comunes", pa.float64()),
+    ("imagenes", pa.list_(pa.string())),
+    ("url_anuncio", pa.string()),
+    ("propietario", pa.string()),
+    ("telefono", pa.string()),
+    ("tipo_propietario", pa.string()),
+    ("direccion_propietario", pa.string()),
+    ("fecha_publicacion", pa.string()),
+    ("fecha_actualizacion", pa.string()),
+    ("facilidades", pa.list_(pa.string())),
+    ("video", pa.string()),
+    ("redes_sociales", pa.map_(pa.string(), pa.string())),
+])
+
+
+def convertir_valor(valor, tipo):
+    """
+    Convierte un valor de la API al tipo de la columna. Los valores que no se pueden convertir
+    (p. ej. "No disponible" en una columna numérica) quedan como nulos.
+    """
+    if valor is None:
+        return None
+    try:
+        if pa.types.is_integer(tipo):
+            return int(float(valor))
+        if pa.types.is_floating(tipo):
+            return float(valor)
+    except (TypeError, ValueError):
+        return None
+    if pa.types.is_map(tipo):
+        return [(str(llave), None if v is None else str(v)) for llave, v in valor.items()] if isinstance(valor, dict) else None
+    if pa.types.is_list(tipo):
+        return [str(elemento) for elemento in valor if elemento is not None] if isinstance(valor, list) else None
+    return str(valor)
+
+
+class EscritorColumnar:
+    """
+    Escribe registros (dict) en un archivo Parquet en grupos de filas de tamaño fijo.
+
+    Solo se mantiene en memoria el grupo de filas en construcción, así que la memoria no depende del
+    número total de registros. Las listas y diccionarios se guardan con tipos list/map de Arrow, por
+    lo que los lectores pueden cargar solo las columnas que necesitan.
+
+    Parámetros:
+    - ruta (str): Ruta del archivo Parquet.
+    - esquema (pa.Schema): Esquema de las columnas (`ESQUEMA_RESUMEN` o `ESQUEMA_DETALLE`).
+    - filas_por_grupo (int): Número de filas de cada grupo.
+    """
+
+    def __init__(self, ruta, esquema, filas_por_grupo=50_000):
+        self.ruta = ruta
+        self.esquema = esquema
+        self.filas_por_grupo = filas_por_grupo
+        self.filas_escritas = 0
+        self._columnas = {campo.name: [] for campo in esquema}
+        self._escritor = pq.ParquetWriter(ruta, esquema, compression="zstd")
+
+    def escribir(self, registro):
+        for campo in self.esquema:
+            self._columnas[campo.name].append(convertir_valor(registro.get(campo.name), campo.type))
+        if len(self._columnas[self.esquema[0].name]) >= self.filas_por_grupo:
+            self.vaciar()
+
+    def escribir_todos(self, registros):
+        for registro in registros:
+            self.escribir(registro)
+        return self
+
+    def vaciar(self):
+        filas = len(self._columnas[self.esquema[0].name])
+        if not filas:
+            return
+        tabla = pa.Table.from_pydict(self._columnas, schema=self.esquema)
+        self._escritor.write_table(tabla, row_group_size=filas)
+        self.filas_escritas += filas
+        self._columnas = {campo.name: [] for campo in self.esquema}
+
+    def cerrar(self):
+        self.vaciar()
+        self._escritor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+
+def escribir_parquet(registros, ruta, esquema, filas_por_grupo=50_000):
+    """
+    Consume un iterable de registros y lo escribe en Parquet por grupos de filas.
+
+    Parámetros:
+    - registros (iterable[dict]): Registros a escribir (p. ej. un generador).
+    - ruta (str): Ruta del archivo Parquet.
+    - esquema (pa.Schema): Esquema de las columnas.
+    - filas_por_grupo (int): Número de filas de cada grupo.
+
+    Retorna:
+    - int: Número de filas escritas.
+    """
+    with EscritorColumnar(ruta, esquema, filas_por_grupo) as escritor:
+        escritor.escribir_todos(registros)
+    return escritor.filas_escritas
+
+
+def iterar_lotes_parquet(ruta, columnas=None, filas_por_lote=50_000):
+    """
+    Lee un archivo Parquet por lotes como DataFrames, cargando solo las columnas pedidas.
+
+    Las columnas list/map se convierten a listas y diccionarios de Python, igual que los registros
+    originales.
+    """
+    archivo = pq.ParquetFile(ruta)
+    for lote in archivo.iter_batches(batch_size=filas_por_lote, columns=columnas):
+        datos = lote.to_pydict()
+        for campo in lote.schema:
+            if pa.types.is_map(campo.type):
+                datos[campo.name] = [None if valor is None else dict(valor) for valor in datos[campo.name]]
+        yield pd.DataFrame(datos)
+
+
+def exportar_csv_por_lotes(ruta_parquet, ruta_csv, filas_por_lote=50_000, **kwargs_csv):
+    """
+    Convierte un archivo Parquet al CSV anterior por lotes, sin cargarlo completo en memoria.
+
+    Parámetros:
+    - ruta_parquet (str): Archivo Parquet de origen.
+    - ruta_csv (str): Archivo CSV de destino.
+    - filas_por_lote (int): Filas leídas en cada lote.
+    - **kwargs_csv: Argumentos de `DataFrame.to_csv` (p. ej. `sep`, `encoding`).
+    """
+    for i, lote in enumerate(iterar_lotes_parquet(ruta_parquet, filas_por_lote=filas_por_lote)):
+        lote.to_csv(ruta_csv, mode='w' if i == 0 else 'a', header=i == 0, index=False, **kwargs_csv)
@@ -1,17 +1,62 @@
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from urllib.parse import urlsplit
+
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def limpiar_datos_fincaraiz(data):
+from .instrumentation import contar, medir
+from .rutas import DIR_DATOS_CRUDOS
+
+# URL de la API de Fincaraiz
+URL_BUSQUEDA = "https://search-service.fincaraiz.com.co/api/v1/properties/search"
+
+# Definir las ciudades, sus coordenadas y sus IDs
+CIUDADES = ["Medellín", "Sabaneta", "Envigado", "Itagüí", "Bello", "La estrella", "Caldas", "Copacabana", "Girardota", "Barbosa"]
+COORDENADAS_CIUDADES = {
+    "Medellín": [-75.57786065131165, 6.249816589298594],
+    "Sabaneta": [-75.615552, 6.150848],
+    "Envigado": [-75.582766,6.166891],
+    "Itagüí": [-75.61224929212936,6.175069444446771],
+    "Bello": [-75.554813,6.333991],
+    "La estrella": [-75.637076,6.145162],
+    "Caldas": [-75.63279850494914,6.092031757719933],
+    "Copacabana": [-75.509309,6.348654],
+    "Girardota": [-75.444235,6.379487],
+    "Barbosa": [-75.331627,6.439195]
+}
+IDS_CIUDADES = {"Medellín": "183f0a11-9452-4160-9089-1b0e7ed45863","Sabaneta": "241a17ef-3aa0-485c-93aa-689fc2f2d114",
+                "Envigado": "596f30cb-3582-416e-a071-71634190a703","Itagüí": "cf5dc27a-9e05-4b0a-b98a-0715fe4e5d2b",
+                "Bello": "9feb0402-fc35-4538-8ca1-d53c0fec2c35","La estrella": "c19b4e81-f003-408a-b7db-4bbcb9b3b6d5",
+                "Caldas": "5499b608-1002-43a3-9215-01c40ffae22b","Copacabana": "b8f0f380-18c4-49ee-a6b3-92b454846718",
+                "Girardota": "0affff3e-ec6a-421e-a2d4-8b198493cff9","Barbosa": "1041113c-cced-48fc-a1d5-c10002214f67"}
+
+# Número máximo de páginas a obtener por ciudad (20 propiedades por página)
+MAX_PAGINAS = 500
+
+# Códigos de estado que se reintentan con espera exponencial
+ESTADOS_REINTENTO = (429, 500, 502, 503, 504)
+# Errores de una respuesta 200 que no se puede interpretar (JSON mal formado, campos faltantes o
+# una ficha técnica más corta de lo esperado)
+ERRORES_PARSEO = (ValueError, KeyError, IndexError, TypeError)
+
+def iterar_datos_fincaraiz(data):
     """
-    Limpia y extrae la información relevante de la consulta a la API de FincaRaíz.
+    Versión generadora de `limpiar_datos_fincaraiz`: produce los inmuebles uno a uno.
 
     Parámetros:
     - data (dict): Respuesta en formato JSON obtenida desde la API.
 
-    Retorna:
-    - list[dict]: Lista de inmuebles con información clave.
+    Produce:
+    - dict: Inmueble con información clave.
     """
-    propiedades = []
 
     # Verificamos si existe la clave correcta para acceder a los inmuebles
     if "hits" in data and "hits" in data["hits"]:
@@ -35,14 +80,26 @@ def limpiar_datos_fincaraiz(data):
                 "parqueaderos": src.get("garage", 0),
                 "area_m2": src.get("m2", 0),
                 "imagenes": [img["image"] for img in src.get("images", []) if "image" in img],
-                "url_anuncio": f"https://www.fincaraiz.com.co{src.get('link', '')}"
+                "url_anuncio": f"https://www.fincaraiz.com.co{src.get('link', '')}",
+                "fecha_actualizacion": src.get("updated_at", "No disponible")
             }
 
-            propiedades.append(propiedad)
+            yield propiedad
 
-    return propiedades
 
 
+def limpiar_datos_fincaraiz(data):
+    """
+    Limpia y extrae la información relevante de la consulta a la API de FincaRaíz.
+
+    Parámetros:
+    - data (dict): Respuesta en formato JSON obtenida desde la API.
+
+    Retorna:
+    - list[dict]: Lista de inmuebles con información clave.
+    """
+    return list(iterar_datos_fincaraiz(data))
+
 
 def generar_payload(ciudad, coordenadas,id_ciudad,page):
     """
@@ -72,75 +129,285 @@ def generar_payload(ciudad, coordenadas,id_ciudad,page):
                                 }
     return payload
 
-def obtener_todas_las_propiedades():
-    # Inicializar variables
-    todas_las_propiedades = []
-    # URL de la API de Fincaraiz
-    url = "https://search-service.fincaraiz.com.co/api/v1/properties/search"
-    # Código de estado de la respuesta JSON
-    requests_json = 200
-    
-    # Definir las ciudades, sus coordenadas y sus IDs
-    ciudades = ["Medellín", "Sabaneta", "Envigado", "Itagüí", "Bello", "La estrella", "Caldas", "Copacabana", "Girardota", "Barbosa"]
-    coordenadas_ciudades = {
-        "Medellín": [-75.57786065131165, 6.249816589298594],
-        "Sabaneta": [-75.615552, 6.150848],
-        "Envigado": [-75.582766,6.166891],
-        "Itagüí": [-75.61224929212936,6.175069444446771],
-        "Bello": [-75.554813,6.333991],
-        "La estrella": [-75.637076,6.145162],
-        "Caldas": [-75.63279850494914,6.092031757719933],
-        "Copacabana": [-75.509309,6.348654],
-        "Girardota": [-75.444235,6.379487],
-        "Barbosa": [-75.331627,6.439195]
-    }
-    ids = {"Medellín": "183f0a11-9452-4160-9089-1b0e7ed45863","Sabaneta": "241a17ef-3aa0-485c-93aa-689fc2f2d114",
-           "Envigado": "596f30cb-3582-416e-a071-71634190a703","Itagüí": "cf5dc27a-9e05-4b0a-b98a-0715fe4e5d2b",
-           "Bello": "9feb0402-fc35-4538-8ca1-d53c0fec2c35","La estrella": "c19b4e81-f003-408a-b7db-4bbcb9b3b6d5",
-           "Caldas": "5499b608-1002-43a3-9215-01c40ffae22b","Copacabana": "b8f0f380-18c4-49ee-a6b3-92b454846718",
-           "Girardota": "0affff3e-ec6a-421e-a2d4-8b198493cff9","Barbosa": "1041113c-cced-48fc-a1d5-c10002214f67"}
-    
-    for ciudad in ciudades:
-        pagina = 1
-        while requests_json == 200 and pagina <= 500:  # Número máximo de páginas a obtener 500 # Mil propiedades por ciudad
-            coordenadas = coordenadas_ciudades.get(ciudad)
-            id_ciudad = ids.get(ciudad)
-            print(f"Obteniendo página {pagina} de la cuidad {ciudad}..")  # Para ver el progreso     
-
-            # Hacer la solicitud a la API
-            request_json = generar_payload(ciudad, coordenadas,id_ciudad,pagina)
-            response = requests.post(url, json=request_json)           
-            requests_json = response.status_code
-            if requests_json != 200:
-                print(f"Error al obtener datos para {ciudad}. Código de estado: {requests_json}")
-                break  # Si hay un error con el código de estado, terminamos el bucle
-            response_body = response.json()
-
-            # Extraer propiedades de la respuesta
-            propiedades = limpiar_datos_fincaraiz(response_body)
-            
-            # Si no hay más propiedades o no se obtienen datos, terminamos el bucle
-            if not propiedades:
-                print(f"No hay más propiedades para {ciudad} o los datos no están disponibles.")
-                break
-
-            # Agregar propiedades a la lista final
-            todas_las_propiedades.extend(propiedades)
-
-            # Pasar a la siguiente página
-            pagina += 1
-
-    return todas_las_propiedades
-
-# Llamar a la función para obtener todas las propiedades
-todas_propiedades = obtener_todas_las_propiedades()
-
-# Mostrar cuántas propiedades se obtuvieron
-print(f"Total de propiedades obtenidas: {len(todas_propiedades)}")
-
-#Guadar en un DataFrame
-todas_propiedades = pd.DataFrame(todas_propiedades)
-todas_propiedades.to_csv('../data/raw/propiedades_fincaraiz.csv' , index=False, encoding='utf-8')
+def crear_sesion(max_conexiones=16, reintentos=5, factor_espera=0.5):
+    """
+    Crea una sesión HTTP con un pool de conexiones reutilizables y reintentos automáticos.
+
+    Parámetros:
+    - max_conexiones (int): Tamaño del pool de conexiones por host.
+    - reintentos (int): Número máximo de reintentos ante errores 429/5xx o de conexión.
+    - factor_espera (float): Factor de la espera exponencial entre reintentos (respeta Retry-After).
+
+    Retorna:
+    - requests.Session: Sesión lista para usarse desde varios hilos.
+    """
+    reintento = Retry(
+        total=reintentos,
+        connect=reintentos,
+        read=reintentos,
+        status=reintentos,
+        backoff_factor=factor_espera,
+        status_forcelist=ESTADOS_REINTENTO,
+        allowed_methods=frozenset(["GET", "POST"]),  # La búsqueda es un POST idempotente
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adaptador = HTTPAdapter(pool_connections=max_conexiones, pool_maxsize=max_conexiones, max_retries=reintento)
+    sesion = requests.Session()
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    return sesion
+
+
+def enviar_solicitud(cliente, url, request_json, operacion, timeout=None):
+    """
+    Envía un POST a la API y registra su latencia, código de estado, bytes y reintentos.
+
+    Parámetros:
+    - cliente (requests.Session | module): Sesión de `crear_sesion` o el módulo `requests`.
+    - url (str): URL de la API de búsqueda.
+    - request_json (dict): Cuerpo de la solicitud.
+    - operacion (str): Etiqueta de la métrica ('pagina' o 'detalle').
+    - timeout (float): Tiempo máximo de espera por solicitud, en segundos.
+
+    Retorna:
+    - requests.Response: Respuesta de la API. Las excepciones de `requests` se propagan.
+    """
+    with medir("http_solicitud", operacion=operacion) as span:
+        try:
+            response = cliente.post(url, json=request_json, timeout=timeout)
+        except requests.RequestException as error:
+            contar("http_errores", operacion=operacion, error=type(error).__name__)
+            raise
+        span.anotar(estado=response.status_code)
+        contar("http_respuestas", operacion=operacion, estado=response.status_code)
+        contar("http_bytes", len(response.content), operacion=operacion)
+        # Reintentos hechos por urllib3 antes de esta respuesta (ver `crear_sesion`)
+        reintentos = getattr(response.raw, "retries", None)
+        if reintentos is not None and reintentos.history:
+            contar("http_reintentos", len(reintentos.history), operacion=operacion)
+    return response
+
+
+class LimitadorPorHost:
+    """
+    Limita el número de solicitudes simultáneas hacia un mismo host.
+    """
+
+    def __init__(self, max_por_host):
+        self.max_por_host = max_por_host
+        self._semaforos = {}
+        self._candado = threading.Lock()
+
+    def __call__(self, url):
+        host = urlsplit(url).netloc
+        with self._candado:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.max_por_host)
+            return self._semaforos[host]
+
+
+def obtener_pagina(sesion, url, ciudad, pagina, limitador, timeout=30):
+    """
+    Descarga y limpia una página de resultados de una ciudad.
+
+    Parámetros:
+    - sesion (requests.Session): Sesión creada con `crear_sesion`.
+    - url (str): URL de la API de búsqueda.
+    - ciudad (str): Nombre de la ciudad.
+    - pagina (int): Número de página a consultar.
+    - limitador (LimitadorPorHost): Controla las solicitudes simultáneas por host.
+    - timeout (float): Tiempo máximo de espera por solicitud, en segundos.
+
+    Retorna:
+    - list[dict] | None: Propiedades de la página, o None si la solicitud falló tras los reintentos
+      o la respuesta no se pudo interpretar.
+    """
+    request_json = generar_payload(ciudad, COORDENADAS_CIUDADES.get(ciudad), IDS_CIUDADES.get(ciudad), pagina)
+    try:
+        with limitador(url):
+            response = enviar_solicitud(sesion, url, request_json, "pagina", timeout)
+    except requests.RequestException as error:
+        print(f"Error al obtener la página {pagina} de {ciudad}: {error}")
+        return None
+    if response.status_code != 200:
+        print(f"Error al obtener la página {pagina} de {ciudad}. Código de estado: {response.status_code}")
+        return None
+    # Los errores de parseo quedan contados en `parseo_errores` por el span
+    try:
+        with medir("parseo", operacion="pagina"):
+            return limpiar_datos_fincaraiz(response.json())
+    except ERRORES_PARSEO as error:
+        print(f"Error al interpretar la página {pagina} de {ciudad}: {type(error).__name__}: {error}")
+        return None
+
+
+def iterar_paginas_concurrente(url=URL_BUSQUEDA, ciudades=None, max_paginas=MAX_PAGINAS,
+                               max_hilos=16, max_por_host=8, paginas_en_vuelo=4, sesion=None,
+                               estadisticas=None):
+    """
+    Recorre todas las ciudades a la vez y produce cada página apenas está disponible.
+
+    Las ciudades se recorren con un pool de hilos y una sesión HTTP compartida. Cada ciudad mantiene
+    hasta `paginas_en_vuelo` páginas solicitadas por adelantado; cuando una página llega vacía (o
+    falla tras agotar los reintentos) no se piden más páginas para esa ciudad. Las páginas de una
+    misma ciudad se entregan en orden y solo se retienen en memoria las que llegan adelantadas.
+
+    Una página fallida no se confunde con el final de los resultados: la ciudad queda en
+    `ciudades_fallidas` y su recorrido está incompleto, aunque se hayan entregado las páginas anteriores.
+
+    Parámetros:
+    - url (str): URL de la API de búsqueda (se puede apuntar a un servidor local de pruebas).
+    - ciudades (list[str]): Ciudades a recorrer. Por defecto todas las de `CIUDADES`.
+    - max_paginas (int): Número máximo de páginas por ciudad.
+    - max_hilos (int): Número de hilos del pool.
+    - max_por_host (int): Máximo de solicitudes simultáneas hacia el mismo host.
+    - paginas_en_vuelo (int): Páginas solicitadas por adelantado para cada ciudad.
+    - sesion (requests.Session): Sesión a reutilizar. Si es None se crea una con `crear_sesion`.
+    - estadisticas (dict): Si se pasa, se completa al terminar con `paginas`, `paginas_fallidas`
+      (lista de (ciudad, página)), `ciudades_completas` (llegaron a una página vacía),
+      `ciudades_fallidas` (se detuvieron por una página fallida), `ciudades_truncadas` (llegaron a
+      `max_paginas`) y `segundos`.
+
+    Produce:
+    - tuple[str, int, list[dict]]: Ciudad, número de página y propiedades de la página.
+    """
+    ciudades = list(CIUDADES if ciudades is None else ciudades)
+    sesion = sesion or crear_sesion(max_conexiones=max_por_host)
+    limitador = LimitadorPorHost(max_por_host)
+
+    siguiente_pagina = {ciudad: 1 for ciudad in ciudades}
+    siguiente_entrega = {ciudad: 1 for ciudad in ciudades}
+    en_vuelo = {ciudad: 0 for ciudad in ciudades}
+    # Primera página vacía o fallida de cada ciudad: las páginas posteriores se descartan
+    ultima_pagina = {ciudad: max_paginas + 1 for ciudad in ciudades}
+    # Si la página que fijó `ultima_pagina` falló (None) en lugar de llegar vacía
+    detenida_por_falla = {ciudad: False for ciudad in ciudades}
+    paginas_fallidas = []
+    adelantadas = {ciudad: {} for ciudad in ciudades}
+    estadisticas = {} if estadisticas is None else estadisticas
+    paginas = 0
+    inicio = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        pendientes = {}
+
+        def programar(ciudad):
+            # La ventana limita también las páginas adelantadas que esperan a una página lenta
+            limite = min(ultima_pagina[ciudad], siguiente_entrega[ciudad] + 2 * paginas_en_vuelo)
+            while en_vuelo[ciudad] < paginas_en_vuelo and siguiente_pagina[ciudad] < limite:
+                pagina = siguiente_pagina[ciudad]
+                siguiente_pagina[ciudad] = pagina + 1
+                en_vuelo[ciudad] += 1
+                futuro = pool.submit(obtener_pagina, sesion, url, ciudad, pagina, limitador)
+                pendientes[futuro] = (ciudad, pagina)
+
+        try:
+            for ciudad in ciudades:
+                programar(ciudad)
+
+            while pendientes:
+                terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    ciudad, pagina = pendientes.pop(futuro)
+                    en_vuelo[ciudad] -= 1
+                    propiedades = futuro.result()
+                    if propiedades is None:
+                        if pagina < ultima_pagina[ciudad]:
+                            print(f"Se detiene {ciudad} en la página {pagina}: la página falló tras los reintentos.")
+                            paginas_fallidas.append((ciudad, pagina))
+                            ultima_pagina[ciudad] = pagina
+                            detenida_por_falla[ciudad] = True
+                    elif not propiedades:
+                        if pagina < ultima_pagina[ciudad]:
+                            print(f"No hay más propiedades para {ciudad} a partir de la página {pagina}.")
+                            ultima_pagina[ciudad] = pagina
+                            detenida_por_falla[ciudad] = False
+                    else:
+                        adelantadas[ciudad][pagina] = propiedades
+
+                    # Entregar en orden las páginas consecutivas disponibles
+                    while (siguiente_entrega[ciudad] in adelantadas[ciudad]
+                           and siguiente_entrega[ciudad] < ultima_pagina[ciudad]):
+                        pagina_lista = siguiente_entrega[ciudad]
+                        siguiente_entrega[ciudad] += 1
+                        paginas += 1
+                        yield ciudad, pagina_lista, adelantadas[ciudad].pop(pagina_lista)
+                    programar(ciudad)
+        finally:
+            for futuro in pendientes:
+                futuro.cancel()
+
+    segundos = time.perf_counter() - inicio
+    estadisticas.update({
+        "paginas": paginas,
+        "paginas_fallidas": paginas_fallidas,
+        "ciudades_completas": [c for c in ciudades if ultima_pagina[c] <= max_paginas and not detenida_por_falla[c]],
+        "ciudades_fallidas": [c for c in ciudades if detenida_por_falla[c]],
+        "ciudades_truncadas": [c for c in ciudades if ultima_pagina[c] > max_paginas],
+        "segundos": segundos,
+    })
+    print(f"{paginas} páginas descargadas en {segundos:.1f} s, {len(estadisticas['ciudades_fallidas'])} "
+          f"ciudad(es) incompleta(s) por páginas fallidas")
+
+
+def iterar_propiedades_concurrente(**kwargs):
+    """
+    Produce las propiedades de `iterar_paginas_concurrente` una a una.
+
+    Parámetros:
+    - **kwargs: Argumentos de `iterar_paginas_concurrente`.
+
+    Produce:
+    - dict: Propiedad con el formato de `limpiar_datos_fincaraiz`.
+    """
+    for _, _, propiedades in iterar_paginas_concurrente(**kwargs):
+        yield from propiedades
+
+
+def obtener_todas_las_propiedades_concurrente(url=URL_BUSQUEDA, ciudades=None, **kwargs):
+    """
+    Descarga el resumen de todas las ciudades y lo retorna como una lista.
+
+    Parámetros:
+    - url (str): URL de la API de búsqueda (se puede apuntar a un servidor local de pruebas).
+    - ciudades (list[str]): Ciudades a recorrer. Por defecto todas las de `CIUDADES`.
+    - **kwargs: Argumentos adicionales de `iterar_paginas_concurrente`.
+
+    Retorna:
+    - list[dict]: Propiedades ordenadas por ciudad y página.
+    """
+    ciudades = list(CIUDADES if ciudades is None else ciudades)
+    por_ciudad = {ciudad: [] for ciudad in ciudades}
+    for ciudad, _, propiedades in iterar_paginas_concurrente(url=url, ciudades=ciudades, **kwargs):
+        por_ciudad[ciudad].extend(propiedades)
+    return [propiedad for ciudad in ciudades for propiedad in por_ciudad[ciudad]]
+
+
+def obtener_todas_las_propiedades(url=URL_BUSQUEDA, ciudades=None, **kwargs):
+    """
+    Recorre las ciudades una página a la vez, con la misma sesión, reintentos, métricas y reporte
+    de páginas fallidas que la versión concurrente (es la misma con un solo hilo).
+
+    Parámetros:
+    - url (str): URL de la API de búsqueda.
+    - ciudades (list[str]): Ciudades a recorrer. Por defecto todas las de `CIUDADES`.
+    - **kwargs: Argumentos adicionales de `iterar_paginas_concurrente` (p. ej. `estadisticas`).
+
+    Retorna:
+    - list[dict]: Propiedades ordenadas por ciudad y página.
+    """
+    return obtener_todas_las_propiedades_concurrente(url=url, ciudades=ciudades, max_hilos=1, max_por_host=1,
+                                                     paginas_en_vuelo=1, **kwargs)
+
+# Campos producidos por `extraer_detalles_completos`, en orden
+CAMPOS_DETALLE = [
+    "id", "titulo", "descripcion", "direccion", "ciudad", "departamento", "barrio", "Zona", "Comuna",
+    "latitud", "longitud", "precio", "moneda", "tipo_de_inmueble", "estado", "habitaciones", "baños",
+    "area_construida_m2", "area_privada_m2", "estrato", "pisos_edificio", "piso_ubicacion", "parqueaderos",
+    "antigüedad", "gastos_comunes", "imagenes", "url_anuncio", "propietario", "telefono", "tipo_propietario",
+    "direccion_propietario", "fecha_publicacion", "fecha_actualizacion", "facilidades", "video", "redes_sociales"
+]
 
 def extraer_detalles_completos(data):
     """
@@ -199,13 +466,28 @@ def extraer_detalles_completos(data):
 
     return propiedad
 
+def iterar_detalles_completos(data):
+    """
+    Versión generadora de `extraer_detalles_completos` para respuestas con varios resultados.
+
+    Parámetros:
+    - data (dict): Respuesta en formato JSON obtenida desde la API.
+
+    Produce:
+    - dict: Detalles de cada propiedad de la respuesta.
+    """
+    for hit in data.get("hits", {}).get("hits", []):
+        detalles = extraer_detalles_completos({"hits": {"hits": [hit]}})
+        if detalles:
+            yield detalles
+
 # Obtener detalle de todas las propiedades obtenidas
 
 def extraer_todas_propiedades(data):
     """
     Extrae todos los detalles posibles de una propiedad obtenida desde la API de FincaRaíz."""
     propiedades = []
-    url = "https://search-service.fincaraiz.com.co/api/v1/properties/search"
+    url = URL_BUSQUEDA
     for id in data['id']:
 
         # Inicializar variables
@@ -213,15 +495,250 @@ def extraer_todas_propiedades(data):
         # Modificar el JSON de la solicitud para cambiar la página
         request_json = {"variables":{"rows":100,"params":{"id":id},"page":1,"source":10},"query":""}
         # Hacer la solicitud a la API
-        response = requests.post(url, json=request_json)
+        response = enviar_solicitud(requests, url, request_json, "detalle")
 
-        # Convertir la respuesta a JSON
-        response_body = response.json()
-        # Extraer detalles completos de la propiedad
-        detalles_propiedad = extraer_detalles_completos(response_body)
+        # Convertir la respuesta a JSON y extraer detalles completos de la propiedad
+        with medir("parseo", operacion="detalle"):
+            detalles_propiedad = extraer_detalles_completos(response.json())
         # Agregar propiedades a la lista final
         propiedades.append(detalles_propiedad)
     return propiedades
 
-propiedades = pd.DataFrame(extraer_todas_propiedades(todas_propiedades))
-propiedades.to_csv('../data/raw/propiedades_fincaraiz_completas.csv' , sep=';', index=False, encoding='utf-8-sig')
\ No newline at end of file
+def leer_checkpoint(ruta_checkpoint):
+    """
+    Lee los registros ya extraídos de un archivo de checkpoint (JSON lines).
+
+    Parámetros:
+    - ruta_checkpoint (str): Ruta del archivo de checkpoint.
+
+    Retorna:
+    - dict: Registros por id. Las líneas incompletas (p. ej. por una interrupción) se ignoran.
+    """
+    registros = {}
+    if not ruta_checkpoint or not os.path.exists(ruta_checkpoint):
+        return registros
+    with open(ruta_checkpoint, encoding='utf-8') as archivo:
+        for linea in archivo:
+            try:
+                registro = json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+            registros[registro["id"]] = registro
+    return registros
+
+
+def consultar_detalle(sesion, url, id, limitador, timeout=30):
+    """
+    Consulta los detalles de un id en la API.
+
+    Parámetros:
+    - sesion (requests.Session): Sesión creada con `crear_sesion`.
+    - url (str): URL de la API de búsqueda.
+    - id (str): Id de la propiedad.
+    - limitador (LimitadorPorHost): Controla las solicitudes simultáneas por host.
+    - timeout (float): Tiempo máximo de espera por solicitud, en segundos.
+
+    Retorna:
+    - dict | None: Detalles de la propiedad (`extraer_detalles_completos`), o None si la consulta
+      falló o la respuesta no se pudo interpretar.
+    """
+    request_json = {"variables":{"rows":100,"params":{"id":id},"page":1,"source":10},"query":""}
+    try:
+        with limitador(url):
+            response = enviar_solicitud(sesion, url, request_json, "detalle", timeout)
+    except requests.RequestException as error:
+        print(f"Error al obtener detalles de {id}: {error}")
+        return None
+    if response.status_code != 200:
+        print(f"Error al obtener detalles de {id}. Código de estado: {response.status_code}")
+        return None
+
+    try:
+        with medir("parseo", operacion="detalle"):
+            return extraer_detalles_completos(response.json()) or None
+    except ERRORES_PARSEO as error:
+        # Un cuerpo mal formado o una ficha técnica incompleta solo descarta este id
+        print(f"Error al interpretar los detalles de {id}: {type(error).__name__}: {error}")
+        return None
+
+
+def iterar_detalles_concurrente(ids, url=URL_BUSQUEDA, ruta_checkpoint=None, max_hilos=16, max_por_host=8,
+                                intervalo_reporte=10, sesion=None, estadisticas=None):
+    """
+    Consulta los detalles de los ids en un pool de hilos y produce cada registro apenas termina.
+
+    Solo se mantienen en vuelo unas pocas consultas por hilo, por lo que la memoria no crece con el
+    número de ids. Cada registro terminado se agrega al archivo de checkpoint.
+
+    Parámetros:
+    - ids (list): Ids a consultar.
+    - url (str): URL de la API de búsqueda.
+    - ruta_checkpoint (str): Archivo JSON lines donde se agregan los registros terminados. None lo desactiva.
+    - max_hilos (int): Número de hilos del pool.
+    - max_por_host (int): Máximo de solicitudes simultáneas hacia el mismo host.
+    - intervalo_reporte (float): Segundos entre reportes de progreso.
+    - sesion (requests.Session): Sesión a reutilizar. Si es None se crea una con `crear_sesion`.
+    - estadisticas (dict): Si se pasa, se completa con `completados`, `fallidos`, `ids_fallidos`,
+      `segundos` e `ids_por_segundo` al terminar.
+
+    Produce:
+    - dict: Detalles de la propiedad (formato de `extraer_detalles_completos`), en orden de llegada.
+    """
+    sesion = sesion or crear_sesion(max_conexiones=max_por_host)
+    limitador = LimitadorPorHost(max_por_host)
+    pendientes_por_consultar = iter(ids)
+    estadisticas = {} if estadisticas is None else estadisticas
+    ids_fallidos = []
+    inicio = ultimo_reporte = time.perf_counter()
+    procesados = 0
+
+    archivo = open(ruta_checkpoint, 'a', encoding='utf-8') if ruta_checkpoint else None
+    try:
+        with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+            pendientes = {}
+
+            def programar():
+                while len(pendientes) < 4 * max_hilos:
+                    id = next(pendientes_por_consultar, None)
+                    if id is None:
+                        return
+                    pendientes[pool.submit(consultar_detalle, sesion, url, id, limitador)] = id
+
+            try:
+                programar()
+                while pendientes:
+                    terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in terminados:
+                        id = pendientes.pop(futuro)
+                        detalles = futuro.result()
+                        procesados += 1
+                        if not detalles:
+                            ids_fallidos.append(id)
+                        else:
+                            if archivo:
+                                archivo.write(json.dumps(detalles, ensure_ascii=False) + "\n")
+                                archivo.flush()
+                            yield detalles
+
+                        ahora = time.perf_counter()
+                        if ahora - ultimo_reporte >= intervalo_reporte:
+                            ultimo_reporte = ahora
+                            print(f"{procesados}/{len(ids)} ids ({procesados / (ahora - inicio):.1f} ids/s), "
+                                  f"{len(ids_fallidos)} fallidos")
+                    programar()
+            finally:
+                for futuro in pendientes:
+                    futuro.cancel()
+    finally:
+        if archivo:
+            archivo.close()
+
+    segundos = time.perf_counter() - inicio
+    estadisticas.update({
+        "completados": procesados - len(ids_fallidos),
+        "fallidos": len(ids_fallidos),
+        "ids_fallidos": ids_fallidos,
+        "segundos": segundos,
+        "ids_por_segundo": procesados / segundos if segundos > 0 else 0.0,
+    })
+    print(f"Detalles extraídos: {estadisticas['completados']} en {segundos:.1f} s "
+          f"({estadisticas['ids_por_segundo']:.1f} ids/s), {len(ids_fallidos)} fallidos")
+
+
+def extraer_todas_propiedades_concurrente(data, url=URL_BUSQUEDA, ruta_checkpoint=None, **kwargs):
+    """
+    Versión concurrente y reanudable de `extraer_todas_propiedades`.
+
+    Las consultas por id se reparten en un pool de hilos con una sesión HTTP compartida. Cada
+    registro terminado se agrega al archivo de checkpoint, de modo que al volver a ejecutar la
+    función con el mismo checkpoint solo se consultan los ids que faltan.
+
+    Parámetros:
+    - data (pd.DataFrame | iterable): Propiedades con columna 'id', o directamente los ids.
+    - url (str): URL de la API de búsqueda.
+    - ruta_checkpoint (str): Archivo JSON lines donde se guardan los registros terminados. None lo desactiva.
+    - **kwargs: Argumentos de `iterar_detalles_concurrente` (`max_hilos`, `max_por_host`,
+      `intervalo_reporte`, `sesion`). La API se consulta con un id por solicitud.
+
+    Retorna:
+    - tuple[list[dict], dict]: Detalles en el orden de los ids recibidos y estadísticas de la
+      ejecución (`completados`, `reanudados`, `fallidos`, `ids_fallidos`, `segundos`, `ids_por_segundo`).
+    """
+    import pandas as pd
+
+    ids = data['id'] if isinstance(data, pd.DataFrame) else data
+    ids = list(dict.fromkeys(id for id in ids if id is not None))
+
+    completados = leer_checkpoint(ruta_checkpoint)
+    reanudados = sum(1 for id in ids if id in completados)
+    faltantes = [id for id in ids if id not in completados]
+    if reanudados:
+        print(f"Reanudando desde el checkpoint: {reanudados} ids ya extraídos, {len(faltantes)} pendientes.")
+
+    estadisticas = {"reanudados": reanudados}
+    for detalles in iterar_detalles_concurrente(faltantes, url=url, ruta_checkpoint=ruta_checkpoint,
+                                                estadisticas=estadisticas, **kwargs):
+        completados[detalles["id"]] = detalles
+
+    propiedades = [completados[id] for id in ids if id in completados]
+    return propiedades, estadisticas
+
+def main(argv=None):
+    from .columnar import ESQUEMA_DETALLE, ESQUEMA_RESUMEN, escribir_parquet, exportar_csv_por_lotes, iterar_lotes_parquet
+
+    parser = argparse.ArgumentParser(description="Descarga las propiedades en arriendo y sus detalles desde FincaRaíz")
+    parser.add_argument("--dir-salida", default=str(DIR_DATOS_CRUDOS), help="Carpeta de los archivos crudos")
+    parser.add_argument("--ciudades", nargs="+", choices=CIUDADES, help="Ciudades a recorrer (por defecto todas)")
+    parser.add_argument("--max-paginas", type=int, default=MAX_PAGINAS, help="Páginas máximas por ciudad")
+    parser.add_argument("--max-hilos", type=int, default=16, help="Hilos de descarga")
+    parser.add_argument("--sin-deduplicar", action="store_true",
+                        help="Descargar también los detalles de los anuncios casi duplicados")
+    args = parser.parse_args(argv)
+
+    salida = Path(args.dir_salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    resumen = salida / "propiedades_fincaraiz.parquet"
+    checkpoint = salida / "propiedades_fincaraiz_completas.jsonl"
+    completas = salida / "propiedades_fincaraiz_completas.parquet"
+
+    # Obtener todas las propiedades y escribirlas por grupos de filas a medida que llegan
+    propiedades = iterar_propiedades_concurrente(ciudades=args.ciudades, max_paginas=args.max_paginas,
+                                                 max_hilos=args.max_hilos)
+    total = escribir_parquet(propiedades, resumen, ESQUEMA_RESUMEN)
+
+    # Mostrar cuántas propiedades se obtuvieron
+    print(f"Total de propiedades obtenidas: {total}")
+
+    # Extraer los detalles leyendo solo la columna de ids
+    ids = [id for lote in iterar_lotes_parquet(resumen, columnas=['id']) for id in lote['id']]
+    if not args.sin_deduplicar:
+        # Solo se descarga el primer anuncio de cada grupo de casi duplicados
+        import sqlite3
+
+        from .dedup import agrupar_duplicados
+
+        conexion = sqlite3.connect(":memory:")
+        columnas = ['id', 'titulo', 'descripcion', 'latitud', 'longitud', 'precio', 'area_m2']
+        representantes = set()
+        for lote in iterar_lotes_parquet(resumen, columnas=columnas):
+            grupo = agrupar_duplicados(conexion, lote)
+            representantes.update(grupo[grupo == lote['id'].astype(str)])
+        conexion.close()
+        print(f"Anuncios casi duplicados omitidos: {len(set(map(str, ids)) - representantes)}")
+        ids = [id for id in ids if str(id) in representantes]
+    completados = leer_checkpoint(checkpoint)
+    detalles = iterar_detalles_concurrente([id for id in dict.fromkeys(ids) if id not in completados],
+                                           ruta_checkpoint=checkpoint, max_hilos=args.max_hilos)
+    # Del checkpoint solo se escriben los ids de este resumen: puede tener anuncios deslistados, de
+    # otras ciudades o duplicados descargados en ejecuciones anteriores
+    reanudados = (completados[id] for id in dict.fromkeys(ids) if id in completados)
+    escribir_parquet(itertools.chain(reanudados, detalles), completas, ESQUEMA_DETALLE)
+
+    # CSV con el formato anterior para el notebook de limpieza
+    exportar_csv_por_lotes(resumen, salida / "propiedades_fincaraiz.csv", encoding='utf-8')
+    exportar_csv_por_lotes(completas, salida / "propiedades_fincaraiz_completas.csv", sep=';',
+                           encoding='utf-8-sig')
+
+
+if __name__ == "__main__":
+    main()
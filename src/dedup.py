@@ -0,0 +1,440 @@
+"""
+Detección de anuncios casi duplicados (el mismo inmueble publicado por varias inmobiliarias o
+vuelto a publicar) con MinHash y LSH.
+
+Cada anuncio se resume con una firma MinHash de los shingles de su título y descripción. Las firmas
+se parten en bandas, y dos anuncios son candidatos si coinciden en alguna banda dentro de la misma
+celda geohash (o de una vecina). Así cada anuncio se compara solo con los que comparten una llave,
+y no con todos los demás. Los candidatos se confirman con la similitud de Jaccard estimada y con
+bandas de precio y de área. Los grupos de duplicados se arman con union-find y se identifican por
+el id del primer anuncio visto del grupo.
+
+El índice (firmas, llaves LSH y grupos) se guarda en SQLite, en el almacén de propiedades o en una
+base en memoria, y se actualiza de forma incremental: cada llamada solo calcula las firmas de los
+anuncios nuevos y los compara contra los ya vistos a través de las llaves.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import contar, medir
+from .keyword_flags import normalizar_frase
+
+# Firma MinHash: 64 permutaciones en 16 bandas de 4 filas. Un par con Jaccard 0.7 queda como
+# candidato con probabilidad 1 - (1 - 0.7^4)^16 ≈ 0.99 y uno con Jaccard 0.3 con ≈ 0.12
+NUM_PERMUTACIONES = 64
+BANDAS = 16
+FILAS_POR_BANDA = NUM_PERMUTACIONES // BANDAS
+
+# Shingles de 3 palabras del título y la descripción normalizados
+TAMANO_SHINGLE = 3
+
+# Jaccard estimada mínima para considerar dos anuncios duplicados
+UMBRAL_SIMILITUD = 0.7
+
+# Precisión del geohash (celdas de unos 1.2 km x 0.6 km)
+PRECISION_GEOHASH = 6
+
+# Ancho relativo de las bandas de precio y de área; los duplicados deben caer en bandas contiguas
+TOLERANCIA_PRECIO = 0.1
+TOLERANCIA_AREA = 0.1
+
+# Textos por defecto de la API cuando el anuncio no tiene título o descripción
+TEXTOS_VACIOS = {"sin titulo", "sin descripcion", "no disponible"}
+
+# Permutaciones multiply-shift: los 32 bits altos de (a * x + b) mod 2^64, con a impar y x el hash
+# de 32 bits del shingle. Evitan la operación módulo por un primo, que es la más lenta en NumPy
+_GENERADOR = np.random.default_rng(20240601)
+_A = _GENERADOR.integers(1, 2 ** 63, NUM_PERMUTACIONES, dtype=np.uint64) | np.uint64(1)
+_B = _GENERADOR.integers(0, 2 ** 63, NUM_PERMUTACIONES, dtype=np.uint64)
+# Multiplicadores para combinar las filas de una banda, la banda y la celda en una llave de 63 bits
+_MEZCLA = _GENERADOR.integers(1, 2 ** 63, FILAS_POR_BANDA + 2, dtype=np.uint64) | np.uint64(1)
+# Multiplicadores para combinar los hashes de las palabras de un shingle
+_MEZCLA_SHINGLE = _GENERADOR.integers(1, 2 ** 63, TAMANO_SHINGLE, dtype=np.uint64) | np.uint64(1)
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_SIN_BANDA = -(2 ** 31)
+
+
+def _bits_geohash(precision):
+    # Bits de longitud y de latitud de un geohash de `precision` caracteres
+    bits = 5 * precision
+    return (bits + 1) // 2, bits // 2
+
+
+def celdas_geohash(latitudes, longitudes, precision=PRECISION_GEOHASH):
+    """
+    Celda geohash de cada punto como par de enteros (fila de latitud, columna de longitud).
+
+    Retorna:
+    - tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Fila y columna de la celda, y el lado
+      de la celda más cercano a cada punto en cada eje (-1 o 1).
+    """
+    bits_longitud, bits_latitud = _bits_geohash(precision)
+    latitudes = np.clip(np.asarray(latitudes, dtype=np.float64), -90, 90)
+    longitudes = np.clip(np.asarray(longitudes, dtype=np.float64), -180, 180)
+    posicion_latitud = (latitudes + 90) / 180 * 2 ** bits_latitud
+    posicion_longitud = (longitudes + 180) / 360 * 2 ** bits_longitud
+    fila = np.minimum(np.floor(posicion_latitud), 2 ** bits_latitud - 1)
+    columna = np.minimum(np.floor(posicion_longitud), 2 ** bits_longitud - 1)
+    lado_latitud = np.where(posicion_latitud - fila >= 0.5, 1, -1)
+    lado_longitud = np.where(posicion_longitud - columna >= 0.5, 1, -1)
+    return fila, columna, lado_latitud, lado_longitud
+
+
+def geohash(latitudes, longitudes, precision=PRECISION_GEOHASH):
+    """
+    Geohash de cada punto (cadenas de `precision` caracteres en base 32; None sin coordenadas).
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    sin_coordenadas = np.isnan(latitudes) | np.isnan(longitudes)
+    fila, columna, _, _ = celdas_geohash(np.nan_to_num(latitudes), np.nan_to_num(longitudes), precision)
+    fila, columna = fila.astype(np.int64), columna.astype(np.int64)
+    bits_longitud, bits_latitud = _bits_geohash(precision)
+    # Los bits se intercalan empezando por la longitud
+    codigo = np.zeros(len(fila), dtype=np.int64)
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            bits_longitud -= 1
+            codigo = (codigo << 1) | ((columna >> bits_longitud) & 1)
+        else:
+            bits_latitud -= 1
+            codigo = (codigo << 1) | ((fila >> bits_latitud) & 1)
+    caracteres = np.array(list(_BASE32))
+    cadenas = caracteres[(codigo >> (5 * (precision - 1))) & 31]
+    for i in reversed(range(precision - 1)):
+        cadenas = np.char.add(cadenas, caracteres[(codigo >> (5 * i)) & 31])
+    return np.where(sin_coordenadas, None, cadenas.astype(object))
+
+
+def _hash_palabras(palabras):
+    # Hash de 32 bits de cada palabra; crc32 solo se calcula una vez por palabra distinta
+    codigos, unicas = pd.factorize(np.asarray(palabras, dtype=object))
+    return np.fromiter((zlib.crc32(palabra.encode("utf-8")) for palabra in unicas), dtype=np.uint64,
+                       count=len(unicas))[codigos]
+
+
+def shingles(textos, tamano=TAMANO_SHINGLE):
+    """
+    Hashes de 32 bits de los shingles de `tamano` palabras de cada texto normalizado. Los textos más
+    cortos que `tamano` palabras usan sus palabras sueltas.
+
+    Las palabras de todos los textos se procesan juntas: el hash de cada shingle combina los hashes
+    de sus palabras con multiplicaciones sobre arreglos, sin recorrer los shingles en Python. Un
+    shingle repetido dentro de un texto aparece varias veces, lo que no cambia su firma MinHash.
+
+    Retorna:
+    - tuple[np.ndarray, np.ndarray]: Hashes uint64 (menores que 2^32) de todos los textos seguidos y
+      número de shingles de cada texto.
+    """
+    listas = [normalizar_frase(texto).split() if isinstance(texto, str) else [] for texto in textos]
+    palabras_por_texto = np.array([len(palabras) for palabras in listas], dtype=np.int64)
+    hashes = _hash_palabras([palabra for palabras in listas for palabra in palabras])
+    inicios = np.cumsum(palabras_por_texto) - palabras_por_texto
+
+    largos = palabras_por_texto >= tamano
+    tamanos = np.where(largos, palabras_por_texto - tamano + 1, palabras_por_texto)
+    # Posición de la primera palabra de cada shingle
+    desplazamiento = np.arange(tamanos.sum()) - np.repeat(np.cumsum(tamanos) - tamanos, tamanos)
+    primera = np.repeat(inicios, tamanos) + desplazamiento
+    combinado = np.repeat(largos, tamanos)
+    salida = hashes[primera].copy()
+    posiciones = np.flatnonzero(combinado)
+    with np.errstate(over="ignore"):
+        mezcla = hashes[primera[posiciones]] * _MEZCLA_SHINGLE[0]
+        for k in range(1, tamano):
+            mezcla += hashes[primera[posiciones] + k] * _MEZCLA_SHINGLE[k]
+    salida[posiciones] = mezcla >> np.uint64(32)
+    return salida, tamanos
+
+
+def firmas_minhash(textos, tamano_bloque=200_000):
+    """
+    Firmas MinHash de una lista de textos.
+
+    Cada permutación se aplica a un arreglo con los shingles de muchos textos y el mínimo por texto
+    se toma con `np.minimum.reduceat`.
+
+    Retorna:
+    - tuple[np.ndarray, np.ndarray]: Firmas uint32 de forma (textos, NUM_PERMUTACIONES) y máscara de
+      los textos con al menos un shingle (los demás no se pueden comparar).
+    """
+    hashes, tamanos = shingles(textos)
+    validos = tamanos > 0
+    firmas = np.full((len(tamanos), NUM_PERMUTACIONES), np.iinfo(np.uint32).max, dtype=np.uint32)
+    filas = np.flatnonzero(validos)
+    inicios = np.cumsum(tamanos[validos]) - tamanos[validos]
+    # Bloques de textos completos para acotar la memoria de la matriz shingles x permutaciones
+    limite = 0
+    while limite < len(filas):
+        fin = max(int(np.searchsorted(inicios, inicios[limite] + tamano_bloque)), limite + 1)
+        desde = inicios[limite]
+        hasta = inicios[fin] if fin < len(filas) else len(hashes)
+        with np.errstate(over="ignore"):
+            valores = ((hashes[desde:hasta, None] * _A + _B) >> np.uint64(32)).astype(np.uint32)
+        firmas[filas[limite:fin]] = np.minimum.reduceat(valores, inicios[limite:fin] - desde, axis=0)
+        limite = fin
+    return firmas, validos
+
+
+def bandas_valor(valores, tolerancia):
+    """
+    Banda logarítmica de cada valor (ancho relativo `tolerancia`); los valores faltantes o no
+    positivos quedan sin banda y solo coinciden entre sí.
+    """
+    valores = pd.to_numeric(pd.Series(valores), errors="coerce").to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bandas = np.floor(np.log(valores) / np.log1p(tolerancia))
+    return np.where(np.isfinite(bandas), bandas, _SIN_BANDA).astype(np.int64)
+
+
+def _numero(serie):
+    # Primer número de cada valor ("85 m2" -> 85); las áreas del detalle llegan como texto
+    texto = serie.astype(str).str.extract(r"(\d+(?:[.,]\d+)?)", expand=False).str.replace(",", ".")
+    return pd.to_numeric(texto, errors="coerce")
+
+
+def _llaves(firmas, celdas):
+    """
+    Llave LSH de cada (anuncio, banda, celda): las filas de la banda, el número de banda y la celda
+    combinados en un entero de 63 bits.
+
+    Parámetros:
+    - firmas (np.ndarray): Firmas de forma (anuncios, NUM_PERMUTACIONES).
+    - celdas (np.ndarray): Código de celda de forma (anuncios, k).
+
+    Retorna:
+    - np.ndarray: int64 de forma (anuncios, BANDAS * k).
+    """
+    por_banda = firmas.astype(np.uint64).reshape(len(firmas), BANDAS, FILAS_POR_BANDA)
+    with np.errstate(over="ignore"):
+        llave_banda = (por_banda * _MEZCLA[:FILAS_POR_BANDA]).sum(axis=2)
+        llave_banda += np.arange(BANDAS, dtype=np.uint64) * _MEZCLA[-2]
+        llaves = llave_banda[:, :, None] + celdas.astype(np.uint64)[:, None, :] * _MEZCLA[-1]
+    return (llaves >> np.uint64(1)).astype(np.int64).reshape(len(firmas), BANDAS * celdas.shape[1])
+
+
+def abrir_indice(conexion):
+    """
+    Crea (si no existen) las tablas del índice de duplicados en una conexión SQLite.
+
+    `duplicados_anuncios` guarda por anuncio su firma, geohash, bandas de precio y área y grupo;
+    `duplicados_llaves` guarda las llaves LSH de cada anuncio en su propia celda.
+    """
+    conexion.execute("""
+        CREATE TABLE IF NOT EXISTS duplicados_anuncios (
+            id TEXT PRIMARY KEY,
+            firma BLOB,
+            geohash TEXT,
+            banda_precio INTEGER,
+            banda_area INTEGER,
+            grupo TEXT NOT NULL
+        )""")
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_duplicados_grupo ON duplicados_anuncios (grupo)")
+    conexion.execute("CREATE TABLE IF NOT EXISTS duplicados_llaves (llave INTEGER NOT NULL, id TEXT NOT NULL)")
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_duplicados_llave ON duplicados_llaves (llave)")
+    conexion.commit()
+    return conexion
+
+
+def _tabla_temporal(conexion, nombre, columnas, filas):
+    conexion.execute(f"DROP TABLE IF EXISTS temp.{nombre}")
+    conexion.execute(f"CREATE TEMP TABLE {nombre} ({', '.join(columnas)})")
+    conexion.executemany(f"INSERT INTO temp.{nombre} VALUES ({', '.join('?' * len(columnas))})", filas)
+
+
+def _texto_vacio(texto):
+    # True para textos faltantes o con el valor por defecto de la API ("Sin descripción")
+    return not isinstance(texto, str) or len(texto) < 20 and normalizar_frase(texto).strip() in TEXTOS_VACIOS
+
+
+class _UnionFind:
+    # Union-find sobre ids de grupo; la raíz de un grupo es el id con menor orden (el más antiguo)
+    def __init__(self):
+        self.padre = {}
+        self.orden = {}
+
+    def agregar(self, id, orden):
+        if id not in self.padre:
+            self.padre[id] = id
+            self.orden[id] = orden
+
+    def encontrar(self, id):
+        raiz = id
+        while self.padre[raiz] != raiz:
+            raiz = self.padre[raiz]
+        while self.padre[id] != raiz:
+            self.padre[id], id = raiz, self.padre[id]
+        return raiz
+
+    def unir(self, a, b):
+        a, b = self.encontrar(a), self.encontrar(b)
+        if a != b:
+            if self.orden[b] < self.orden[a]:
+                a, b = b, a
+            self.padre[b] = a
+
+
+def agrupar_duplicados(conexion, anuncios, columna_area=None, umbral=UMBRAL_SIMILITUD):
+    """
+    Asigna a cada anuncio el grupo de duplicados al que pertenece, agregando los anuncios nuevos al
+    índice de `conexion`.
+
+    Los anuncios que ya están en el índice conservan su grupo (su firma no se recalcula). Para los
+    nuevos se calculan las firmas y las llaves LSH de su celda geohash y de las tres vecinas del
+    lado más cercano (un duplicado a menos de media celda cae en alguna de ellas). Los candidatos
+    son los anuncios, nuevos o ya vistos, que comparten alguna llave. Un par se confirma si la
+    Jaccard estimada es al menos `umbral` y las bandas de precio y de área difieren como máximo en
+    una. Si un anuncio nuevo une dos grupos existentes, el más reciente se reasigna al más antiguo.
+
+    Parámetros:
+    - conexion (sqlite3.Connection): Conexión con el índice (p. ej. la del almacén de propiedades, o
+      `sqlite3.connect(':memory:')` para una sola ejecución).
+    - anuncios (pd.DataFrame): Columnas `id`, `titulo`, `descripcion`, `latitud`, `longitud`,
+      `precio` y una de área.
+    - columna_area (str): Columna de área. Por defecto `area_m2` (resumen) o `area_construida_m2`
+      (detalle).
+    - umbral (float): Jaccard estimada mínima.
+
+    Retorna:
+    - pd.Series: Id del grupo de cada anuncio (el id del primer anuncio visto del grupo), con el
+      índice de `anuncios`.
+    """
+    abrir_indice(conexion)
+    if columna_area is None:
+        columna_area = "area_m2" if "area_m2" in anuncios.columns else "area_construida_m2"
+    ids = anuncios["id"].astype(str)
+
+    with medir("deduplicacion", paso="firmas"):
+        _tabla_temporal(conexion, "ids_consulta", ["id TEXT"], zip(ids.unique().tolist()))
+        vistos = set(id for id, in conexion.execute(
+            "SELECT a.id FROM duplicados_anuncios a JOIN temp.ids_consulta c ON c.id = a.id"))
+        nuevos = anuncios[~ids.isin(vistos).to_numpy() & ~ids.duplicated().to_numpy()]
+        ids_nuevos = nuevos["id"].astype(str).to_numpy()
+
+        textos = [" ".join(texto for texto in (titulo, descripcion) if not _texto_vacio(texto))
+                  for titulo, descripcion in zip(nuevos["titulo"], nuevos["descripcion"])]
+        firmas, validos = firmas_minhash(textos)
+        banda_precio = bandas_valor(nuevos["precio"], TOLERANCIA_PRECIO)
+        banda_area = bandas_valor(_numero(nuevos[columna_area]), TOLERANCIA_AREA)
+
+        latitudes = pd.to_numeric(nuevos["latitud"], errors="coerce").to_numpy(dtype=np.float64)
+        longitudes = pd.to_numeric(nuevos["longitud"], errors="coerce").to_numpy(dtype=np.float64)
+        fila, columna, lado_fila, lado_columna = celdas_geohash(latitudes, longitudes)
+        fila = np.nan_to_num(fila, nan=-1).astype(np.int64)
+        columna = np.nan_to_num(columna, nan=-1).astype(np.int64)
+        sin_coordenadas = np.isnan(latitudes) | np.isnan(longitudes)
+        # Celda propia y las vecinas del lado más cercano en cada eje (sin coordenadas: una celda aparte)
+        celdas = np.stack([
+            (fila + df) * 2 ** 32 + (columna + dc)
+            for df, dc in ((0, 0), (lado_fila, 0), (0, lado_columna), (lado_fila, lado_columna))
+        ], axis=1)
+        celdas[sin_coordenadas] = -1
+        llaves_consulta = _llaves(firmas, celdas)
+        llaves_propias = llaves_consulta.reshape(len(nuevos), BANDAS, 4)[:, :, 0]
+
+    with medir("deduplicacion", paso="candidatos"):
+        # Pares (nuevo, candidato) que comparten una llave, entre los nuevos y contra el índice
+        posiciones = np.flatnonzero(validos)
+        consulta = pd.DataFrame({
+            "llave": llaves_consulta[posiciones].ravel(),
+            "nuevo": np.repeat(posiciones, llaves_consulta.shape[1]),
+        })
+        propias = pd.DataFrame({
+            "llave": llaves_propias[posiciones].ravel(),
+            "candidato": ids_nuevos[np.repeat(posiciones, BANDAS)],
+        })
+        existentes = pd.DataFrame(columns=["llave", "candidato"])
+        if conexion.execute("SELECT EXISTS (SELECT 1 FROM duplicados_llaves)").fetchone()[0]:
+            # Llaves ordenadas y como llave primaria: la tabla se llena sin reordenar el árbol
+            llaves = np.sort(pd.unique(consulta["llave"]))
+            _tabla_temporal(conexion, "llaves_consulta", ["llave INTEGER PRIMARY KEY"], zip(llaves.tolist()))
+            existentes = pd.DataFrame(conexion.execute("""
+                SELECT l.llave, l.id FROM duplicados_llaves l
+                JOIN temp.llaves_consulta c ON c.llave = l.llave""").fetchall(), columns=["llave", "candidato"])
+        pares = (consulta.merge(pd.concat([propias, existentes], ignore_index=True), on="llave")
+                 .drop(columns="llave").drop_duplicates())
+        pares = pares[pares["candidato"].to_numpy() != ids_nuevos[pares["nuevo"].to_numpy()]]
+        contar("dedup_candidatos", len(pares))
+
+    with medir("deduplicacion", paso="verificacion"):
+        # Firma y bandas de cada candidato: de los nuevos en memoria o del índice
+        candidatos = pd.Index(pd.unique(pares["candidato"]))
+        _tabla_temporal(conexion, "candidatos", ["id TEXT"],
+                        ((id,) for id in candidatos.difference(ids_nuevos)))
+        filas_guardadas = conexion.execute("""
+            SELECT a.id, a.firma, a.banda_precio, a.banda_area, a.grupo FROM duplicados_anuncios a
+            JOIN temp.candidatos c ON c.id = a.id WHERE a.firma IS NOT NULL""").fetchall()
+        grupo_guardado = {id: grupo for id, _, _, _, grupo in filas_guardadas}
+
+        # Tabla con los nuevos seguidos de los guardados; cada par apunta a su fila
+        tabla_ids = pd.Index(np.concatenate([ids_nuevos, [fila[0] for fila in filas_guardadas]]))
+        tabla_firmas = np.vstack([firmas] + [np.frombuffer(fila[1], dtype=np.uint32)[None]
+                                             for fila in filas_guardadas])
+        tabla_precio = np.concatenate([banda_precio, [fila[2] for fila in filas_guardadas]]).astype(np.int64)
+        tabla_area = np.concatenate([banda_area, [fila[3] for fila in filas_guardadas]]).astype(np.int64)
+        tabla_validos = np.concatenate([validos, np.ones(len(filas_guardadas), dtype=bool)])
+
+        nuevo = pares["nuevo"].to_numpy()
+        candidato = tabla_ids.get_indexer(pares["candidato"])
+        similitud = (firmas[nuevo] == tabla_firmas[candidato]).mean(axis=1)
+        confirmados = ((candidato >= 0) & tabla_validos[candidato] & (similitud >= umbral)
+                       & (np.abs(banda_precio[nuevo] - tabla_precio[candidato]) <= 1)
+                       & (np.abs(banda_area[nuevo] - tabla_area[candidato]) <= 1))
+        contar("dedup_pares_confirmados", int(confirmados.sum()))
+
+    with medir("deduplicacion", paso="grupos"):
+        # Los grupos existentes tienen el orden de inserción de su raíz (rowid); los nuevos van después
+        grupos = _UnionFind()
+        grupos_existentes = set(grupo_guardado.values())
+        _tabla_temporal(conexion, "grupos", ["id TEXT"], ((grupo,) for grupo in grupos_existentes))
+        for grupo, orden in conexion.execute("""
+                SELECT a.id, a.rowid FROM duplicados_anuncios a JOIN temp.grupos g ON g.id = a.id"""):
+            grupos.agregar(grupo, orden)
+        maximo = conexion.execute("SELECT COALESCE(MAX(rowid), 0) FROM duplicados_anuncios").fetchone()[0]
+        for posicion, id in enumerate(ids_nuevos):
+            grupos.agregar(id, maximo + 1 + posicion)
+        for posicion, id in zip(nuevo[confirmados], pares["candidato"].to_numpy()[confirmados]):
+            # Un anuncio guardado se une a través de su grupo; uno nuevo, directamente
+            grupos.unir(ids_nuevos[posicion], grupo_guardado.get(id, id))
+
+        with conexion:
+            for grupo in grupos_existentes:
+                raiz = grupos.encontrar(grupo)
+                if raiz != grupo:
+                    conexion.execute("UPDATE duplicados_anuncios SET grupo = ? WHERE grupo = ?", (raiz, grupo))
+            geohashes = geohash(latitudes, longitudes).tolist()
+            conexion.executemany(
+                "INSERT INTO duplicados_anuncios (id, firma, geohash, banda_precio, banda_area, grupo) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((id, firmas[i].tobytes() if validos[i] else None, geohashes[i], int(banda_precio[i]),
+                  int(banda_area[i]), grupos.encontrar(id)) for i, id in enumerate(ids_nuevos)))
+            propias = propias.sort_values("llave")
+            conexion.executemany("INSERT INTO duplicados_llaves VALUES (?, ?)",
+                                 zip(propias["llave"].tolist(), propias["candidato"].tolist()))
+
+        resultado = dict(conexion.execute(
+            "SELECT a.id, a.grupo FROM duplicados_anuncios a JOIN temp.ids_consulta c ON c.id = a.id"))
+    return ids.map(resultado)
+
+
+def representantes(conexion, anuncios, vigentes=None, **kwargs):
+    """
+    Anuncios que no son duplicados de otro: los que encabezan su grupo, o aquellos cuyo grupo está
+    encabezado por un anuncio que ya no está en `vigentes` (p. ej. porque se deslistó).
+
+    Parámetros:
+    - conexion (sqlite3.Connection): Conexión con el índice de duplicados.
+    - anuncios (pd.DataFrame): Anuncios a revisar (ver `agrupar_duplicados`).
+    - vigentes (iterable): Ids publicados actualmente. Por defecto, los de `anuncios`.
+    - **kwargs: Argumentos de `agrupar_duplicados`.
+
+    Retorna:
+    - pd.Series: Máscara booleana con el índice de `anuncios`.
+    """
+    grupo = agrupar_duplicados(conexion, anuncios, **kwargs)
+    ids = anuncios["id"].astype(str)
+    vigentes = set(map(str, vigentes)) if vigentes is not None else set(ids)
+    return (grupo == ids) | ~grupo.isin(vigentes)
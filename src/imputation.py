@@ -0,0 +1,150 @@
+from itertools import combinations
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.neighbors import KDTree
+
+# Columnas imputadas en la limpieza
+COLUMNAS_IMPUTADAS = ['habitaciones', 'baños', 'estrato']
+
+
+class ImputadorKNN(BaseEstimator, TransformerMixin):
+    """
+    Imputación por vecinos más cercanos con índices KD-tree, en lugar de la matriz completa de
+    distancias de `KNNImputer`.
+
+    Los donantes son las filas sin faltantes en `columnas`. Para cada combinación de columnas
+    observadas se construye un KD-tree sobre esas columnas de los donantes; cada fila con faltantes
+    busca sus `n_neighbors` vecinos en el árbol de su combinación y toma el promedio de sus valores.
+    Con donantes completos el orden de los vecinos es el mismo de la distancia `nan_euclidean` de
+    `KNNImputer`; cuando hay empates (frecuentes con valores enteros) se usa la media de los
+    donantes empatados en lugar de escoger algunos de forma arbitraria. Las consultas se hacen por
+    bloques de `tamano_bloque` filas, así que la memoria de trabajo no depende del número de filas.
+
+    Si se indican `columnas_estrato` (p. ej. ciudad y tipo de inmueble), se ajusta un conjunto de
+    árboles por estrato y cada fila busca vecinos solo dentro del suyo. Los estratos con menos de
+    `min_donantes` donantes, o que no se vieron al ajustar, usan los árboles globales.
+
+    Parámetros:
+    - columnas (list[str]): Columnas a imputar (y usadas para la distancia).
+    - n_neighbors (int): Número de vecinos.
+    - columnas_estrato (list[str]): Columnas que definen las particiones. None usa un solo índice.
+    - min_donantes (int): Donantes mínimos para usar los árboles de un estrato.
+    - tamano_bloque (int): Filas consultadas por bloque.
+    - leaf_size (int): Tamaño de hoja de los KD-tree.
+    """
+
+    def __init__(self, columnas=COLUMNAS_IMPUTADAS, n_neighbors=5, columnas_estrato=None, min_donantes=200,
+                 tamano_bloque=10_000, leaf_size=40):
+        self.columnas = columnas
+        self.n_neighbors = n_neighbors
+        self.columnas_estrato = columnas_estrato
+        self.min_donantes = min_donantes
+        self.tamano_bloque = tamano_bloque
+        self.leaf_size = leaf_size
+
+    def ajustar_particion(self, donantes):
+        # Un KD-tree por cada combinación de columnas observadas (excepto ninguna y todas). El árbol
+        # se construye sobre las coordenadas distintas, con el número de donantes y la media de sus
+        # columnas en cada una: los datos son enteros pequeños y hay muchísimos puntos repetidos.
+        n_columnas = donantes.shape[1]
+        indices = {}
+        for n_observadas in range(1, n_columnas):
+            for observadas in combinations(range(n_columnas), n_observadas):
+                puntos, inverso, conteos = np.unique(donantes[:, observadas], axis=0,
+                                                     return_inverse=True, return_counts=True)
+                sumas = np.zeros((len(puntos), n_columnas))
+                np.add.at(sumas, inverso.ravel(), donantes)
+                indices[observadas] = {
+                    'arbol': KDTree(puntos, leaf_size=self.leaf_size),
+                    'conteos': conteos,
+                    'medias': sumas / conteos[:, None],
+                }
+        return indices
+
+    def fit(self, X, y=None):
+        valores = X[self.columnas].to_numpy(dtype=np.float64)
+        completas = ~np.isnan(valores).any(axis=1)
+        if completas.sum() < self.n_neighbors:
+            raise ValueError("No hay suficientes filas completas para imputar")
+
+        # Como en KNNImputer, una fila sin ninguna columna observada recibe la media de cada columna
+        self.medias_ = np.nanmean(valores, axis=0)
+        self.global_ = self.ajustar_particion(valores[completas])
+        self.particiones_ = {}
+        if self.columnas_estrato:
+            estratos = X.loc[completas, self.columnas_estrato]
+            for clave, indices in estratos.groupby(self.columnas_estrato, observed=True).indices.items():
+                if len(indices) >= max(self.min_donantes, self.n_neighbors):
+                    self.particiones_[clave] = self.ajustar_particion(valores[completas][indices])
+        return self
+
+    def imputar_particion(self, valores, modelo):
+        faltantes = np.isnan(valores)
+        n_columnas = valores.shape[1]
+        patrones = faltantes[faltantes.any(axis=1)]
+        for patron in np.unique(patrones, axis=0):
+            filas = np.flatnonzero((faltantes == patron).all(axis=1))
+            faltan = np.flatnonzero(patron)
+            observadas = tuple(int(i) for i in range(n_columnas) if not patron[i])
+            if not observadas:
+                valores[np.ix_(filas, faltan)] = self.medias_[faltan]
+                continue
+            indice = modelo[observadas]
+            k = min(self.n_neighbors, len(indice['conteos']))
+            for inicio in range(0, len(filas), self.tamano_bloque):
+                bloque = filas[inicio:inicio + self.tamano_bloque]
+                vecinos = indice['arbol'].query(valores[np.ix_(bloque, observadas)], k=k, return_distance=False)
+                # Se toman donantes de los puntos más cercanos hasta completar n_neighbors; los
+                # donantes empatados en un mismo punto aportan su media
+                conteos = indice['conteos'][vecinos]
+                previos = np.cumsum(conteos, axis=1) - conteos
+                pesos = np.clip(self.n_neighbors - previos, 0, conteos)
+                medias = indice['medias'][vecinos][:, :, faltan]
+                valores[np.ix_(bloque, faltan)] = (pesos[:, :, None] * medias).sum(axis=1) / pesos.sum(axis=1)[:, None]
+        return valores
+
+    def transform(self, X):
+        valores = X[self.columnas].to_numpy(dtype=np.float64, copy=True)
+        if not self.particiones_:
+            return self.imputar_particion(valores, self.global_)
+
+        for clave, indices in X.groupby(self.columnas_estrato, observed=True, dropna=False).indices.items():
+            modelo = self.particiones_.get(clave, self.global_)
+            valores[indices] = self.imputar_particion(valores[indices], modelo)
+        return valores
+
+
+def guardar_imputador(imputador, ruta):
+    """
+    Guarda un `ImputadorKNN` ajustado para aplicarlo después sin volver a ajustarlo.
+    """
+    joblib.dump(imputador, ruta)
+
+
+def cargar_imputador(ruta):
+    """
+    Carga un `ImputadorKNN` guardado con `guardar_imputador`.
+    """
+    return joblib.load(ruta)
+
+
+def aplicar_imputador(df, imputador):
+    """
+    Imputa `habitaciones`, `baños` y `estrato` de propiedades nuevas con un imputador ya ajustado,
+    redondeando hacia abajo a enteros como en la limpieza.
+
+    Parámetros:
+    - df (pd.DataFrame): Propiedades con las columnas del imputador.
+    - imputador (ImputadorKNN | str): Imputador ajustado o ruta del archivo guardado.
+
+    Retorna:
+    - pd.DataFrame: Copia de `df` con las columnas imputadas.
+    """
+    if isinstance(imputador, str):
+        imputador = cargar_imputador(imputador)
+    df = df.copy()
+    df[imputador.columnas] = np.floor(imputador.transform(df)).astype(int)
+    return df
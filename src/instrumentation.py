@@ -0,0 +1,360 @@
+"""
+Instrumentación por etapas: spans (duración de una etapa) y contadores.
+
+Mientras está desactivada (el estado por defecto), `medir` retorna siempre el mismo span nulo y
+`contar` retorna de inmediato, así que el costo en el código instrumentado es una llamada a función.
+
+Al activarla con `activar(...)`, o definiendo la variable de entorno `INSTRUMENTACION_DIR` antes
+de importar el módulo:
+- cada span terminado se escribe como una línea JSON (nombre, etiquetas, segundos de reloj y de
+  CPU del hilo, span padre, error) y al desactivar se agrega una línea con el resumen;
+- los spans se agregan en histogramas y los contadores en totales, exportables en el formato de
+  texto de Prometheus (para el textfile collector de node_exporter);
+- opcionalmente cada etapa se perfila con cProfile (un .prof por span) o con tracemalloc (pico de
+  memoria en el evento del span).
+
+Uso:
+    activar('metricas/eventos.jsonl', 'metricas/metricas.prom', perfil='cprofile')
+    with medir('limpieza', paso='areas') as span:
+        ...
+        span.anotar(filas=len(df))
+    contar('http_bytes', len(response.content), operacion='pagina')
+"""
+import atexit
+import cProfile
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+# Límites (en segundos) de los histogramas de duración
+LIMITES_HISTOGRAMA = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+PERFILES = ('cprofile', 'tracemalloc')
+
+
+class _Estado:
+    activa = False
+    archivo_jsonl = None
+    ruta_prometheus = None
+    prefijo = 'arriendos'
+    perfil = None
+    etapas_perfil = None
+    dir_perfiles = None
+    inicio_tracemalloc = False
+
+
+_estado = _Estado()
+_candado = threading.Lock()
+_local = threading.local()
+_contadores = {}
+_histogramas = {}
+_secuencia = itertools.count(1)
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _escribir_evento(evento):
+    if _estado.archivo_jsonl is not None:
+        linea = json.dumps(evento, default=str, ensure_ascii=False) + '\n'
+        with _candado:
+            _estado.archivo_jsonl.write(linea)
+
+
+class _SpanNulo:
+    """
+    Span que no mide nada; es el que se usa mientras la instrumentación está desactivada.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def anotar(self, **etiquetas):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class Span:
+    """
+    Mide una etapa: duración de reloj, tiempo de CPU del hilo y, si está configurado, su perfil.
+    Las etiquetas de `anotar` (p. ej. el código de estado de una respuesta) se agregan al evento y
+    a las etiquetas del histograma.
+    """
+
+    def __init__(self, nombre, etiquetas):
+        self.nombre = nombre
+        self.etiquetas = etiquetas
+        self.id = next(_secuencia)
+        self._perfilador = None
+        self._tracemalloc = False
+
+    def anotar(self, **etiquetas):
+        self.etiquetas.update(etiquetas)
+
+    def __enter__(self):
+        pila = getattr(_local, 'pila', None)
+        if pila is None:
+            pila = _local.pila = []
+        self.padre = pila[-1].id if pila else None
+        pila.append(self)
+        self._iniciar_perfil()
+        self.inicio = time.time()
+        self._inicio_reloj = time.perf_counter()
+        self._inicio_cpu = time.thread_time()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        segundos = time.perf_counter() - self._inicio_reloj
+        cpu_segundos = time.thread_time() - self._inicio_cpu
+        _local.pila.pop()
+        evento = {
+            'tipo': 'span',
+            'nombre': self.nombre,
+            'etiquetas': self.etiquetas,
+            'inicio': self.inicio,
+            'segundos': segundos,
+            'cpu_segundos': cpu_segundos,
+            'id': self.id,
+            'padre': self.padre,
+            'pid': os.getpid(),
+            'hilo': threading.current_thread().name,
+        }
+        if tipo is not None:
+            evento['error'] = tipo.__name__
+            contar(f'{self.nombre}_errores', error=tipo.__name__)
+        evento.update(self._terminar_perfil())
+        _observar(self.nombre, self.etiquetas, segundos)
+        _escribir_evento(evento)
+        return False
+
+    def _iniciar_perfil(self):
+        if _estado.perfil is None or (_estado.etapas_perfil and self.nombre not in _estado.etapas_perfil):
+            return
+        # Solo se perfila el span más externo de cada hilo: los perfiladores no se pueden anidar
+        if getattr(_local, 'perfilando', False):
+            return
+        _local.perfilando = True
+        if _estado.perfil == 'cprofile':
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+        else:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _estado.inicio_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._tracemalloc = True
+
+    def _terminar_perfil(self):
+        if self._perfilador is not None:
+            self._perfilador.disable()
+            _local.perfilando = False
+            ruta = Path(_estado.dir_perfiles) / f'{self.nombre}-{os.getpid()}-{self.id}.prof'
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            self._perfilador.dump_stats(ruta)
+            return {'perfil': str(ruta)}
+        if self._tracemalloc:
+            _local.perfilando = False
+            return {'pico_memoria_mb': tracemalloc.get_traced_memory()[1] / 2 ** 20}
+        return {}
+
+
+def medir(nombre, **etiquetas):
+    """
+    Context manager que mide la etapa `nombre`.
+
+    Parámetros:
+    - nombre (str): Nombre de la etapa (se usa en el nombre de la métrica de Prometheus).
+    - **etiquetas: Etiquetas del span (p. ej. `operacion='pagina'`).
+
+    Retorna:
+    - Span: Span activo (o el span nulo si la instrumentación está desactivada).
+    """
+    if not _estado.activa:
+        return _SPAN_NULO
+    return Span(nombre, etiquetas)
+
+
+def contar(nombre, valor=1, **etiquetas):
+    """
+    Suma `valor` al contador `nombre` con las etiquetas dadas.
+    """
+    if not _estado.activa:
+        return
+    clave = _clave(nombre, etiquetas)
+    with _candado:
+        _contadores[clave] = _contadores.get(clave, 0) + valor
+
+
+def _observar(nombre, etiquetas, segundos):
+    clave = _clave(nombre, etiquetas)
+    with _candado:
+        histograma = _histogramas.get(clave)
+        if histograma is None:
+            histograma = _histogramas[clave] = {'cubetas': [0] * len(LIMITES_HISTOGRAMA), 'suma': 0.0,
+                                                'conteo': 0, 'maximo': 0.0}
+        for i, limite in enumerate(LIMITES_HISTOGRAMA):
+            if segundos <= limite:
+                histograma['cubetas'][i] += 1
+        histograma['suma'] += segundos
+        histograma['conteo'] += 1
+        histograma['maximo'] = max(histograma['maximo'], segundos)
+
+
+def resumen():
+    """
+    Retorna los contadores y los spans agregados hasta el momento.
+
+    Retorna:
+    - dict: `contadores` y `spans` (conteo, suma, máximo y media de segundos), cada uno como una
+      lista de dicts con `nombre` y `etiquetas`.
+    """
+    with _candado:
+        contadores = [{'nombre': nombre, 'etiquetas': dict(etiquetas), 'valor': valor}
+                      for (nombre, etiquetas), valor in _contadores.items()]
+        spans = [{'nombre': nombre, 'etiquetas': dict(etiquetas), 'conteo': h['conteo'], 'segundos': h['suma'],
+                  'maximo': h['maximo'], 'media': h['suma'] / h['conteo']}
+                 for (nombre, etiquetas), h in _histogramas.items()]
+    return {'contadores': contadores, 'spans': spans}
+
+
+def _nombre_metrica(prefijo, nombre):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', f'{prefijo}_{nombre}' if prefijo else nombre)
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _texto_etiquetas(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ''
+    # En los valores se escapan la barra invertida, las comillas y los saltos de línea
+    valores = ','.join(f'{re.sub(r"[^a-zA-Z0-9_]", "_", k)}="{_escapar(v)}"' for k, v in pares)
+    return '{' + valores + '}'
+
+
+def texto_prometheus(prefijo=None):
+    """
+    Contadores (`<prefijo>_<nombre>_total`) e histogramas de duración (`<prefijo>_<nombre>_segundos`)
+    en el formato de texto de Prometheus.
+    """
+    prefijo = _estado.prefijo if prefijo is None else prefijo
+    with _candado:
+        contadores = sorted(_contadores.items())
+        histogramas = sorted((clave, dict(h, cubetas=list(h['cubetas']))) for clave, h in _histogramas.items())
+    lineas = []
+    ultimo = None
+    for (nombre, etiquetas), valor in contadores:
+        metrica = _nombre_metrica(prefijo, nombre) + '_total'
+        if metrica != ultimo:
+            lineas.append(f'# TYPE {metrica} counter')
+            ultimo = metrica
+        lineas.append(f'{metrica}{_texto_etiquetas(etiquetas)} {valor}')
+    for (nombre, etiquetas), histograma in histogramas:
+        metrica = _nombre_metrica(prefijo, nombre) + '_segundos'
+        if metrica != ultimo:
+            lineas.append(f'# TYPE {metrica} histogram')
+            ultimo = metrica
+        for limite, conteo in zip(LIMITES_HISTOGRAMA, histograma['cubetas']):
+            lineas.append(f'{metrica}_bucket{_texto_etiquetas(etiquetas, [("le", str(limite))])} {conteo}')
+        lineas.append(f'{metrica}_bucket{_texto_etiquetas(etiquetas, [("le", "+Inf")])} {histograma["conteo"]}')
+        lineas.append(f'{metrica}_sum{_texto_etiquetas(etiquetas)} {histograma["suma"]}')
+        lineas.append(f'{metrica}_count{_texto_etiquetas(etiquetas)} {histograma["conteo"]}')
+    return '\n'.join(lineas) + '\n'
+
+
+def exportar_prometheus(ruta, prefijo=None):
+    """
+    Escribe `texto_prometheus()` en `ruta`. El archivo se reemplaza de forma atómica para que el
+    textfile collector nunca lea un archivo a medias.
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f'.{ruta.name}.{os.getpid()}.tmp')
+    temporal.write_text(texto_prometheus(prefijo), encoding='utf-8')
+    os.replace(temporal, ruta)
+
+
+def reiniciar():
+    """
+    Borra los contadores y los histogramas acumulados.
+    """
+    with _candado:
+        _contadores.clear()
+        _histogramas.clear()
+
+
+def activar(ruta_jsonl=None, ruta_prometheus=None, perfil=None, etapas_perfil=None, dir_perfiles=None,
+            prefijo='arriendos'):
+    """
+    Activa la instrumentación.
+
+    Parámetros:
+    - ruta_jsonl (str | Path): Archivo JSON lines al que se agregan los eventos. None no escribe eventos.
+    - ruta_prometheus (str | Path): Archivo de texto de Prometheus que se escribe al desactivar (y al
+      terminar el proceso). None no lo escribe.
+    - perfil (str): 'cprofile' o 'tracemalloc' para perfilar las etapas. None no perfila.
+    - etapas_perfil (iterable[str]): Nombres de las etapas a perfilar. Por defecto todas.
+    - dir_perfiles (str | Path): Carpeta de los .prof de cProfile. Por defecto `perfiles/` junto al
+      archivo JSON lines (o en el directorio actual).
+    - prefijo (str): Prefijo de los nombres de las métricas de Prometheus.
+    """
+    if perfil is not None and perfil not in PERFILES:
+        raise ValueError(f"Perfil desconocido: {perfil}. Opciones: {', '.join(PERFILES)}")
+    desactivar()
+    if ruta_jsonl is not None:
+        Path(ruta_jsonl).parent.mkdir(parents=True, exist_ok=True)
+        _estado.archivo_jsonl = open(ruta_jsonl, 'a', encoding='utf-8', buffering=1)
+    _estado.ruta_prometheus = ruta_prometheus
+    _estado.prefijo = prefijo
+    _estado.perfil = perfil
+    _estado.etapas_perfil = set(etapas_perfil) if etapas_perfil else None
+    _estado.dir_perfiles = dir_perfiles or (Path(ruta_jsonl).parent if ruta_jsonl else Path('.')) / 'perfiles'
+    _estado.activa = True
+
+
+def desactivar():
+    """
+    Desactiva la instrumentación, agrega el resumen al archivo JSON lines y escribe el archivo de
+    Prometheus si se configuraron. Los acumulados se conservan hasta `reiniciar`.
+    """
+    if not _estado.activa:
+        return
+    _estado.activa = False
+    _escribir_evento({'tipo': 'resumen', 'pid': os.getpid(), 'fin': time.time(), **resumen()})
+    if _estado.ruta_prometheus is not None:
+        exportar_prometheus(_estado.ruta_prometheus)
+    if _estado.archivo_jsonl is not None:
+        _estado.archivo_jsonl.close()
+        _estado.archivo_jsonl = None
+    # tracemalloc solo se detiene si lo inició este módulo
+    if _estado.inicio_tracemalloc:
+        tracemalloc.stop()
+        _estado.inicio_tracemalloc = False
+
+
+def esta_activa():
+    return _estado.activa
+
+
+atexit.register(desactivar)
+
+# Activación sin cambiar el código: INSTRUMENTACION_DIR=metricas python -m src.preprocessing
+if os.environ.get('INSTRUMENTACION_DIR'):
+    activar(Path(os.environ['INSTRUMENTACION_DIR']) / f'eventos-{os.getpid()}.jsonl',
+            Path(os.environ['INSTRUMENTACION_DIR']) / f'metricas-{os.getpid()}.prom',
+            perfil=os.environ.get('INSTRUMENTACION_PERFIL') or None)
@@ -0,0 +1,152 @@
+import json
+import re
+import unicodedata
+from functools import reduce
+from operator import or_
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick es opcional; sin él se usa la expresión regular
+    ahocorasick = None
+
+# Vocabulario por defecto: sinónimos por categoría y condiciones del inmueble
+RUTA_VOCABULARIO = Path(__file__).resolve().parent / 'keyword_vocabulary.json'
+
+
+def normalizar_frase(texto):
+    """
+    Minúsculas, sin tildes y sin signos de puntuación (igual que la descripción normalizada).
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("utf-8")
+    return re.sub(r'[^\w\s]', '', texto)
+
+
+def cargar_vocabulario(ruta=RUTA_VOCABULARIO):
+    """
+    Lee el vocabulario de palabras clave.
+
+    El archivo JSON tiene dos secciones: `sinonimos` ({categoría: [frases]}) y `condiciones`
+    ([frases]); cada condición es su propia categoría.
+
+    Retorna:
+    - dict: Frases por categoría, en el orden del archivo.
+    """
+    with open(ruta, encoding='utf-8') as archivo:
+        datos = json.load(archivo)
+    vocabulario = dict(datos.get('sinonimos', {}))
+    for condicion in datos.get('condiciones', []):
+        vocabulario[condicion] = [condicion]
+    return vocabulario
+
+
+def leer_condiciones(ruta=RUTA_VOCABULARIO):
+    """
+    Retorna las frases de la sección `condiciones` del vocabulario.
+    """
+    with open(ruta, encoding='utf-8') as archivo:
+        return list(json.load(archivo).get('condiciones', []))
+
+
+def patron_trie(frases):
+    """
+    Construye una expresión regular con forma de trie: las frases que comparten prefijo comparten
+    también la rama de la expresión, así que en cada posición del texto el costo depende de la
+    longitud de la frase y no del número de frases. En cada posición se encuentra la frase más larga.
+    """
+    trie = {}
+    for frase in frases:
+        nodo = trie
+        for caracter in frase:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[''] = {}
+
+    def convertir(nodo):
+        terminal = '' in nodo
+        ramas = [re.escape(caracter) + convertir(hijo) for caracter, hijo in sorted(nodo.items()) if caracter]
+        if not ramas:
+            return ''
+        cuerpo = ramas[0] if len(ramas) == 1 else '(?:' + '|'.join(ramas) + ')'
+        if terminal:
+            return '(?:' + cuerpo + ')?'
+        return cuerpo
+
+    return convertir(trie)
+
+
+class DetectorPalabrasClave:
+    """
+    Marca todas las categorías de un vocabulario en una sola pasada sobre cada texto.
+
+    Las frases de todas las categorías se compilan en un autómata de Aho-Corasick (si `pyahocorasick`
+    está instalado) que detecta las apariciones en cualquier posición, también dentro de otras
+    palabras, como `palabra in texto`. Sin `pyahocorasick` se usa una única expresión con forma de
+    trie dentro de un lookahead; como en cada posición esta reporta la frase más larga, cada frase
+    lleva también las categorías de las frases que son prefijo suyo.
+
+    Parámetros:
+    - vocabulario (dict): Frases por categoría (ver `cargar_vocabulario`). Por defecto el archivo
+      `keyword_vocabulary.json`.
+    """
+
+    def __init__(self, vocabulario=None):
+        vocabulario = cargar_vocabulario() if vocabulario is None else vocabulario
+        self.categorias = list(vocabulario)
+        if len(self.categorias) > 64:
+            raise ValueError("El detector admite como máximo 64 categorías")
+
+        # Las frases se usan tal como están en el vocabulario, como en el notebook: deben escribirse
+        # ya normalizadas (ver `normalizar_frase`); una frase con mayúsculas o tildes nunca coincide
+        # con el texto normalizado (p. ej. "Penthouse")
+        mascaras = {}
+        for i, (categoria, frases) in enumerate(vocabulario.items()):
+            for frase in frases:
+                if frase:
+                    mascaras[frase] = mascaras.get(frase, 0) | (1 << i)
+
+        # Categorías de cada frase más las de las frases que son prefijo suyo
+        self.mascaras = {
+            frase: reduce(or_, (m for otra, m in mascaras.items() if frase.startswith(otra)))
+            for frase in mascaras
+        }
+        self.expresion = re.compile('(?=(' + patron_trie(sorted(mascaras)) + '))') if mascaras else None
+
+        # Autómata de Aho-Corasick: reporta todas las apariciones (también solapadas) en una pasada
+        self.automata = None
+        if ahocorasick is not None and mascaras:
+            self.automata = ahocorasick.Automaton()
+            for frase, mascara in mascaras.items():
+                self.automata.add_word(frase, mascara)
+            self.automata.make_automaton()
+
+    def mascara(self, texto):
+        """
+        Retorna las categorías presentes en el texto normalizado como un entero de bits.
+        """
+        if self.expresion is None or not isinstance(texto, str):
+            return 0
+        mascara = 0
+        if self.automata is not None:
+            for _, mascara_frase in self.automata.iter(texto):
+                mascara |= mascara_frase
+            return mascara
+        # findall recorre el texto en C; solo se combinan las frases distintas encontradas
+        for frase in set(self.expresion.findall(texto)):
+            mascara |= self.mascaras[frase]
+        return mascara
+
+    def banderas(self, textos):
+        """
+        Retorna la matriz (textos x categorías) de banderas en uint8.
+        """
+        mascaras = np.fromiter((self.mascara(texto) for texto in textos), dtype=np.uint64)
+        bits = np.arange(len(self.categorias), dtype=np.uint64)
+        return ((mascaras[:, None] >> bits) & np.uint64(1)).astype(np.uint8)
+
+    def banderas_empaquetadas(self, textos):
+        """
+        Igual que `banderas` pero con 8 categorías por byte (`np.packbits` por fila).
+        """
+        return np.packbits(self.banderas(textos), axis=1)
@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from .data_collection import (CAMPOS_DETALLE, URL_BUSQUEDA, extraer_todas_propiedades_concurrente,
+                              obtener_todas_las_propiedades_concurrente)
+from .dedup import representantes
+from .rutas import DIR_DATOS_CRUDOS
+
+# Campos de `extraer_detalles_completos` que son listas o diccionarios y se guardan como JSON
+CAMPOS_JSON = ["imagenes", "facilidades", "redes_sociales"]
+
+# Checkpoint propio de las actualizaciones incrementales: el de `data_collection.main` guarda el
+# avance de una descarga completa y no se debe reanudar ni borrar desde aquí
+RUTA_CHECKPOINT = DIR_DATOS_CRUDOS / "propiedades_fincaraiz_incremental.jsonl"
+
+# Columnas de control del almacén
+ESTADO_ACTIVO = "activo"
+ESTADO_DESLISTADO = "deslistado"
+
+
+def abrir_almacen(ruta_almacen):
+    """
+    Abre (o crea) el almacén local de propiedades en SQLite.
+
+    La tabla `propiedades` tiene una columna por cada campo de `extraer_detalles_completos`, con
+    `id` como llave primaria, más las columnas de control `estado_listado`, `visto_primera_vez`,
+    `visto_ultima_vez` y `fecha_deslistado`.
+
+    Parámetros:
+    - ruta_almacen (str): Ruta del archivo SQLite.
+
+    Retorna:
+    - sqlite3.Connection: Conexión al almacén.
+    """
+    conexion = sqlite3.connect(ruta_almacen)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    columnas = ", ".join(f'"{campo}"' for campo in CAMPOS_DETALLE if campo != "id")
+    conexion.execute(f'''
+        CREATE TABLE IF NOT EXISTS propiedades (
+            id TEXT PRIMARY KEY,
+            {columnas},
+            estado_listado TEXT NOT NULL DEFAULT '{ESTADO_ACTIVO}',
+            visto_primera_vez TEXT,
+            visto_ultima_vez TEXT,
+            fecha_deslistado TEXT
+        )''')
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_propiedades_estado ON propiedades (estado_listado)")
+    conexion.commit()
+    return conexion
+
+
+def ids_a_actualizar(conexion, resumen):
+    """
+    Selecciona los ids del resumen que necesitan descargar sus detalles.
+
+    Un id se descarga si no está en el almacén, si su `fecha_actualizacion` cambió o si estaba
+    marcado como deslistado y volvió a aparecer.
+
+    Parámetros:
+    - conexion (sqlite3.Connection): Conexión creada con `abrir_almacen`.
+    - resumen (pd.DataFrame): Propiedades de `obtener_todas_las_propiedades` (columnas 'id' y 'fecha_actualizacion').
+
+    Retorna:
+    - list: Ids a descargar, en el orden del resumen.
+    """
+    guardados = {
+        id: (fecha, estado)
+        for id, fecha, estado in conexion.execute(
+            "SELECT id, fecha_actualizacion, estado_listado FROM propiedades")
+    }
+    pendientes = []
+    for id, fecha in zip(resumen['id'], resumen['fecha_actualizacion']):
+        guardado = guardados.get(str(id))
+        if guardado is None or guardado[0] != fecha or guardado[1] != ESTADO_ACTIVO:
+            pendientes.append(id)
+    return list(dict.fromkeys(pendientes))
+
+
+def guardar_detalles(conexion, detalles, fecha=None):
+    """
+    Inserta o actualiza registros de `extraer_detalles_completos` en el almacén.
+
+    Parámetros:
+    - conexion (sqlite3.Connection): Conexión creada con `abrir_almacen`.
+    - detalles (list[dict]): Registros a guardar.
+    - fecha (str): Fecha de la actualización (ISO). Por defecto la fecha actual.
+
+    Retorna:
+    - int: Número de registros guardados.
+    """
+    fecha = fecha or datetime.now().isoformat(timespec='seconds')
+    columnas = [campo for campo in CAMPOS_DETALLE if campo != "id"]
+    nombres = ", ".join(f'"{campo}"' for campo in columnas)
+    asignaciones = ", ".join(f'"{campo}" = excluded."{campo}"' for campo in columnas)
+    filas = []
+    for detalle in detalles:
+        valores = [json.dumps(detalle.get(campo), ensure_ascii=False) if campo in CAMPOS_JSON else detalle.get(campo)
+                   for campo in columnas]
+        filas.append([str(detalle["id"]), *valores, fecha, fecha])
+
+    with conexion:
+        conexion.executemany(f'''
+            INSERT INTO propiedades (id, {nombres}, visto_primera_vez, visto_ultima_vez)
+            VALUES ({", ".join("?" * (len(columnas) + 3))})
+            ON CONFLICT (id) DO UPDATE SET {asignaciones},
+                estado_listado = '{ESTADO_ACTIVO}',
+                visto_ultima_vez = excluded.visto_ultima_vez,
+                fecha_deslistado = NULL''', filas)
+    return len(filas)
+
+
+def marcar_vistos(conexion, ids, fecha=None, deslistar=True):
+    """
+    Actualiza `visto_ultima_vez` de las propiedades que siguen publicadas y marca como deslistadas
+    las propiedades activas que ya no aparecen en la API.
+
+    Parámetros:
+    - conexion (sqlite3.Connection): Conexión creada con `abrir_almacen`.
+    - ids (iterable): Ids presentes en el último resumen.
+    - fecha (str): Fecha de la actualización (ISO). Por defecto la fecha actual.
+    - deslistar (bool): Si es False solo se actualiza `visto_ultima_vez` (para resúmenes incompletos).
+
+    Retorna:
+    - int: Número de propiedades marcadas como deslistadas.
+    """
+    fecha = fecha or datetime.now().isoformat(timespec='seconds')
+    with conexion:
+        conexion.execute("CREATE TEMP TABLE IF NOT EXISTS ids_vigentes (id TEXT PRIMARY KEY)")
+        conexion.execute("DELETE FROM ids_vigentes")
+        conexion.executemany("INSERT OR IGNORE INTO ids_vigentes VALUES (?)", ((str(id),) for id in ids))
+        conexion.execute("""
+            UPDATE propiedades SET visto_ultima_vez = ?
+            WHERE id IN (SELECT id FROM ids_vigentes)""", (fecha,))
+        if not deslistar:
+            return 0
+        cursor = conexion.execute(f"""
+            UPDATE propiedades SET estado_listado = '{ESTADO_DESLISTADO}', fecha_deslistado = ?
+            WHERE estado_listado = '{ESTADO_ACTIVO}' AND id NOT IN (SELECT id FROM ids_vigentes)""", (fecha,))
+    return cursor.rowcount
+
+
+def leer_propiedades(conexion, incluir_deslistados=False):
+    """
+    Lee las propiedades del almacén con el mismo formato de `extraer_detalles_completos`.
+
+    Parámetros:
+    - conexion (sqlite3.Connection): Conexión creada con `abrir_almacen`.
+    - incluir_deslistados (bool): Si es True también retorna las propiedades deslistadas.
+
+    Retorna:
+    - pd.DataFrame: Propiedades con las columnas de `CAMPOS_DETALLE` y las columnas de control.
+    """
+    consulta = "SELECT * FROM propiedades"
+    if not incluir_deslistados:
+        consulta += f" WHERE estado_listado = '{ESTADO_ACTIVO}'"
+    propiedades = pd.read_sql_query(consulta, conexion)
+    for campo in CAMPOS_JSON:
+        propiedades[campo] = propiedades[campo].map(lambda valor: json.loads(valor) if valor else None)
+    return propiedades
+
+
+def exportar_csv(conexion, ruta_csv):
+    """
+    Escribe las propiedades activas en el formato de `propiedades_fincaraiz_completas.csv`.
+    """
+    propiedades = leer_propiedades(conexion)[CAMPOS_DETALLE]
+    propiedades.to_csv(ruta_csv, sep=';', index=False, encoding='utf-8-sig')
+
+
+def actualizar_incremental(ruta_almacen, url=URL_BUSQUEDA, ruta_checkpoint=None, deduplicar=True, **kwargs):
+    """
+    Actualiza el almacén descargando solo los detalles de propiedades nuevas o modificadas.
+
+    Recorre el resumen de todas las ciudades, compara cada id y su `fecha_actualizacion` con el
+    almacén, descarga los detalles pendientes y marca como deslistadas las propiedades que ya no
+    aparecen. Si alguna ciudad no se recorrió hasta una página vacía (por una página fallida o por
+    llegar a `MAX_PAGINAS`), el resumen está incompleto y no se deslista ninguna propiedad. Con `deduplicar`, los anuncios del resumen se agregan al índice de duplicados del
+    mismo almacén (ver `dedup.agrupar_duplicados`) y no se descargan los pendientes que son copia
+    de otro anuncio publicado; si ese anuncio se deslista, la copia se descarga en la siguiente
+    actualización.
+
+    Parámetros:
+    - ruta_almacen (str): Ruta del archivo SQLite.
+    - url (str): URL de la API de búsqueda.
+    - ruta_checkpoint (str): Checkpoint para `extraer_todas_propiedades_concurrente`. Se borra al
+      terminar, así que no debe ser el de una descarga completa (ver `RUTA_CHECKPOINT`).
+    - deduplicar (bool): Si es True no se descargan los anuncios casi duplicados.
+    - **kwargs: Argumentos adicionales para `extraer_todas_propiedades_concurrente`.
+
+    Retorna:
+    - dict: Estadísticas de la actualización (`resumen`, `pendientes`, `duplicados`, `guardados`,
+      `deslistados`, `fallidos`, `ciudades_incompletas`).
+    """
+    conexion = abrir_almacen(ruta_almacen)
+    try:
+        recorrido = {}
+        resumen = pd.DataFrame(obtener_todas_las_propiedades_concurrente(url=url, estadisticas=recorrido))
+        incompletas = recorrido.get("ciudades_fallidas", []) + recorrido.get("ciudades_truncadas", [])
+        if resumen.empty:
+            # Sin resumen no se puede distinguir una caída de la API de propiedades deslistadas
+            print("El resumen llegó vacío; no se modifica el almacén.")
+            return {"resumen": 0, "pendientes": 0, "duplicados": 0, "guardados": 0, "deslistados": 0, "fallidos": 0,
+                    "ciudades_incompletas": incompletas}
+
+        pendientes = ids_a_actualizar(conexion, resumen)
+        print(f"{len(pendientes)} de {len(resumen)} propiedades son nuevas o cambiaron.")
+        duplicados = 0
+        if deduplicar and pendientes:
+            unicos = representantes(conexion, resumen)
+            unicos = set(resumen.loc[unicos, 'id'].astype(str))
+            duplicados = sum(str(id) not in unicos for id in pendientes)
+            pendientes = [id for id in pendientes if str(id) in unicos]
+            print(f"{duplicados} pendientes son duplicados de otro anuncio publicado y no se descargan.")
+        detalles, estadisticas = extraer_todas_propiedades_concurrente(
+            pendientes, url=url, ruta_checkpoint=ruta_checkpoint, **kwargs)
+        # Solo se guardan los registros de los pendientes de esta ejecución, aunque el checkpoint
+        # tenga otros de una ejecución anterior
+        ids_pendientes = set(map(str, pendientes))
+        detalles = [registro for registro in detalles if str(registro.get('id')) in ids_pendientes]
+
+        fecha = datetime.now().isoformat(timespec='seconds')
+        guardados = guardar_detalles(conexion, detalles, fecha)
+        # Una ciudad incompleta dejaría fuera del resumen anuncios que siguen publicados
+        if incompletas:
+            print(f"El resumen está incompleto ({', '.join(incompletas)}); no se deslistan propiedades.")
+        deslistados = marcar_vistos(conexion, resumen['id'], fecha, deslistar=not incompletas)
+        print(f"Guardados {guardados} registros; {deslistados} propiedades deslistadas.")
+
+        # El checkpoint solo sirve para reanudar esta ejecución; los registros ya están en el almacén
+        if ruta_checkpoint and os.path.exists(ruta_checkpoint):
+            os.remove(ruta_checkpoint)
+    finally:
+        conexion.close()
+
+    return {
+        "resumen": len(resumen),
+        "pendientes": len(pendientes),
+        "duplicados": duplicados,
+        "guardados": guardados,
+        "deslistados": deslistados,
+        "fallidos": estadisticas["fallidos"],
+        "ciudades_incompletas": incompletas,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Actualiza el almacén local de propiedades de forma incremental')
+    parser.add_argument('--almacen', default=str(DIR_DATOS_CRUDOS / 'propiedades_fincaraiz.sqlite'))
+    parser.add_argument('--checkpoint', default=str(RUTA_CHECKPOINT),
+                        help='Checkpoint de la descarga de detalles pendientes (se borra al terminar)')
+    parser.add_argument('--csv', default=str(DIR_DATOS_CRUDOS / 'propiedades_fincaraiz_completas.csv'),
+                        help='CSV exportado para la limpieza')
+    parser.add_argument('--sin-deduplicar', action='store_true',
+                        help='Descargar también los anuncios casi duplicados')
+    args = parser.parse_args(argv)
+
+    actualizar_incremental(args.almacen, ruta_checkpoint=args.checkpoint, deduplicar=not args.sin_deduplicar)
+    conexion = abrir_almacen(args.almacen)
+    exportar_csv(conexion, args.csv)
+    conexion.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Modelos predictivos: regresión lineal, Random Forest y red neuronal, con su preprocesamiento,
+registro, entrenamiento, búsqueda de hiperparámetros y servicio de predicción.
+"""
@@ -0,0 +1,399 @@
+import argparse
+import time
+
+from ..instrumentation import medir
+from .dataset import evaluate_model, load_data, split_data
+from .registry import load_artifacts, save_artifacts
+
+# Random Forest compacto para inferencia: los árboles ajustados de scikit-learn se copian a arreglos
+# planos y contiguos (característica, umbral, hijos y valor por nodo) que se recorren por lotes con
+# NumPy. numpy y scikit-learn se importan dentro de las funciones
+###--------------------------------------------------###
+
+# Profundidades máximas y tamaños de subconjunto que se comparan en el reporte
+REPORT_DEPTHS = (None, 24, 18, 14, 10)
+REPORT_TREE_COUNTS = (100, 50, 25, 10)
+
+# Filas recorridas a la vez (acota la memoria de los índices de nodo: filas x árboles)
+PREDICT_BLOCK_ROWS = 8192
+
+
+def _float32_thresholds(thresholds):
+    # Mayor float32 <= umbral: para x en float32, x <= umbral si y solo si x <= ese valor, así que
+    # el recorrido en float32 toma las mismas ramas que scikit-learn (que también usa X en float32)
+    import numpy as np
+
+    rounded = thresholds.astype(np.float32)
+    above = rounded > thresholds
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _compact_tree(tree, max_depth=None, min_samples_leaf=1):
+    """
+    Nodos de un árbol de scikit-learn que sobreviven a la poda, en arreglos planos.
+
+    Un nodo se vuelve hoja si ya está a `max_depth` o si alguno de sus hijos tiene menos de
+    `min_samples_leaf` muestras (con el peso del bootstrap). Su valor es la media de sus muestras,
+    que scikit-learn ya guarda en todos los nodos, así que la poda no necesita los datos. Los nodos
+    quedan en preorden, así que el hijo izquierdo de un nodo interno es el nodo siguiente y solo se
+    guarda el derecho; las hojas tienen característica -1.
+
+    Retorna:
+    - tuple: (feature, threshold, right, value, profundidad) con índices locales al árbol.
+    """
+    import numpy as np
+
+    t = tree.tree_
+    left, right = t.children_left, t.children_right
+    weights = t.weighted_n_node_samples
+    leaf = left < 0
+    kept, frontier, depth = [], np.array([0]), 0
+    # Recorrido por niveles: decide qué nodos del nivel son hojas y baja solo por los internos
+    while len(frontier):
+        kept.append(frontier)
+        internal = frontier[~leaf[frontier]]
+        if max_depth is not None and depth >= max_depth:
+            internal = internal[:0]
+        if min_samples_leaf > 1:
+            internal = internal[np.minimum(weights[left[internal]], weights[right[internal]]) >= min_samples_leaf]
+        leaf[np.setdiff1d(frontier, internal)] = True
+        frontier = np.concatenate([left[internal], right[internal]])
+        depth += 1
+
+    # Los padres tienen índices menores que sus hijos: ordenar conserva el preorden del árbol
+    nodes = np.sort(np.concatenate(kept))
+    new_index = np.full(t.node_count, -1, dtype=np.int32)
+    new_index[nodes] = np.arange(len(nodes), dtype=np.int32)
+    is_leaf = leaf[nodes]
+    internal = nodes[~is_leaf]
+    if (new_index[left[internal]] != new_index[internal] + 1).any():
+        raise ValueError("El árbol no está en preorden (hijo izquierdo = nodo siguiente)")
+    return (np.where(is_leaf, -1, t.feature[nodes]),
+            _float32_thresholds(np.where(is_leaf, 0.0, t.threshold[nodes])),
+            np.where(is_leaf, -1, new_index[right[nodes]]),
+            t.value[nodes].reshape(-1),
+            depth - 1)
+
+
+class CompactForest:
+    """
+    Random Forest de regresión guardado como arreglos planos (todos los árboles concatenados).
+
+    Cada nodo ocupa 14 bytes (característica int16, umbral float32, hijo derecho int32 y valor
+    float32; el hijo izquierdo es el nodo siguiente), frente a unos 72 de un nodo de scikit-learn.
+    `predict` recorre todos los pares (fila, árbol) de un bloque a la vez: en cada nivel compara la
+    característica de cada par con el umbral de su nodo y baja al hijo correspondiente, y los
+    pares que llegan a una hoja salen del conjunto activo, así que cada nivel solo trabaja con las
+    ramas que siguen abiertas.
+
+    Los valores en float32 cambian las predicciones de `precio_log` en menos de 1e-5 frente al
+    bosque original; con la misma poda y los mismos árboles las ramas son las mismas.
+    """
+
+    def __init__(self, feature, threshold, right, value, roots, depths, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depths = depths
+        self.n_features = n_features
+
+    @classmethod
+    def from_forest(cls, forest, max_depth=None, min_samples_leaf=1, trees=None):
+        """
+        Convierte un `RandomForestRegressor` ajustado.
+
+        Parámetros:
+        - forest (RandomForestRegressor): Bosque ajustado.
+        - max_depth (int): Profundidad máxima de los árboles (None sin poda por profundidad).
+        - min_samples_leaf (int): Muestras mínimas por hoja al podar.
+        - trees (list[int]): Índices de los árboles a conservar (por defecto todos).
+
+        Retorna:
+        - CompactForest: Bosque compacto.
+        """
+        import numpy as np
+
+        estimators = forest.estimators_ if trees is None else [forest.estimators_[i] for i in trees]
+        parts = [_compact_tree(tree, max_depth, min_samples_leaf) for tree in estimators]
+        sizes = np.array([len(part[0]) for part in parts])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        feature_dtype = np.int16 if forest.n_features_in_ < 2 ** 15 else np.int32
+        # Índices de los hijos derechos pasan a ser globales (las hojas conservan -1)
+        right = [np.where(part[2] >= 0, part[2] + offset, -1) for part, offset in zip(parts, offsets)]
+        return cls(
+            feature=np.concatenate([part[0] for part in parts]).astype(feature_dtype),
+            threshold=np.concatenate([part[1] for part in parts]),
+            right=np.concatenate(right).astype(np.int32),
+            value=np.concatenate([part[3] for part in parts]).astype(np.float32),
+            roots=offsets,
+            depths=np.array([part[4] for part in parts], dtype=np.int32),
+            n_features=forest.n_features_in_,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ('feature', 'threshold', 'right', 'value', 'roots',
+                                                              'depths'))
+
+    def leaves(self, X):
+        """
+        Hoja alcanzada por cada fila en cada árbol.
+
+        Retorna:
+        - np.ndarray: Índices globales de nodo, de forma (filas, árboles).
+        """
+        import numpy as np
+
+        X = np.ascontiguousarray(X.toarray() if hasattr(X, 'toarray') else X, dtype=np.float32)
+        n_rows, n_columns = X.shape
+        values = X.ravel()
+        leaves = np.empty(n_rows * self.n_trees, dtype=np.int32)
+        # Pares (fila, árbol) activos: posición en el resultado, nodo actual e inicio de la fila en X
+        active = np.arange(n_rows * self.n_trees)
+        nodes = np.tile(self.roots, n_rows)
+        row_start = np.repeat(np.arange(n_rows) * n_columns, self.n_trees)
+        while len(active):
+            feature = self.feature[nodes]
+            done = feature < 0
+            if done.any():
+                leaves[active[done]] = nodes[done]
+                keep = ~done
+                active, nodes, row_start, feature = active[keep], nodes[keep], row_start[keep], feature[keep]
+            go_left = values[row_start + feature] <= self.threshold[nodes]
+            nodes = np.where(go_left, nodes + 1, self.right[nodes])
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def predict_trees(self, X):
+        # Predicción de cada árbol, de forma (filas, árboles)
+        return self.value[self.leaves(X)]
+
+    def predict(self, X):
+        """
+        Media de los árboles, como `RandomForestRegressor.predict`, por bloques de filas.
+        """
+        import numpy as np
+
+        predictions = np.empty(X.shape[0], dtype=np.float64)
+        with medir('prediccion', modelo='random_forest_compact'):
+            for start in range(0, X.shape[0], PREDICT_BLOCK_ROWS):
+                block = X[start:start + PREDICT_BLOCK_ROWS]
+                predictions[start:start + PREDICT_BLOCK_ROWS] = self.predict_trees(block).mean(axis=1,
+                                                                                              dtype=np.float64)
+        return predictions
+
+
+def out_of_bag_predictions(forest, X_train):
+    """
+    Predicción de cada árbol sobre las filas de entrenamiento que quedaron fuera de su bootstrap.
+
+    Retorna:
+    - tuple: (predicciones de forma (filas, árboles), máscara booleana out-of-bag de la misma forma)
+    """
+    import numpy as np
+
+    if not forest.bootstrap:
+        raise ValueError("La selección de árboles usa las filas out-of-bag y requiere bootstrap=True")
+    predictions = CompactForest.from_forest(forest).predict_trees(X_train)
+    oob = np.ones(predictions.shape, dtype=bool)
+    for i, samples in enumerate(forest.estimators_samples_):
+        oob[samples, i] = False
+    return predictions, oob
+
+
+def greedy_tree_order(predictions, oob, y):
+    """
+    Ordena los árboles agregando en cada paso el que más reduce el error out-of-bag del subconjunto.
+
+    El error de un subconjunto es el MSE, sobre las filas que están fuera del bootstrap de al menos
+    uno de sus árboles, de la media de esos árboles. Así no se eligen árboles con filas que ya
+    vieron al ajustarse. Cualquier prefijo del orden es el subconjunto elegido de ese tamaño.
+
+    Retorna:
+    - list[int]: Índices de los árboles en orden de selección.
+    """
+    import numpy as np
+
+    y = np.asarray(y, dtype=np.float64)
+    masked = np.where(oob, predictions, 0.0)
+    counts = oob.astype(np.float64)
+    total, count = np.zeros(len(y)), np.zeros(len(y))
+    order, remaining = [], list(range(predictions.shape[1]))
+    while remaining:
+        candidate_total = total[:, None] + masked[:, remaining]
+        candidate_count = count[:, None] + counts[:, remaining]
+        covered = candidate_count > 0
+        errors = np.where(covered, (candidate_total / np.maximum(candidate_count, 1) - y[:, None]) ** 2, 0.0)
+        mse = errors.sum(axis=0) / np.maximum(covered.sum(axis=0), 1)
+        best = remaining.pop(int(np.argmin(mse)))
+        order.append(best)
+        total += masked[:, best]
+        count += counts[:, best]
+    return order
+
+
+def one_row_latency_ms(model, X, repetitions=100):
+    # Mediana de la latencia de predecir una fila, en milisegundos
+    import numpy as np
+
+    times = []
+    for i in range(repetitions):
+        row = X[i % X.shape[0]:i % X.shape[0] + 1]
+        start = time.perf_counter()
+        model.predict(row)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def compress_forest(forest, X_train, y_train, max_depth=None, min_samples_leaf=1, max_mb=None,
+                    max_latency_ms=None, order=None):
+    """
+    Bosque compacto con poda opcional y el mayor subconjunto de árboles dentro del presupuesto.
+
+    Los árboles se agregan en el orden de `greedy_tree_order` (calculado con las filas out-of-bag de
+    `X_train`) mientras el tamaño de los arreglos no pase de `max_mb` y la latencia de una fila no
+    pase de `max_latency_ms`. El tamaño se calcula exacto para cada prefijo; la latencia se mide, y
+    como crece con el número de árboles se busca el prefijo por bisección.
+
+    Parámetros:
+    - forest (RandomForestRegressor): Bosque ajustado.
+    - X_train (array): Matriz transformada con la que se ajustó el bosque (mismo orden de filas).
+    - y_train (array): Objetivo de entrenamiento (`precio_log`).
+    - max_depth (int): Profundidad máxima de los árboles.
+    - min_samples_leaf (int): Muestras mínimas por hoja.
+    - max_mb (float): Presupuesto de memoria de los arreglos, en MB.
+    - max_latency_ms (float): Presupuesto de latencia de una fila, en milisegundos.
+    - order (list[int]): Orden de los árboles ya calculado (evita recalcularlo).
+
+    Retorna:
+    - CompactForest: Bosque compacto dentro del presupuesto (al menos un árbol).
+    """
+    import numpy as np
+
+    if max_mb is None and max_latency_ms is None:
+        return CompactForest.from_forest(forest, max_depth, min_samples_leaf)
+    if order is None:
+        order = greedy_tree_order(*out_of_bag_predictions(forest, X_train), y_train)
+
+    # Bytes por árbol después de la poda; el prefijo más largo que cabe en memoria
+    per_tree = CompactForest.from_forest(forest, max_depth, min_samples_leaf, trees=order)
+    node_bytes = sum(getattr(per_tree, name).itemsize for name in ('feature', 'threshold', 'right', 'value'))
+    sizes = np.diff(np.append(per_tree.roots, per_tree.n_nodes)) * node_bytes + 8
+    n_trees = len(order)
+    if max_mb is not None:
+        n_trees = max(int(np.searchsorted(np.cumsum(sizes), max_mb * 2 ** 20, side='right')), 1)
+
+    def build(k):
+        return CompactForest.from_forest(forest, max_depth, min_samples_leaf, trees=order[:k])
+
+    if max_latency_ms is not None and one_row_latency_ms(build(n_trees), X_train) > max_latency_ms:
+        low, high = 1, n_trees
+        while low < high:
+            middle = (low + high + 1) // 2
+            if one_row_latency_ms(build(middle), X_train) <= max_latency_ms:
+                low = middle
+            else:
+                high = middle - 1
+        n_trees = low
+    return build(n_trees)
+
+
+def compression_report(forest, X_train, y_train, X_test, y_test, depths=REPORT_DEPTHS,
+                       tree_counts=REPORT_TREE_COUNTS, min_samples_leaf=1):
+    """
+    Tamaño, latencia y error en precio del bosque original y de varias versiones compactas.
+
+    Retorna:
+    - list[dict]: Una fila por configuración con MB, latencia de una fila, MAE, RMSE y R².
+    """
+    import pickle
+
+    import numpy as np
+
+    from .dataset import regression_metrics
+
+    y_true = np.expm1(np.asarray(y_test))
+    rows = [{
+        'modelo': 'sklearn', 'arboles': len(forest.estimators_),
+        'profundidad': max(tree.tree_.max_depth for tree in forest.estimators_),
+        'mb': len(pickle.dumps(forest, protocol=pickle.HIGHEST_PROTOCOL)) / 2 ** 20,
+        'ms_una_fila': one_row_latency_ms(forest, X_test),
+        **regression_metrics(y_true, np.expm1(forest.predict(X_test))),
+    }]
+    order = greedy_tree_order(*out_of_bag_predictions(forest, X_train), y_train)
+    for depth in depths:
+        for count in tree_counts:
+            compact = CompactForest.from_forest(forest, depth, min_samples_leaf, trees=order[:count])
+            rows.append({
+                'modelo': 'compacto', 'arboles': compact.n_trees, 'profundidad': int(compact.depths.max()),
+                'mb': compact.nbytes / 2 ** 20, 'ms_una_fila': one_row_latency_ms(compact, X_test),
+                **regression_metrics(y_true, np.expm1(compact.predict(X_test))),
+            })
+    return rows
+
+
+# Pipeline principal: compacta el Random Forest del registro y lo guarda como random_forest_compact
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compacta el Random Forest del registro para inferencia')
+    parser.add_argument('--version', default='latest', help='Versión de random_forest en el registro')
+    parser.add_argument('--max-depth', type=int, help='Profundidad máxima de los árboles')
+    parser.add_argument('--min-samples-leaf', type=int, default=1, help='Muestras mínimas por hoja')
+    parser.add_argument('--max-mb', type=float, help='Presupuesto de memoria del bosque, en MB')
+    parser.add_argument('--max-latency-ms', type=float, help='Presupuesto de latencia de una fila, en ms')
+    parser.add_argument('--report', action='store_true', help='Comparar tamaño y error de varias configuraciones')
+    parser.add_argument('--no-save', action='store_true', help='No guardar el bosque compacto en el registro')
+    args = parser.parse_args(argv)
+
+    import numpy as np
+
+    # Con `python -m` este módulo es __main__; se usa el importable para que el bosque guardado con
+    # joblib se pueda cargar desde cualquier proceso
+    from .compact_forest import compress_forest, compression_report, one_row_latency_ms
+
+    artifact = load_artifacts('random_forest', args.version, mmap_mode=None)
+    preprocessor, forest = artifact.model.named_steps['preprocessor'], artifact.model.named_steps['regressor']
+    # Misma partición con la que se entrenó el modelo del registro (para las filas out-of-bag)
+    X_train, X_test, y_train, y_test = split_data(load_data())
+    X_train_transformed = preprocessor.transform(X_train)
+    X_test_transformed = preprocessor.transform(X_test)
+
+    print("Random Forest original:")
+    evaluate_model(np.expm1(forest.predict(X_test_transformed)), np.expm1(y_test))
+
+    if args.report:
+        rows = compression_report(forest, X_train_transformed, y_train, X_test_transformed, y_test,
+                                  min_samples_leaf=args.min_samples_leaf)
+        print(f"{'modelo':<10}{'árboles':>8}{'prof.':>7}{'MB':>9}{'ms/fila':>9}{'MAE':>12}{'RMSE':>12}{'R2':>8}")
+        for row in rows:
+            print(f"{row['modelo']:<10}{row['arboles']:>8}{row['profundidad']:>7}{row['mb']:>9.1f}"
+                  f"{row['ms_una_fila']:>9.2f}{row['mae']:>12.0f}{row['rmse']:>12.0f}{row['r2']:>8.4f}")
+
+    compact = compress_forest(forest, X_train_transformed, y_train, args.max_depth, args.min_samples_leaf,
+                              args.max_mb, args.max_latency_ms)
+    print(f"Bosque compacto: {compact.n_trees} árboles, profundidad {compact.depths.max()}, "
+          f"{compact.nbytes / 2 ** 20:.1f} MB, {one_row_latency_ms(compact, X_test_transformed):.2f} ms por fila")
+    metrics = evaluate_model(np.expm1(compact.predict(X_test_transformed)), np.expm1(y_test))
+
+    # El preprocesador se guarda aparte: el registro lo aplica antes de `predict`
+    if not args.no_save:
+        params = {'source_version': artifact.version, 'n_trees': compact.n_trees, 'max_depth': args.max_depth,
+                  'min_samples_leaf': args.min_samples_leaf, 'nbytes': compact.nbytes}
+        version = save_artifacts('random_forest_compact', compact, preprocessor=preprocessor,
+                                 features=artifact.features, metrics=metrics, params=params)
+        print(f"Modelo guardado en el registro: random_forest_compact/{version}")
+
+    return compact
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from ..instrumentation import medir
+from ..rutas import DIR_DATOS_PROCESADOS
+
+# pandas, pyarrow y scikit-learn se importan dentro de las funciones: importar los módulos de los
+# modelos no carga ninguna librería pesada (ver la etapa `importacion` de benchmarks/run.py)
+
+# Ruta por defecto del conjunto de datos limpio
+DATA_PATH = DIR_DATOS_PROCESADOS / 'data_arriendos_model.xlsx'
+
+TARGET = 'precio_log'
+CATEGORICAL_FEATURES = ['ciudad', 'antiguedad', 'comuna', 'zona', 'tipo_de_inmueble', 'estado']
+
+
+def file_sha256(filepath, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_paths(filepath, cache_dir=None):
+    filepath = Path(filepath)
+    cache_dir = Path(cache_dir) if cache_dir else filepath.parent / '.cache'
+    return cache_dir / f'{filepath.stem}.feather', cache_dir / f'{filepath.stem}.json'
+
+
+def read_source(filepath):
+    # Lectura original del archivo fuente (xlsx, csv o parquet) y derivación del objetivo
+    import pandas as pd
+
+    filepath = str(filepath)
+    if filepath.endswith('.csv'):
+        df = pd.read_csv(filepath)
+    elif filepath.endswith('.parquet'):
+        df = pd.read_parquet(filepath)
+    else:
+        df = pd.read_excel(filepath)
+    return _derive_target(df)
+
+
+def _derive_target(df, category_dtypes=None):
+    import numpy as np
+
+    df['precio_log'] = np.log1p(df['precio'])
+    df = df.drop(columns=['precio'])
+    for column in CATEGORICAL_FEATURES:
+        if column in df.columns:
+            df[column] = df[column].astype((category_dtypes or {}).get(column, 'category'))
+    return df
+
+
+def _read_chunks(filepath, chunk_size, columns=None):
+    import pandas as pd
+
+    filepath = str(filepath)
+    if filepath.endswith('.csv'):
+        yield from pd.read_csv(filepath, chunksize=chunk_size, usecols=columns)
+    elif filepath.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(filepath).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        df = pd.read_excel(filepath, usecols=columns)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size].copy()
+
+
+def _column_names(filepath):
+    if filepath.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(filepath).schema_arrow.names
+    import pandas as pd
+
+    return pd.read_csv(filepath, nrows=0).columns.tolist()
+
+
+def _category_dtypes(chunks):
+    # CategoricalDtype de cada columna categórica con las categorías de todos los bloques, ordenadas
+    # como las de `astype('category')` sobre el archivo completo
+    import pandas as pd
+
+    values = {}
+    for chunk in chunks:
+        for column in CATEGORICAL_FEATURES:
+            if column in chunk.columns:
+                values.setdefault(column, set()).update(chunk[column].dropna().unique())
+    return {column: pd.CategoricalDtype(sorted(found)) for column, found in values.items()}
+
+
+def iter_data_chunks(filepath=DATA_PATH, chunk_size=10_000):
+    """
+    Lee el conjunto de datos limpio por bloques de `chunk_size` filas, con `precio_log` ya calculado.
+
+    CSV y Parquet se leen por partes sin cargar el archivo completo. Un xlsx no se puede leer por
+    partes con pandas: se lee una vez y se entrega por bloques. Las columnas categóricas tienen el
+    mismo `CategoricalDtype` en todos los bloques (las categorías del archivo completo, leídas antes
+    en una pasada solo por esas columnas), así que sus códigos son consistentes entre bloques y los
+    bloques se pueden concatenar.
+
+    Produce:
+    - pd.DataFrame: Bloque de filas con la columna `precio_log` en lugar de `precio`.
+    """
+    filepath = str(filepath)
+    if filepath.endswith(('.csv', '.parquet')):
+        # Primera pasada solo por las columnas categóricas
+        columns = [column for column in CATEGORICAL_FEATURES if column in _column_names(filepath)]
+        dtypes = _category_dtypes(_read_chunks(filepath, chunk_size, columns))
+        chunks = _read_chunks(filepath, chunk_size)
+    else:
+        chunks = list(_read_chunks(filepath, chunk_size))
+        dtypes = _category_dtypes(chunks)
+    for chunk in chunks:
+        yield _derive_target(chunk, dtypes)
+
+
+def load_data(filepath=DATA_PATH, cache_dir=None, use_cache=True):
+    """
+    Carga el conjunto de datos del modelo con `precio_log` ya calculado.
+
+    La primera lectura del archivo fuente se guarda en una caché Feather (Arrow) sin comprimir junto
+    al archivo, que se lee con memory-map en las siguientes cargas. La caché se invalida cuando
+    cambian el tamaño y la fecha de modificación del archivo fuente y además su hash SHA-256. Las
+    columnas categóricas se guardan como `category` y conservan su tipo al leer la caché.
+
+    Parámetros:
+    - filepath (str | Path): Archivo fuente (por defecto `data_arriendos_model.xlsx`).
+    - cache_dir (str | Path): Carpeta de la caché. Por defecto `.cache/` junto al archivo fuente.
+    - use_cache (bool): Si es False se lee siempre el archivo fuente.
+
+    Retorna:
+    - pd.DataFrame: Datos con la columna `precio_log` en lugar de `precio`.
+    """
+    with medir('carga_datos') as span:
+        if not use_cache:
+            span.anotar(origen='fuente')
+            return read_source(filepath)
+        return _load_cached(filepath, cache_dir, span)
+
+
+def _load_cached(filepath, cache_dir, span):
+    import pyarrow.feather as feather
+
+    cache_file, meta_file = cache_paths(filepath, cache_dir)
+    stat = os.stat(filepath)
+    meta = json.loads(meta_file.read_text()) if meta_file.exists() and cache_file.exists() else None
+
+    if meta is not None:
+        if meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+            span.anotar(origen='cache')
+            return feather.read_feather(cache_file, memory_map=True)
+        # El archivo se tocó (p. ej. al hacer checkout) pero su contenido puede ser el mismo
+        sha256 = file_sha256(filepath)
+        if meta['sha256'] == sha256:
+            meta.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            meta_file.write_text(json.dumps(meta))
+            span.anotar(origen='cache')
+            return feather.read_feather(cache_file, memory_map=True)
+
+    span.anotar(origen='fuente')
+    df = read_source(filepath)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix('.tmp')
+    feather.write_feather(df, tmp_file, compression='uncompressed')
+    os.replace(tmp_file, cache_file)
+    meta_file.write_text(json.dumps({
+        'source': str(Path(filepath).resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_sha256(filepath),
+    }))
+    return df
+
+
+def split_data(df, test_size=0.2, random_state=42):
+    # Misma partición entrenamiento/prueba para todos los modelos
+    from sklearn.model_selection import train_test_split
+
+    X = df.drop(columns=[TARGET])
+    y = df[TARGET]
+    return train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+
+def prepare_split(df, spatial_features=False):
+    # Preprocesador sin ajustar y partición compartida de los modelos de scikit-learn
+    preprocessor = build_preprocessor(df, spatial_features)
+    X_train, X_test, y_train, y_test = split_data(df)
+    return preprocessor, X_train, X_test, y_train, y_test
+
+
+def regression_metrics(y_true, predictions):
+    import numpy as np
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    return {
+        'mae': mean_absolute_error(y_true, predictions),
+        'rmse': np.sqrt(mean_squared_error(y_true, predictions)),
+        'r2': r2_score(y_true, predictions),
+    }
+
+
+def evaluate_model(predictions, y_test, plot_path=None):
+    # Métricas en pesos de un modelo; el gráfico solo se genera (en archivo) si se indica `plot_path`
+    from .reports import plot_predictions
+
+    metrics = regression_metrics(y_test, predictions)
+    print(f"MAE: {metrics['mae']}")
+    print(f"RMSE: {metrics['rmse']}")
+    print(f"R2 Score: {metrics['r2']}")
+
+    if plot_path:
+        print(f"Gráfico guardado en {plot_predictions(y_test, predictions, plot_path)}")
+
+    return metrics
+
+
+def fit_and_predict(name, estimator, X_train, y_train, X_test):
+    # Ajusta sobre `precio_log` y predice el precio en pesos, con los spans de ajuste y predicción
+    import numpy as np
+
+    with medir('ajuste', modelo=name):
+        estimator.fit(X_train, y_train)
+    with medir('prediccion', modelo=name):
+        predictions = estimator.predict(X_test)
+    return np.expm1(predictions)
+
+
+def train_regressor(name, build_model, X_train, X_test, y_train, y_test, preprocessor, plot_path=None):
+    """
+    Entrena `Pipeline([preprocessor, build_model()])` y lo evalúa en pesos sobre la partición de prueba.
+
+    Retorna:
+    - tuple: (modelo ajustado, predicciones en pesos, métricas)
+    """
+    import numpy as np
+    from sklearn.pipeline import Pipeline
+
+    model = Pipeline([
+        ('preprocessor', preprocessor),
+        ('regressor', build_model())
+    ])
+    predictions = fit_and_predict(name, model, X_train, y_train, X_test)
+    metrics = evaluate_model(predictions, np.expm1(y_test), plot_path)
+    return model, predictions, metrics
+
+
+def build_preprocessor(df, spatial_features=False, target_scaler=None):
+    """
+    ColumnTransformer compartido por los modelos: StandardScaler para las columnas numéricas y
+    OneHotEncoder para las categóricas.
+
+    Parámetros:
+    - df (pd.DataFrame): Datos del modelo (se usan solo sus columnas).
+    - spatial_features (bool): Si es True agrega las características de vecindario (`SpatialFeatures`).
+    - target_scaler: Escalador de `y` que recibe `SpatialFeatures` cuando el objetivo está escalado.
+
+    Retorna:
+    - ColumnTransformer: Preprocesador sin ajustar.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    numerical_features = df.drop(columns=CATEGORICAL_FEATURES + [TARGET]).columns.tolist()
+    transformers = [
+        ('num', StandardScaler(), numerical_features),
+        ('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_FEATURES)
+    ]
+    # Características de vecindario (precio por m² y densidad alrededor de cada anuncio)
+    if spatial_features:
+        from sklearn.pipeline import make_pipeline
+
+        from .spatial import SPATIAL_COLUMNS, SpatialFeatures
+
+        transformers.append(('geo', make_pipeline(SpatialFeatures(target_scaler=target_scaler), StandardScaler()),
+                             SPATIAL_COLUMNS))
+    return ColumnTransformer(transformers=transformers)
@@ -0,0 +1,217 @@
+import argparse
+
+from ..instrumentation import medir
+from .dataset import CATEGORICAL_FEATURES, DATA_PATH, TARGET, iter_data_chunks
+from .registry import load_artifacts, save_artifacts
+
+# Regresión lineal que se ajusta por bloques y se actualiza con anuncios nuevos sin reentrenar.
+# numpy, scipy y pandas se importan dentro de las funciones, como en linear_regression.py
+###--------------------------------------------------###
+
+# Filas leídas del disco por bloque
+CHUNK_SIZE = 10_000
+
+# Mismo umbral de valores singulares que `LinearRegression` (tol=1e-6) para las columnas colineales
+LSTSQ_COND = 1e-6
+
+
+class IncrementalLinearRegression:
+    """
+    Regresión lineal equivalente a `Pipeline([build_preprocessor(df), LinearRegression()])`, ajustada
+    por bloques de anuncios sin guardar las filas.
+
+    El modelo guarda el factor R de la descomposición QR de la matriz `[1, y, numéricas, one-hot]`
+    de todas las filas vistas. Cada bloque nuevo se agrega con un QR de `[R; bloque]`, que cuesta
+    lo mismo sin importar cuántas filas se hayan visto antes. Del factor se obtienen el número de
+    filas, las medias y las varianzas de cada columna (el estado del StandardScaler), y el factor
+    de los datos centrados con el que se resuelve la regresión. Las categorías nuevas agregan
+    columnas en cero para las filas anteriores (el estado del OneHotEncoder).
+
+    La solución se calcula como `LinearRegression`: numéricas estandarizadas con las medias y
+    desviaciones de todas las filas, datos centrados y mínimos cuadrados de norma mínima con el
+    mismo umbral de valores singulares, así que las predicciones coinciden con el ajuste en lote
+    (las columnas one-hot son colineales con el intercepto). Se trabaja sobre el factor y no sobre
+    XᵀX para no elevar al cuadrado el número de condición.
+
+    Parámetros:
+    - numerical_features (list[str]): Columnas numéricas. Por defecto, todas las que no son
+      categóricas ni el objetivo (como `build_preprocessor`).
+    - categorical_features (list[str]): Columnas categóricas (one-hot; las categorías que no se
+      vieron al ajustar se ignoran al predecir, como `handle_unknown='ignore'`).
+    """
+
+    def __init__(self, numerical_features=None, categorical_features=CATEGORICAL_FEATURES):
+        self.numerical_features = numerical_features
+        self.categorical_features = categorical_features
+
+    @property
+    def features(self):
+        return self.numerical_features_ + list(self.categorical_features)
+
+    def _initialize(self, X):
+        import numpy as np
+
+        if self.numerical_features is None:
+            self.numerical_features_ = [c for c in X.columns if c not in self.categorical_features and c != TARGET]
+        else:
+            self.numerical_features_ = list(self.numerical_features)
+        self.categories_ = {column: [] for column in self.categorical_features}
+        # Posición de la columna one-hot de cada categoría dentro del factor R
+        self.category_columns_ = {column: [] for column in self.categorical_features}
+        self.n_samples_ = 0
+        self.r_ = np.zeros((0, 2 + len(self.numerical_features_)))
+
+    def _add_categories(self, X):
+        import numpy as np
+        import pandas as pd
+
+        new_columns = 0
+        for column in self.categorical_features:
+            known = pd.Index(self.categories_[column])
+            values = pd.Index(X[column].unique())
+            new = values[known.get_indexer(values) < 0]
+            if len(new):
+                new = new.sort_values() if new.notna().all() else new
+                start = self.r_.shape[1] + new_columns
+                self.categories_[column].extend(new.tolist())
+                self.category_columns_[column].extend(range(start, start + len(new)))
+                new_columns += len(new)
+        if new_columns:
+            # Las filas ya vistas tienen 0 en las columnas de las categorías nuevas
+            self.r_ = np.hstack([self.r_, np.zeros((self.r_.shape[0], new_columns))])
+
+    def _one_hot_indices(self, X, column):
+        # Columna one-hot de cada fila (-1 si la categoría no se vio al ajustar)
+        import numpy as np
+        import pandas as pd
+
+        positions = pd.Index(self.categories_[column]).get_indexer(X[column])
+        columns = np.asarray(self.category_columns_[column])
+        return np.where(positions >= 0, columns[positions] if len(columns) else -1, -1)
+
+    def partial_fit(self, X, y):
+        """
+        Agrega un bloque de anuncios al modelo y actualiza los coeficientes.
+
+        Parámetros:
+        - X (pd.DataFrame): Anuncios con las columnas numéricas y categóricas.
+        - y (array): `precio_log` de cada anuncio.
+
+        Retorna:
+        - IncrementalLinearRegression: El mismo modelo, actualizado.
+        """
+        import numpy as np
+
+        if not hasattr(self, 'r_'):
+            self._initialize(X)
+        self._add_categories(X)
+
+        n = len(X)
+        block = np.zeros((n, self.r_.shape[1]))
+        block[:, 0] = 1.0
+        block[:, 1] = np.asarray(y, dtype=np.float64).ravel()
+        block[:, 2:2 + len(self.numerical_features_)] = X[self.numerical_features_].to_numpy(dtype=np.float64)
+        rows = np.arange(n)
+        for column in self.categorical_features:
+            block[rows, self._one_hot_indices(X, column)] = 1.0
+
+        with medir('ajuste', modelo='incremental_linear'):
+            self.r_ = np.linalg.qr(np.vstack([self.r_, block]), mode='r')
+            self.n_samples_ += n
+            self._solve()
+        return self
+
+    def _solve(self):
+        import numpy as np
+        from scipy import linalg
+
+        r = self.r_
+        # La primera fila del factor tiene la raíz de n y las sumas de cada columna: de ahí las medias
+        means = r[0, 1:] / r[0, 0]
+        # El resto es el factor de los datos centrados [y, X]; sus columnas dan las sumas de cuadrados
+        centered = r[1:, 1:]
+        n_numerical = len(self.numerical_features_)
+        variances = (centered[:, 1:1 + n_numerical] ** 2).sum(axis=0) / self.n_samples_
+        scale = np.sqrt(variances)
+        scale[scale == 0] = 1.0
+
+        # Columnas numéricas estandarizadas y `y` al final para leer el sistema triangular
+        scaling = np.ones(r.shape[1] - 2)
+        scaling[:n_numerical] = 1.0 / scale
+        factor = np.linalg.qr(np.hstack([centered[:, 1:] * scaling, centered[:, :1]]), mode='r')
+        p = factor.shape[1] - 1
+        coef = linalg.lstsq(factor[:p, :p], factor[:p, p], cond=LSTSQ_COND)[0]
+
+        # Coeficientes sobre las columnas sin estandarizar
+        self.coef_ = coef * scaling
+        self.intercept_ = means[0] - means[1:] @ self.coef_
+        self.mean_ = means[1:1 + n_numerical]
+        self.scale_ = scale
+
+    def fit(self, chunks):
+        """
+        Ajusta el modelo desde cero con un iterable de bloques `(X, y)`.
+        """
+        for attribute in ('r_', 'coef_'):
+            self.__dict__.pop(attribute, None)
+        for X, y in chunks:
+            self.partial_fit(X, y)
+        return self
+
+    def predict(self, X):
+        """
+        Predice `precio_log` de un DataFrame de anuncios.
+        """
+        import numpy as np
+
+        n_numerical = len(self.numerical_features_)
+        predictions = X[self.numerical_features_].to_numpy(dtype=np.float64) @ self.coef_[:n_numerical]
+        predictions += self.intercept_
+        # Coeficiente de cada columna one-hot (índices del factor R, que empiezan en 2)
+        coef = np.append(self.coef_, 0.0)
+        for column in self.categorical_features:
+            indices = self._one_hot_indices(X, column)
+            predictions += coef[np.where(indices >= 0, indices - 2, -1)]
+        return predictions
+
+
+def iter_training_chunks(filepath=DATA_PATH, chunk_size=CHUNK_SIZE):
+    # Bloques (X, y) del conjunto limpio leídos del disco
+    for chunk in iter_data_chunks(filepath, chunk_size):
+        yield chunk.drop(columns=[TARGET]), chunk[TARGET].to_numpy()
+
+
+# Pipeline principal: ajuste desde cero o actualización de la última versión del registro
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ajusta o actualiza la regresión lineal incremental')
+    parser.add_argument('--data', default=str(DATA_PATH), help='Archivo de anuncios limpios (xlsx, csv o parquet)')
+    parser.add_argument('--update', action='store_true',
+                        help='Agregar los anuncios a la última versión del registro en lugar de ajustar desde cero')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Filas leídas por bloque')
+    parser.add_argument('--no-save', action='store_true', help='No guardar el modelo en el registro')
+    args = parser.parse_args(argv)
+
+    # Con `python -m` esta clase vive en __main__; se usa la del módulo importable para que el
+    # modelo guardado con joblib se pueda cargar desde cualquier proceso
+    from .incremental_linear import IncrementalLinearRegression
+
+    if args.update:
+        model = load_artifacts('incremental_linear', mmap_mode=None).model
+        previous = model.n_samples_
+        for X, y in iter_training_chunks(args.data, args.chunk_size):
+            model.partial_fit(X, y)
+        print(f"Anuncios agregados: {model.n_samples_ - previous} (total {model.n_samples_})")
+    else:
+        model = IncrementalLinearRegression().fit(iter_training_chunks(args.data, args.chunk_size))
+        print(f"Anuncios ajustados: {model.n_samples_}")
+
+    if not args.no_save:
+        version = save_artifacts('incremental_linear', model, features=model.features,
+                                 params={'n_samples': model.n_samples_})
+        print(f"Modelo guardado en el registro: incremental_linear/{version}")
+
+    return model
+
+
+if __name__ == '__main__':
+    main()
@@ -1,55 +1,56 @@
-f#### Modelo de la optimizacion 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import MinMaxScaler, OneHotEncoder, StandardScaler, FunctionTransformer
-from sklearn.compose import ColumnTransformer
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout, BatchNormalization, Input
-from tensorflow.keras.optimizers import RMSprop
+#### Modelo de la optimizacion 
+import argparse
+import math
+import warnings
+from pathlib import Path
+
+from ..instrumentation import medir
+from ..rutas import DIR_ARTEFACTOS
+from .dataset import DATA_PATH, TARGET, build_preprocessor, evaluate_model, load_data, split_data
+from .registry import save_artifacts
+from .reports import prediction_plot_path
+
+# TensorFlow tarda segundos en importarse: se importa solo al construir la red, así que importar
+# este módulo (o el paquete) no lo carga
 ###--------------------------------------------------###
-# Cargar datos
-def load_data(filepath):
-    df = pd.read_excel(filepath)
-    df['precio_log'] = np.log1p(df['precio'])
-    df = df.drop(columns=['precio'])
-    return df
-
-# Procesamiento de datos
-def preprocess_data(df):
-    target = 'precio_log'
-    categorical_features = ['ciudad', 'antiguedad', 'comuna', 'zona', 'tipo_de_inmueble', 'estado']
-    numerical_features = df.drop(columns=categorical_features + [target]).columns.tolist()
-    
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', StandardScaler(), numerical_features),
-            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-        ]
-    )
-    
-    X = df.drop(columns=[target])
-    y = df[target].values.reshape(-1, 1)
+
+# Entrenamiento: máximo de épocas, tamaño del lote, fracción de validación (las últimas filas, como
+# `validation_split` de Keras) y épocas sin mejorar la pérdida de validación antes de parar
+MAX_EPOCHS = 200
+BATCH_SIZE = 64
+VALIDATION_SPLIT = 0.2
+PATIENCE = 20
+
+# Lote de evaluación y predicción (no afecta el resultado, solo la velocidad)
+PREDICT_BATCH_SIZE = 4096
+
+# Pesos de la mejor época guardados durante el entrenamiento desde la línea de comandos
+CHECKPOINT_PATH = DIR_ARTEFACTOS / 'checkpoints' / 'neural_network.weights.h5'
+
+# Procesamiento de datos (preprocesador y partición compartidos, ver dataset.py)
+def preprocess_data(df, spatial_features=False):
+    from sklearn.preprocessing import StandardScaler
+
+    # El objetivo se escala con todos los datos, como antes de compartir la partición
     target_scaler = StandardScaler()
-    y = target_scaler.fit_transform(y)
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    target_scaler.fit(df[TARGET].values.reshape(-1, 1))
+
+    # Las características de vecindario reciben `y` escalado y lo devuelven a precio_log con target_scaler
+    preprocessor = build_preprocessor(df, spatial_features, target_scaler=target_scaler)
+    X_train, X_test, y_train, y_test = split_data(df)
+    y_train = target_scaler.transform(y_train.values.reshape(-1, 1))
+    y_test = target_scaler.transform(y_test.values.reshape(-1, 1))
     
     return preprocessor, target_scaler, X_train, X_test, y_train, y_test
 
-# Entrenamiento de la red neuronal
-def train_neural_network(X_train, X_test, y_train, y_test, preprocessor, target_scaler):
-    X_train_transformed = preprocessor.fit_transform(X_train)
-    X_test_transformed = preprocessor.transform(X_test)
-    
+# Definición del modelo con los mejores hiperparámetros encontrados
+def build_neural_network(input_dim):
+    from tensorflow.keras.layers import BatchNormalization, Dense, Dropout, Input
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import RMSprop
 
-    # Definición del modelo
-    # Definición del modelo con los mejores hiperparámetros encontrados
     model = Sequential([
-        Input(shape=(X_train_transformed.shape[1],)),
+        Input(shape=(input_dim,)),
 
         # Capa 1
         Dense(384, activation='tanh'),
@@ -73,45 +74,163 @@ def train_neural_network(X_train, X_test, y_train, y_test, preprocessor, target_
     # Compilación del modelo con el optimizador rmsprop y la tasa de aprendizaje encontrada
     optimizer = RMSprop(learning_rate=0.00012122536697831619)
     model.compile(optimizer=optimizer, loss='mse', metrics=['mae'])
-    history = model.fit(X_train_transformed, y_train, epochs=200, batch_size=64, validation_split=0.2, verbose=0)
+    return model
+
+# Hilos de TensorFlow dentro de cada operación (intra) y entre operaciones independientes (inter)
+def configure_threads(intra_op_threads=None, inter_op_threads=None):
+    import tensorflow as tf
+
+    # Solo se pueden cambiar antes de que TensorFlow ejecute su primera operación en el proceso
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError:
+        warnings.warn("TensorFlow ya está inicializado; se mantiene el número de hilos actual")
+
+# Matriz densa float32 contigua; un bloque one-hot disperso se densifica una sola vez y directamente
+# en float32 (sin la copia intermedia en float64)
+def to_float32(X):
+    import numpy as np
+    from scipy import sparse
+
+    if sparse.issparse(X):
+        return X.astype(np.float32).toarray()
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+# Pipeline tf.data sobre matrices en memoria
+def make_dataset(X, y=None, batch_size=BATCH_SIZE, shuffle=False, seed=None):
+    """
+    Lotes de un `tf.data.Dataset` a partir de matrices ya transformadas.
+
+    Las matrices se copian una vez a tensores float32. Cada lote se arma con un solo `tf.gather`
+    sobre un bloque de índices (barajados en cada época si `shuffle`), así que se barajan enteros
+    y no filas completas, y el siguiente lote se prepara mientras se entrena el actual (prefetch).
+
+    Parámetros:
+    - X (array | sparse matrix): Características transformadas.
+    - y (array): Objetivo escalado. None para predecir.
+    - batch_size (int): Filas por lote.
+    - shuffle (bool): Barajar las filas en cada época.
+    - seed (int): Semilla del barajado.
+
+    Retorna:
+    - tf.data.Dataset: Lotes `X` o `(X, y)`.
+    """
+    import tensorflow as tf
 
+    X = tf.constant(to_float32(X))
+    indices = tf.data.Dataset.range(X.shape[0])
+    if shuffle:
+        indices = indices.shuffle(X.shape[0], seed=seed, reshuffle_each_iteration=True)
+    indices = indices.batch(batch_size)
+    if y is None:
+        dataset = indices.map(lambda batch: tf.gather(X, batch))
+    else:
+        y = tf.constant(to_float32(y).reshape(-1, 1))
+        dataset = indices.map(lambda batch: (tf.gather(X, batch), tf.gather(y, batch)))
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+# Entrenamiento sobre matrices ya transformadas (y escalado con target_scaler)
+def fit_neural_network(X_train_transformed, y_train, max_epochs=MAX_EPOCHS, batch_size=BATCH_SIZE,
+                       patience=PATIENCE, checkpoint_path=None, intra_op_threads=None, inter_op_threads=None):
+    """
+    Entrena la red con un pipeline tf.data en float32 y parada temprana.
+
+    Como antes, el último 20% de las filas se usa para validación. El entrenamiento se detiene
+    cuando la pérdida de validación no mejora en `patience` épocas, y al terminar la red queda con
+    los pesos de la mejor época. Con `checkpoint_path` (un archivo `.weights.h5`) se guardan además
+    en disco los pesos de cada nueva mejor época.
+
+    Retorna:
+    - tuple: (red entrenada, history de Keras)
+    """
+    from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+
+    configure_threads(intra_op_threads, inter_op_threads)
+    X = to_float32(X_train_transformed)
+    y = to_float32(y_train).reshape(-1, 1)
+    split_at = math.ceil(len(X) * (1 - VALIDATION_SPLIT))
+
+    callbacks = [EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)]
+    if checkpoint_path:
+        Path(checkpoint_path).parent.mkdir(parents=True, exist_ok=True)
+        callbacks.append(ModelCheckpoint(checkpoint_path, monitor='val_loss', save_best_only=True,
+                                         save_weights_only=True))
+
+    model = build_neural_network(X.shape[1])
+    with medir('ajuste', modelo='neural_network'):
+        history = model.fit(make_dataset(X[:split_at], y[:split_at], batch_size, shuffle=True),
+                            validation_data=make_dataset(X[split_at:], y[split_at:], PREDICT_BATCH_SIZE),
+                            epochs=max_epochs, callbacks=callbacks, verbose=0)
+    return model, history
+
+# Predicciones en precio a partir de matrices ya transformadas
+def predict_neural_network(model, X_transformed, target_scaler):
+    import numpy as np
+
+    with medir('prediccion', modelo='neural_network'):
+        predictions = model.predict(to_float32(X_transformed), batch_size=PREDICT_BATCH_SIZE, verbose=0).flatten()
+    predictions = target_scaler.inverse_transform(predictions.reshape(-1, 1)).flatten()
+    return np.expm1(predictions)
+
+# Entrenamiento de la red neuronal
+def train_neural_network(X_train, X_test, y_train, y_test, preprocessor, target_scaler, plot_path=None,
+                         **fit_params):
+    import numpy as np
+
+    with medir('preprocesamiento', modelo='neural_network'):
+        X_train_transformed = preprocessor.fit_transform(X_train, y_train)
+        X_test_transformed = preprocessor.transform(X_test)
+
+    # fit_params: argumentos de fit_neural_network (épocas, paciencia, checkpoint, hilos)
+    model, history = fit_neural_network(X_train_transformed, y_train, **fit_params)
     
     # Obtener las predicciones y reescalar la variable objetivo a su escala original
-    predictions = model.predict(X_test_transformed).flatten()
-    predictions = target_scaler.inverse_transform(predictions.reshape(-1, 1)).flatten()
+    predictions = predict_neural_network(model, X_test_transformed, target_scaler)
     
     y_test = target_scaler.inverse_transform(y_test).flatten()
     y_test = np.expm1(y_test)
-    predictions = np.expm1(predictions)
 
     # Evaluar el modelo
-    evaluate_model(predictions, y_test)
+    metrics = evaluate_model(predictions, y_test, plot_path)
     
-    return model, predictions, history
+    return model, predictions, history, metrics
 
-# Evaluación del modelo
-def evaluate_model(predictions, y_test):
-    mae = mean_absolute_error(y_test, predictions)
-    rmse = np.sqrt(mean_squared_error(y_test, predictions))
-    r2 = r2_score(y_test, predictions)
-    
-    print(f"MAE: {mae}")
-    print(f"RMSE: {rmse}")
-    print(f"R2 Score: {r2}")
-    
-    plt.figure(figsize=(7, 4))
-    sns.scatterplot(x=y_test, y=predictions, alpha=0.5)
-    plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'k--', lw=2)
-    plt.ticklabel_format(style='plain')
-    plt.xlabel('Valores reales')
-    plt.ylabel('Predicciones')
-    plt.title('Valores reales vs Predicciones')
-    plt.show()
-
-# Cargar y procesar datos
-filepath = '../data/processed/data_arriendos_model.xlsx'
-df = load_data(filepath)
-preprocessor, target_scaler, X_train, X_test, y_train, y_test = preprocess_data(df)
-
-# Entrenar modelo
-nn_model_x, nn_predictions_x, history = train_neural_network(X_train, X_test, y_train, y_test, preprocessor, target_scaler)
\ No newline at end of file
+# Pipeline principal
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Entrena y evalúa la red neuronal')
+    parser.add_argument('--data', default=str(DATA_PATH), help='Archivo del conjunto de datos')
+    parser.add_argument('--spatial-features', action='store_true', help='Incluir características de vecindario')
+    parser.add_argument('--plot', nargs='?', const=str(prediction_plot_path('neural_network')),
+                        help='Guardar el gráfico de valores reales vs predicciones (por defecto en reports/figures/)')
+    parser.add_argument('--no-save', action='store_true', help='No guardar el modelo en el registro')
+    parser.add_argument('--max-epochs', type=int, default=MAX_EPOCHS)
+    parser.add_argument('--patience', type=int, default=PATIENCE, help='Épocas sin mejorar antes de parar')
+    parser.add_argument('--checkpoint', default=str(CHECKPOINT_PATH), help='Pesos de la mejor época (.weights.h5)')
+    parser.add_argument('--intra-op-threads', type=int, help='Hilos de TensorFlow por operación')
+    parser.add_argument('--inter-op-threads', type=int, help='Operaciones de TensorFlow en paralelo')
+    args = parser.parse_args(argv)
+
+    # Cargar y procesar datos
+    df = load_data(args.data)
+    preprocessor, target_scaler, X_train, X_test, y_train, y_test = preprocess_data(df, args.spatial_features)
+
+    # Entrenar modelo
+    nn_model, nn_predictions, history, nn_metrics = train_neural_network(
+        X_train, X_test, y_train, y_test, preprocessor, target_scaler, args.plot, max_epochs=args.max_epochs,
+        patience=args.patience, checkpoint_path=args.checkpoint, intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads)
+    print(f"Épocas entrenadas: {len(history.history['loss'])}")
+
+    # Guardar la red con su preprocesador y el escalador de la variable objetivo
+    if not args.no_save:
+        version = save_artifacts('neural_network', nn_model, preprocessor=preprocessor, target_scaler=target_scaler,
+                                 features=X_train.columns, metrics=nn_metrics)
+        print(f"Modelo guardado en el registro: neural_network/{version}")
+
+    return nn_model
+
+if __name__ == '__main__':
+    main()
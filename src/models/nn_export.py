@@ -0,0 +1,243 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ..instrumentation import medir
+from ..rutas import DIR_ARTEFACTOS
+
+# Exportación de la red neuronal a NumPy: inferencia sin TensorFlow (un .npz con los pesos y el
+# target_scaler). Solo este archivo y el preprocesador de scikit-learn hacen falta para predecir.
+###--------------------------------------------------###
+
+# Archivo por defecto del modelo exportado
+EXPORT_PATH = DIR_ARTEFACTOS / 'neural_network.npz'
+
+# Tipos en que se pueden guardar los pesos; el cálculo siempre se hace en float32
+WEIGHT_DTYPES = ('float32', 'float16', 'int8')
+
+# Pendiente por defecto de `leaky_relu` en Keras 3
+LEAKY_RELU_SLOPE = 0.2
+
+
+# Las activaciones trabajan sobre el arreglo recibido (in-place) para no crear copias por capa
+def _sigmoid(x):
+    # Forma con tanh: no se desborda con entradas grandes y negativas
+    x *= 0.5
+    np.tanh(x, out=x)
+    x += 1.0
+    x *= 0.5
+    return x
+
+
+def _leaky_relu(x):
+    # Con pendiente menor que 1, leaky_relu(x) = max(x, pendiente * x)
+    return np.maximum(x, np.float32(LEAKY_RELU_SLOPE) * x, out=x)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'sigmoid': _sigmoid,
+    'leaky_relu': _leaky_relu,
+}
+
+
+def _batch_norm_affine(layer):
+    # BatchNormalization en inferencia: x * scale + shift con las medias y varianzas móviles
+    variance = np.asarray(layer.moving_variance, dtype=np.float64)
+    mean = np.asarray(layer.moving_mean, dtype=np.float64)
+    scale = 1.0 / np.sqrt(variance + layer.epsilon)
+    if layer.scale:
+        scale = scale * np.asarray(layer.gamma, dtype=np.float64)
+    shift = -mean * scale
+    if layer.center:
+        shift = shift + np.asarray(layer.beta, dtype=np.float64)
+    return scale, shift
+
+
+def fold_layers(model):
+    """
+    Convierte una red Sequential de Keras (Dense, BatchNormalization y Dropout) en una lista de
+    capas densas equivalentes en inferencia.
+
+    En `build_neural_network` cada BatchNormalization va después de la activación de su Dense, así
+    que no se puede fundir con esa capa: se funde con la Dense siguiente, cuya entrada es la salida
+    normalizada (`W' = diag(scale) W`, `b' = b + shift W`). Si la Dense anterior es lineal, se funde
+    con ella. Dropout no hace nada en inferencia y se descarta.
+
+    Retorna:
+    - list[tuple]: (W float64, b float64, activación) por capa densa.
+    """
+    layers, pending = [], None
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == 'Dropout':
+            continue
+        if kind == 'BatchNormalization':
+            scale, shift = _batch_norm_affine(layer)
+            if layers and layers[-1][2] == 'linear' and pending is None:
+                W, b, activation = layers[-1]
+                layers[-1] = (W * scale, b * scale + shift, activation)
+            elif pending is None:
+                pending = (scale, shift)
+            else:
+                pending = (pending[0] * scale, pending[1] * scale + shift)
+            continue
+        if kind != 'Dense':
+            raise ValueError(f"Capa no soportada en la exportación: {kind}")
+
+        activation = layer.get_config()['activation']
+        if not isinstance(activation, str) or activation not in ACTIVATIONS:
+            raise ValueError(f"Activación no soportada en la exportación: {activation}")
+        weights = [np.asarray(w, dtype=np.float64) for w in layer.get_weights()]
+        W = weights[0]
+        b = weights[1] if len(weights) > 1 else np.zeros(W.shape[1])
+        if pending is not None:
+            scale, shift = pending
+            W, b = W * scale[:, None], b + shift @ W
+            pending = None
+        layers.append((W, b, activation))
+
+    if pending is not None:
+        # BatchNormalization al final de la red: se agrega como capa lineal diagonal
+        scale, shift = pending
+        layers.append((np.diag(scale), shift, 'linear'))
+    return layers
+
+
+def _quantize_int8(W):
+    # Cuantización simétrica por neurona de salida: W ≈ q * scale, con q en [-127, 127]
+    scale = np.abs(W).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    return np.round(W / scale).astype(np.int8), scale.astype(np.float32)
+
+
+def export_neural_network(model, target_scaler, path=EXPORT_PATH, weight_dtype='float32'):
+    """
+    Guarda la red entrenada como un .npz que `NumpyNetwork` carga sin TensorFlow.
+
+    Parámetros:
+    - model: Red de Keras de `build_neural_network` (ya entrenada).
+    - target_scaler (StandardScaler): Escalador de la variable objetivo.
+    - path (str | Path): Archivo de salida.
+    - weight_dtype (str): 'float32', 'float16' (la mitad de tamaño) o 'int8' (un cuarto, con una
+      escala por neurona). Los sesgos quedan siempre en float32.
+
+    Retorna:
+    - Path: Archivo guardado.
+    """
+    if weight_dtype not in WEIGHT_DTYPES:
+        raise ValueError(f"weight_dtype debe ser uno de {WEIGHT_DTYPES}")
+
+    layers = fold_layers(model)
+    arrays = {
+        'activations': np.array([activation for _, _, activation in layers]),
+        'weight_dtype': np.array(weight_dtype),
+        'target_mean': np.asarray(target_scaler.mean_, dtype=np.float64),
+        'target_scale': np.asarray(target_scaler.scale_, dtype=np.float64),
+    }
+    for i, (W, b, _) in enumerate(layers):
+        if weight_dtype == 'int8':
+            arrays[f'W{i}'], arrays[f'W{i}_scale'] = _quantize_int8(W)
+        else:
+            arrays[f'W{i}'] = W.astype(weight_dtype)
+        arrays[f'b{i}'] = b.astype(np.float32)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, **arrays)
+    return path
+
+
+class NumpyNetwork:
+    """
+    Red exportada con `export_neural_network`, evaluada solo con NumPy en float32.
+
+    Los pesos float16 o int8 se pasan a float32 una vez al cargar, así que la precisión reducida
+    solo ahorra disco y memoria del archivo, no cambia la velocidad de `predict`.
+    """
+
+    def __init__(self, layers, target_mean, target_scale, weight_dtype='float32'):
+        self.layers = layers
+        self.target_mean = target_mean
+        self.target_scale = target_scale
+        self.weight_dtype = weight_dtype
+
+    @classmethod
+    def load(cls, path=EXPORT_PATH):
+        with np.load(path) as data:
+            layers = []
+            for i, activation in enumerate(data['activations']):
+                W = data[f'W{i}'].astype(np.float32)
+                if f'W{i}_scale' in data:
+                    W *= data[f'W{i}_scale']
+                layers.append((np.ascontiguousarray(W), data[f'b{i}'], ACTIVATIONS[str(activation)]))
+            return cls(layers, data['target_mean'], data['target_scale'], str(data['weight_dtype']))
+
+    @property
+    def input_dim(self):
+        return self.layers[0][0].shape[0]
+
+    def predict(self, X, batch_size=8192):
+        """
+        Salida de la red (objetivo escalado, como `model.predict(X).ravel()`).
+
+        Se procesa por bloques de `batch_size` filas para acotar la memoria de las activaciones.
+        """
+        if hasattr(X, 'toarray'):
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)
+        output = np.empty(len(X), dtype=np.float32)
+        with medir('prediccion', modelo='neural_network_numpy'):
+            for start in range(0, len(X), batch_size):
+                h = X[start:start + batch_size]
+                for W, b, activation in self.layers:
+                    h = h @ W
+                    h += b
+                    h = activation(h)
+                output[start:start + batch_size] = h[:, 0]
+        return output
+
+    def predict_price(self, X_transformed):
+        # Predicciones en pesos a partir de matrices ya transformadas (como predict_neural_network)
+        predictions = self.predict(X_transformed).astype(np.float64)
+        return np.expm1(predictions * self.target_scale[0] + self.target_mean[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exporta la red neuronal del registro para inferencia con NumPy')
+    parser.add_argument('--version', default='latest', help='Versión de neural_network en el registro')
+    parser.add_argument('--output', default=str(EXPORT_PATH), help='Archivo .npz de salida')
+    parser.add_argument('--weight-dtype', choices=WEIGHT_DTYPES, default='float32')
+    args = parser.parse_args(argv)
+
+    from .dataset import load_data, split_data
+    from .registry import load_artifacts
+
+    artifact = load_artifacts('neural_network', args.version)
+    path = export_neural_network(artifact.model, artifact.target_scaler, args.output, args.weight_dtype)
+    print(f"Red exportada en {path} ({path.stat().st_size / 1024:.0f} KB, pesos en {args.weight_dtype})")
+
+    # Comparación con Keras sobre la partición de prueba
+    _, X_test, _, _ = split_data(load_data())
+    X = artifact.preprocessor.transform(X_test[artifact.features] if artifact.features else X_test)
+    X = np.asarray(X.toarray() if hasattr(X, 'toarray') else X, dtype=np.float32)
+    network = NumpyNetwork.load(path)
+
+    start = time.perf_counter()
+    keras_output = artifact.model.predict(X, batch_size=len(X), verbose=0).ravel()
+    keras_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    numpy_output = network.predict(X)
+    numpy_seconds = time.perf_counter() - start
+
+    print(f"Diferencia máxima con Keras: {np.abs(numpy_output - keras_output).max():.2e}")
+    print(f"Keras: {keras_seconds * 1000:.1f} ms, NumPy: {numpy_seconds * 1000:.1f} ms ({len(X)} filas)")
+    return path
+
+
+if __name__ == '__main__':
+    main()
@@ -1,82 +1,47 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.linear_model import LinearRegression
+import argparse
 
-# Cargar datos
-def load_data(filepath):
-    df = pd.read_excel(filepath)
-    df['precio_log'] = np.log1p(df['precio'])
-    df = df.drop(columns=['precio'])
-    return df
+from .dataset import DATA_PATH, load_data, prepare_split, train_regressor
+from .registry import save_artifacts
+from .reports import prediction_plot_path
 
-# Procesamiento de datos
-def preprocess_data_rf(df):
-    target = 'precio_log'
-    categorical_features = ['ciudad', 'antiguedad', 'comuna', 'zona', 'tipo_de_inmueble', 'estado']
-    numerical_features = df.drop(columns=categorical_features + [target]).columns.tolist()
-    
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', StandardScaler(), numerical_features),
-            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-        ]
-    )
-    
-    X = df.drop(columns=[target])
-    y = df[target]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    return preprocessor, X_train, X_test, y_train, y_test
+# scikit-learn, numpy y matplotlib se importan dentro de las funciones para que importar este
+# módulo sea inmediato
 
 # Modelo de Random Forest
-def train_random_forest(X_train, X_test, y_train, y_test, preprocessor):
-    model = Pipeline([
-        ('preprocessor', preprocessor),
-        ('regressor', RandomForestRegressor(n_estimators=100, random_state=42))
-    ])
-    model.fit(X_train, y_train)
-    predictions = model.predict(X_test)    
-    #Reescalar el precio
-    predictions = np.expm1(predictions)
-    y_test = np.expm1(y_test)
+def build_random_forest():
+    from sklearn.ensemble import RandomForestRegressor
 
-    evaluate_model(predictions, y_test)
+    return RandomForestRegressor(n_estimators=100, random_state=42)
 
-    return model, predictions
+def train_random_forest(X_train, X_test, y_train, y_test, preprocessor, plot_path=None):
+    return train_regressor('random_forest', build_random_forest, X_train, X_test, y_train, y_test, preprocessor,
+                           plot_path)
 
 
-# Evaluación de los modelos
-def evaluate_model(predictions, y_test):
-    print(f"MAE: {mean_absolute_error(y_test, predictions)}")
-    print(f"RMSE: {np.sqrt(mean_squared_error(y_test, predictions))}")
-    print(f"R2 Score: {r2_score(y_test, predictions)}")
-    
-    plt.figure(figsize=(7, 4))
-    sns.scatterplot(x=y_test, y=predictions, alpha=0.5)
-    plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'k--', lw=2)
-    plt.ticklabel_format(style='plain')
-    plt.xlabel("Valores reales")
-    plt.ylabel("Predicciones")
-    plt.title("Valores reales vs Predicciones")
-    plt.show()
-
 # Pipeline principal
-def main(filepath):
-    df = load_data(filepath)
-    preprocessor, X_train, X_test, y_train, y_test = preprocess_data_rf(df)
-    
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Entrena y evalúa el modelo de Random Forest')
+    parser.add_argument('--data', default=str(DATA_PATH), help='Archivo del conjunto de datos')
+    parser.add_argument('--spatial-features', action='store_true', help='Incluir características de vecindario')
+    parser.add_argument('--plot', nargs='?', const=str(prediction_plot_path('random_forest')),
+                        help='Guardar el gráfico de valores reales vs predicciones (por defecto en reports/figures/)')
+    parser.add_argument('--no-save', action='store_true', help='No guardar el modelo en el registro')
+    args = parser.parse_args(argv)
+
+    df = load_data(args.data)
+    preprocessor, X_train, X_test, y_train, y_test = prepare_split(df, args.spatial_features)
+
     print("Entrenando Random Forest...")
-    rf_model, rf_predictions = train_random_forest(X_train, X_test, y_train, y_test, preprocessor)
-    
+    rf_model, rf_predictions, rf_metrics = train_random_forest(X_train, X_test, y_train, y_test, preprocessor,
+                                                               args.plot)
+
+    # Guardar el modelo entrenado en el registro
+    if not args.no_save:
+        version = save_artifacts('random_forest', rf_model, features=X_train.columns, metrics=rf_metrics)
+        print(f"Modelo guardado en el registro: random_forest/{version}")
+
     return rf_model
 
 # Llamar a la función principal
-main('../data/processed/data_arriendos_model.xlsx')
\ No newline at end of file
+if __name__ == '__main__':
+    main()
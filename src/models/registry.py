@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from functools import cached_property
+from pathlib import Path
+
+from ..rutas import DIR_ARTEFACTOS
+
+# Carpeta por defecto del registro de modelos entrenados
+REGISTRY_DIR = DIR_ARTEFACTOS
+
+
+def _is_keras_model(model):
+    return any(cls.__module__.startswith(('keras', 'tensorflow')) for cls in type(model).__mro__)
+
+
+def save_artifacts(name, model, preprocessor=None, target_scaler=None, features=None, metrics=None, params=None,
+                   registry_dir=REGISTRY_DIR):
+    """
+    Guarda un modelo entrenado en el registro con un identificador de versión.
+
+    Cada versión es una carpeta `<registry_dir>/<name>/<version>/` con el modelo (`model.joblib`,
+    o `model.keras` para la red neuronal), el preprocesador y el `target_scaler` si se indican, y
+    `metadata.json` con las características, las métricas y los parámetros. Los joblib se guardan
+    sin comprimir para poder cargarlos con memory-map. La carpeta se escribe aparte y se renombra
+    al final, y el archivo `LATEST` apunta a la última versión guardada.
+
+    Parámetros:
+    - name (str): Nombre del modelo (p. ej. 'random_forest').
+    - model: Pipeline ajustado o modelo de Keras.
+    - preprocessor: ColumnTransformer ajustado (necesario para los modelos de Keras).
+    - target_scaler: Escalador de la variable objetivo (red neuronal).
+    - features (list[str]): Columnas de entrada del modelo.
+    - metrics (dict): Métricas de evaluación (ver `evaluate_model`).
+    - params (dict): Hiperparámetros u otra información del entrenamiento.
+    - registry_dir (str | Path): Carpeta del registro.
+
+    Retorna:
+    - str: Identificador de la versión guardada.
+    """
+    import joblib
+
+    model_dir = Path(registry_dir) / name
+    model_dir.mkdir(parents=True, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    tmp_dir = model_dir / f'.{version}.tmp'
+    tmp_dir.mkdir()
+
+    try:
+        files = {}
+        if _is_keras_model(model):
+            files['model'] = 'model.keras'
+            model.save(tmp_dir / files['model'])
+        else:
+            files['model'] = 'model.joblib'
+            joblib.dump(model, tmp_dir / files['model'])
+        for key, obj in (('preprocessor', preprocessor), ('target_scaler', target_scaler)):
+            if obj is not None:
+                files[key] = f'{key}.joblib'
+                joblib.dump(obj, tmp_dir / files[key])
+
+        metadata = {
+            'name': name,
+            'version': version,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'files': files,
+            'features': list(features) if features is not None else None,
+            'metrics': {k: float(v) for k, v in (metrics or {}).items()},
+            'params': params or {},
+        }
+        (tmp_dir / 'metadata.json').write_text(json.dumps(metadata, indent=2, default=str))
+        os.replace(tmp_dir, model_dir / version)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    tmp_latest = model_dir / 'LATEST.tmp'
+    tmp_latest.write_text(version)
+    os.replace(tmp_latest, model_dir / 'LATEST')
+    return version
+
+
+def list_versions(name, registry_dir=REGISTRY_DIR):
+    # Versiones guardadas de un modelo, de la más antigua a la más reciente
+    model_dir = Path(registry_dir) / name
+    if not model_dir.exists():
+        return []
+    return sorted(p.name for p in model_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+
+def resolve_version(name, version='latest', registry_dir=REGISTRY_DIR):
+    if version != 'latest':
+        return version
+    latest = Path(registry_dir) / name / 'LATEST'
+    if not latest.exists():
+        raise FileNotFoundError(f"No hay versiones guardadas de '{name}' en {registry_dir}")
+    return latest.read_text().strip()
+
+
+class ModelArtifact:
+    """
+    Versión de un modelo del registro. Los metadatos se leen al crearla; el modelo, el
+    preprocesador y el `target_scaler` se cargan la primera vez que se usan.
+
+    Los joblib se cargan con `mmap_mode='r'`: los arreglos numéricos de NumPy (coeficientes,
+    medias y escalas, y los nodos de `random_forest_compact`) quedan mapeados desde el archivo y se
+    comparten entre procesos a través de la caché de páginas. Los arreglos de objetos (p. ej. las
+    categorías del OneHotEncoder) se copian.
+
+    Los árboles de scikit-learn (`random_forest`) copian sus nodos al cargarse: no quedan mapeados
+    y no se garantiza que se compartan entre procesos. Después de un fork las páginas solo se
+    comparten hasta que se escriben, y el conteo de referencias de Python escribe en los objetos
+    aunque `predict` no modifique los árboles. Para servir un bosque con varios workers se usa
+    `random_forest_compact` (ver `compact_forest`).
+    """
+
+    def __init__(self, path, mmap_mode='r'):
+        self.path = Path(path)
+        self.mmap_mode = mmap_mode
+        self.metadata = json.loads((self.path / 'metadata.json').read_text())
+        self.name = self.metadata['name']
+        self.version = self.metadata['version']
+        self.features = self.metadata['features']
+        self.metrics = self.metadata['metrics']
+
+    @property
+    def is_keras(self):
+        # Se sabe por los metadatos, sin cargar TensorFlow
+        return self.metadata['files']['model'].endswith('.keras')
+
+    def _load_joblib(self, key):
+        import joblib
+
+        filename = self.metadata['files'].get(key)
+        return joblib.load(self.path / filename, mmap_mode=self.mmap_mode) if filename else None
+
+    @cached_property
+    def model(self):
+        if self.is_keras:
+            from tensorflow.keras.models import load_model
+            return load_model(self.path / self.metadata['files']['model'])
+        return self._load_joblib('model')
+
+    @cached_property
+    def preprocessor(self):
+        return self._load_joblib('preprocessor')
+
+    @cached_property
+    def target_scaler(self):
+        return self._load_joblib('target_scaler')
+
+    def load(self):
+        # Fuerza la carga de todos los componentes (p. ej. antes de hacer fork de los workers)
+        self.model, self.preprocessor, self.target_scaler
+        return self
+
+    def predict(self, df):
+        """
+        Predice el precio en pesos de un DataFrame de anuncios (aplica `expm1` y, para la red
+        neuronal, el preprocesador y el `target_scaler`).
+        """
+        import numpy as np
+
+        if self.features is not None:
+            df = df[self.features]
+        if self.preprocessor is None:
+            return np.expm1(self.model.predict(df))
+        X = self.preprocessor.transform(df)
+        if hasattr(X, 'toarray'):
+            X = X.toarray()
+        if _is_keras_model(self.model):
+            predictions = self.model.predict(X, verbose=0).reshape(-1, 1)
+        else:
+            predictions = self.model.predict(X).reshape(-1, 1)
+        if self.target_scaler is not None:
+            predictions = self.target_scaler.inverse_transform(predictions)
+        return np.expm1(predictions.ravel())
+
+
+def load_artifacts(name, version='latest', registry_dir=REGISTRY_DIR, mmap_mode='r'):
+    """
+    Abre una versión del registro sin cargar todavía el modelo.
+
+    Parámetros:
+    - name (str): Nombre del modelo.
+    - version (str): Versión, o 'latest' para la última guardada.
+    - registry_dir (str | Path): Carpeta del registro.
+    - mmap_mode (str | None): Modo de memory-map de joblib ('r' por defecto, None para copiar).
+
+    Retorna:
+    - ModelArtifact: Versión del modelo con carga diferida.
+    """
+    version = resolve_version(name, version, registry_dir)
+    return ModelArtifact(Path(registry_dir) / name / version, mmap_mode=mmap_mode)
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from ..rutas import DIR_FIGURAS
+
+
+def prediction_plot_path(name):
+    # Ruta por defecto del gráfico de un modelo en reports/figures/
+    return DIR_FIGURAS / f'{name}_predicciones.png'
+
+
+def plot_predictions(y_true, predictions, path, title='Valores reales vs Predicciones'):
+    """
+    Guarda el gráfico de valores reales contra predicciones en un archivo.
+
+    Se dibuja sobre una `Figure` de matplotlib sin pasar por `pyplot`, así que funciona sin
+    pantalla (servidores, integración continua) y no abre ventanas ni bloquea la ejecución.
+    matplotlib y seaborn se importan solo al llamar esta función.
+
+    Parámetros:
+    - y_true (array-like): Precios reales.
+    - predictions (array-like): Precios predichos.
+    - path (str | Path): Archivo de salida (.png, .svg, .pdf).
+    - title (str): Título del gráfico.
+
+    Retorna:
+    - Path: Ruta del archivo guardado.
+    """
+    import numpy as np
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    y_true = np.asarray(y_true).ravel()
+    predictions = np.asarray(predictions).ravel()
+
+    figure = Figure(figsize=(7, 4))
+    ax = figure.add_subplot()
+    sns.scatterplot(x=y_true, y=predictions, alpha=0.5, ax=ax)
+    ax.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], 'k--', lw=2)
+    ax.ticklabel_format(style='plain')
+    ax.set_xlabel('Valores reales')
+    ax.set_ylabel('Predicciones')
+    ax.set_title(title)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    figure.savefig(path, bbox_inches='tight')
+    return path
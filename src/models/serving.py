@@ -0,0 +1,334 @@
+import argparse
+import json
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .registry import load_artifacts
+
+
+def load_pipeline_predictor(model_path):
+    """
+    Carga un Pipeline ajustado (preprocesador + regresor, p. ej. el de `train_random_forest` o
+    `train_linear_regression`) guardado con joblib. La función retornada recibe un DataFrame de
+    anuncios y retorna los precios en pesos.
+    """
+    model = joblib.load(model_path)
+
+    def predict(df):
+        return np.expm1(model.predict(df))
+
+    return predict
+
+
+def load_keras_predictor(model_path, preprocessor_path, target_scaler_path):
+    """
+    Carga la red neuronal (.keras) con su preprocesador ajustado y el `target_scaler`, guardados
+    con joblib. Las predicciones se llevan de la escala del escalador a precio con `expm1`.
+    """
+    from tensorflow.keras.models import load_model
+
+    model = load_model(model_path)
+    preprocessor = joblib.load(preprocessor_path)
+    target_scaler = joblib.load(target_scaler_path)
+
+    def predict(df):
+        X = preprocessor.transform(df)
+        if hasattr(X, 'toarray'):
+            X = X.toarray()
+        predictions = model.predict(X, verbose=0).reshape(-1, 1)
+        return np.expm1(target_scaler.inverse_transform(predictions).ravel())
+
+    return predict
+
+
+def load_numpy_predictor(network_path, preprocessor_path):
+    """
+    Carga la red exportada con `nn_export` (.npz con los pesos y el `target_scaler`) y su
+    preprocesador. Predice solo con NumPy: no importa TensorFlow.
+    """
+    from .nn_export import NumpyNetwork
+
+    network = NumpyNetwork.load(network_path)
+    preprocessor = joblib.load(preprocessor_path)
+
+    def predict(df):
+        return network.predict_price(preprocessor.transform(df))
+
+    return predict
+
+
+class ServiceMetrics:
+    """
+    Métricas del servicio: anuncios por segundo, latencias p50/p99 de las últimas `window`
+    peticiones e histograma de tamaños de lote (potencias de 2).
+    """
+
+    def __init__(self, window=10_000):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.listings = 0
+        self.batches = 0
+        self.errors = 0
+        self.batch_sizes = {}
+
+    def record_batch(self, size):
+        bucket = 1 << max(size - 1, 0).bit_length()
+        with self.lock:
+            self.batches += 1
+            self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+
+    def record_request(self, listings, latency, error=False):
+        with self.lock:
+            self.requests += 1
+            self.listings += listings
+            self.errors += error
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.perf_counter() - self.started
+            latencies = np.array(self.latencies) * 1000
+            return {
+                'uptime_s': elapsed,
+                'requests': self.requests,
+                'listings': self.listings,
+                'errors': self.errors,
+                'batches': self.batches,
+                'throughput_listings_s': self.listings / elapsed if elapsed else 0.0,
+                'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+                'batch_size_histogram': {f'<={k}': v for k, v in sorted(self.batch_sizes.items())},
+            }
+
+
+class MicroBatcher:
+    """
+    Agrupa las peticiones concurrentes en lotes para hacer una sola llamada vectorizada a
+    `predict` por lote.
+
+    Un hilo toma la primera petición de la cola y espera como máximo `max_wait_ms` a que lleguen
+    más, hasta juntar `max_batch_size` anuncios; luego predice el lote completo y reparte los
+    resultados. Si la predicción del lote falla, cada petición se predice por separado para que el
+    error solo afecte a la que lo causó.
+
+    Parámetros:
+    - predict (callable): Función DataFrame -> precios.
+    - max_batch_size (int): Anuncios máximos por lote.
+    - max_wait_ms (float): Espera máxima para completar un lote.
+    - metrics (ServiceMetrics): Métricas donde se registran los lotes y las peticiones.
+    """
+
+    def __init__(self, predict, max_batch_size=256, max_wait_ms=5.0, metrics=None):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or ServiceMetrics()
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def submit(self, records):
+        # records: lista de anuncios (dict); retorna un Future con la lista de precios
+        future = Future()
+        self.queue.put((records, future, time.perf_counter()))
+        return future
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            size = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self.process(batch, size)
+
+    def process(self, batch, size):
+        self.metrics.record_batch(size)
+        try:
+            prices = self.predict(pd.DataFrame([record for records, _, _ in batch for record in records]))
+            start = 0
+            for records, future, _ in batch:
+                future.set_result(prices[start:start + len(records)].tolist())
+                start += len(records)
+        except Exception:
+            for records, future, _ in batch:
+                try:
+                    future.set_result(self.predict(pd.DataFrame(records)).tolist())
+                except Exception as error:
+                    future.set_exception(error)
+        now = time.perf_counter()
+        for records, future, submitted in batch:
+            self.metrics.record_request(len(records), now - submitted, error=future.exception() is not None)
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # POST /predict con un anuncio (objeto JSON) o varios (lista o {"listings": [...]})
+    # GET /metrics y GET /health
+    batcher = None
+    timeout_s = 30
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self.send_json(200, self.batcher.metrics.snapshot())
+        elif self.path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        else:
+            self.send_json(404, {'error': 'Ruta no encontrada'})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.send_json(404, {'error': 'Ruta no encontrada'})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except (ValueError, json.JSONDecodeError):
+            self.send_json(400, {'error': 'JSON inválido'})
+            return
+
+        single = isinstance(payload, dict) and 'listings' not in payload
+        records = [payload] if single else payload.get('listings') if isinstance(payload, dict) else payload
+        if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+            self.send_json(400, {'error': 'Se esperaba un anuncio o una lista de anuncios'})
+            return
+
+        try:
+            prices = self.batcher.submit(records).result(timeout=self.timeout_s)
+        except Exception as error:
+            self.send_json(422, {'error': str(error)})
+            return
+        self.send_json(200, {'precio': prices[0]} if single else {'precios': prices})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(predict, host='127.0.0.1', port=8000, max_batch_size=256, max_wait_ms=5.0):
+    """
+    Crea el servidor HTTP de predicción (un hilo por conexión) con su MicroBatcher.
+
+    Retorna:
+    - ThreadingHTTPServer: Servidor listo para `serve_forever()`.
+    """
+    handler = type('Handler', (PredictionHandler,), {
+        'batcher': MicroBatcher(predict, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_workers(predict, workers, host='127.0.0.1', port=8000, max_batch_size=256, max_wait_ms=5.0):
+    """
+    Sirve con varios procesos que comparten el socket y el modelo.
+
+    El modelo ya debe estar cargado en este proceso: los workers se crean con fork y heredan sus
+    páginas de memoria. Solo los arreglos mapeados desde el registro (`mmap_mode='r'`, p. ej. los
+    nodos de `random_forest_compact`) se comparten de forma garantizada; las demás páginas se
+    copian en cada worker a medida que se escriben, y el conteo de referencias escribe en los
+    objetos de Python, así que un `random_forest` de scikit-learn puede terminar duplicado en cada
+    worker (ver `ModelArtifact`). Cada worker tiene su propio MicroBatcher y sus propias métricas.
+
+    No se debe usar con modelos de Keras: hacer fork después de que TensorFlow inicia sus pools de
+    hilos deja a los workers con locks en estados inconsistentes. Para la red neuronal se sirve la
+    exportación `.npz` de `nn_export`, que solo usa NumPy.
+    """
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    server.daemon_threads = True
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            server.RequestHandlerClass = type('Handler', (PredictionHandler,), {
+                'batcher': MicroBatcher(predict, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms),
+            })
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(*_):
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        raise SystemExit(0)
+
+    # Al terminar el proceso principal (Ctrl+C o SIGTERM) se terminan también los workers
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servicio HTTP de predicción de precios de arriendo')
+    parser.add_argument('model', help='Modelo del registro (nombre[:versión]), Pipeline .joblib, modelo .keras '
+                                      'o red exportada .npz')
+    parser.add_argument('--preprocessor', help='Preprocesador ajustado (solo para .keras y .npz)')
+    parser.add_argument('--target-scaler', help='target_scaler ajustado (solo para .keras)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos de servicio (fork). Solo los modelos con arreglos mapeados del registro, '
+                             'como random_forest_compact, comparten su memoria de forma garantizada; no disponible '
+                             'para modelos .keras')
+    args = parser.parse_args(argv)
+
+    artifact = None
+    if not args.model.endswith(('.keras', '.npz', '.joblib', '.pkl')):
+        name, _, version = args.model.partition(':')
+        artifact = load_artifacts(name, version or 'latest')
+    # La validación va antes de cargar el modelo para no iniciar TensorFlow en el proceso que hace fork
+    if args.workers > 1 and (args.model.endswith('.keras') or (artifact is not None and artifact.is_keras)):
+        parser.error('--workers > 1 no es compatible con modelos de Keras; exporte la red con '
+                     '`python -m src.models.nn_export` y sirva el .npz')
+
+    if args.model.endswith('.keras'):
+        predict = load_keras_predictor(args.model, args.preprocessor, args.target_scaler)
+    elif args.model.endswith('.npz'):
+        predict = load_numpy_predictor(args.model, args.preprocessor)
+    elif args.model.endswith(('.joblib', '.pkl')):
+        predict = load_pipeline_predictor(args.model)
+    else:
+        predict = artifact.load().predict
+
+    print(f"Sirviendo en http://{args.host}:{args.port}/predict")
+    if args.workers > 1:
+        serve_workers(predict, args.workers, args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    else:
+        create_server(predict, args.host, args.port, args.max_batch_size, args.max_wait_ms).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.neighbors import KDTree
+
+EARTH_RADIUS_KM = 6371.0088
+SPATIAL_COLUMNS = ['latitud', 'longitud', 'area_construida_m2']
+
+
+class SpatialFeatures(BaseEstimator, TransformerMixin):
+    """
+    Características de vecindario a partir de latitud y longitud.
+
+    Al ajustar se proyectan las coordenadas de entrenamiento a un plano local en km (equirectangular
+    alrededor de la latitud media, con error menor al 1 % a la escala del Valle de Aburrá frente a
+    la distancia haversine), se construye un KD-tree y se guarda el log del precio por m² de cada
+    anuncio. Para cada anuncio se calculan:
+    - por cada radio de `radii_km`: el número de anuncios dentro del radio (densidad, en log1p) y
+      la mediana del log del precio por m² de los anuncios dentro del radio, tomada entre los
+      `max_neighbors` más cercanos;
+    - entre los `n_neighbors` más cercanos: la mediana del log del precio por m² y la distancia
+      media en km.
+
+    En `fit_transform` cada anuncio de entrenamiento se excluye de sus propios vecinos
+    (leave-one-out) para que la característica no contenga su propio precio. `transform` consulta
+    el índice ajustado por lotes sin reconstruirlo; el transformador se guarda con joblib junto
+    con el pipeline.
+
+    Parámetros:
+    - radii_km (tuple[float]): Radios de las ventanas, en km.
+    - n_neighbors (int): Número de vecinos más cercanos.
+    - max_neighbors (int): Vecinos considerados para las medianas por radio.
+    - target_scaler: Escalador ya ajustado sobre `y` (p. ej. el de la red neuronal). Si se indica,
+      `y` se lleva a `precio_log` con `inverse_transform` antes de calcular el precio por m².
+    - leaf_size (int): Tamaño de hoja del KD-tree.
+    - batch_size (int): Anuncios consultados por lote.
+
+    Las columnas de entrada son, en orden, latitud, longitud y área (`SPATIAL_COLUMNS`); `y` es
+    `precio_log`.
+    """
+
+    def __init__(self, radii_km=(0.5, 1.0, 2.0), n_neighbors=10, max_neighbors=128, target_scaler=None,
+                 leaf_size=40, batch_size=5_000):
+        self.radii_km = radii_km
+        self.n_neighbors = n_neighbors
+        self.max_neighbors = max_neighbors
+        self.target_scaler = target_scaler
+        self.leaf_size = leaf_size
+        self.batch_size = batch_size
+
+    def _project(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        lat, lon = np.radians(X[:, 0]), np.radians(X[:, 1])
+        return EARTH_RADIUS_KM * np.column_stack([lat, lon * self.cos_lat_]), X[:, 2]
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        self.cos_lat_ = float(np.cos(np.radians(np.nanmean(X[:, 0]))))
+        points, area = self._project(X)
+        y = np.asarray(y, dtype=np.float64).reshape(-1, 1)
+        if self.target_scaler is not None:
+            y = self.target_scaler.inverse_transform(y)
+        # log(precio / m²) a partir de precio_log = log1p(precio)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_m2 = np.log(np.expm1(y.ravel())) - np.log(area)
+
+        valid = np.isfinite(points).all(axis=1) & np.isfinite(price_m2)
+        self.row_index_ = np.where(valid, np.cumsum(valid) - 1, -1)
+        self.price_m2_ = price_m2[valid]
+        self.global_median_ = float(np.median(self.price_m2_))
+        self.tree_ = KDTree(points[valid], leaf_size=self.leaf_size)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def _features(self, points, own_index):
+        # own_index: posición de cada fila dentro del árbol (-1 si no está) para excluirla
+        n = len(points)
+        in_tree = own_index >= 0
+        k = min(max(self.max_neighbors, self.n_neighbors), len(self.price_m2_) - 1)
+        distances, neighbors = self.tree_.query(points, k=k + 1)
+        # Se quita la propia fila; si no aparece (o no está en el árbol) se quita el vecino k+1
+        drop = neighbors == own_index[:, None]
+        drop[~drop.any(axis=1), -1] = True
+        neighbors = neighbors[~drop].reshape(n, k)
+        distances = distances[~drop].reshape(n, k)
+        prices = self.price_m2_[neighbors]
+
+        features = []
+        for radius in self.radii_km:
+            counts = self.tree_.query_radius(points, r=radius, count_only=True) - in_tree
+            inside = distances <= radius
+            any_inside = inside.any(axis=1)
+            median = np.full(n, self.global_median_)
+            median[any_inside] = np.nanmedian(np.where(inside, prices, np.nan)[any_inside], axis=1)
+            features += [np.log1p(counts), median]
+
+        nearest = slice(0, self.n_neighbors)
+        features += [np.median(prices[:, nearest], axis=1), distances[:, nearest].mean(axis=1)]
+        return np.column_stack(features)
+
+    def _transform(self, X, own_index):
+        points, _ = self._project(X)
+        output = np.empty((len(points), 2 * len(self.radii_km) + 2))
+        # Sin coordenadas: densidad 0, la mediana global y distancia 0
+        missing = ~np.isfinite(points).all(axis=1)
+        output[missing] = [0.0, self.global_median_] * len(self.radii_km) + [self.global_median_, 0.0]
+        rows = np.flatnonzero(~missing)
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            output[batch] = self._features(points[batch], own_index[batch])
+        return output
+
+    def transform(self, X):
+        return self._transform(X, np.full(len(X), -1))
+
+    def fit_transform(self, X, y=None, **fit_params):
+        self.fit(X, y)
+        return self._transform(X, self.row_index_)
+
+    def get_feature_names_out(self, input_features=None):
+        names = []
+        for radius in self.radii_km:
+            names += [f'densidad_{radius:g}km', f'precio_m2_mediana_{radius:g}km']
+        return np.array(names + [f'precio_m2_mediana_{self.n_neighbors}nn', f'distancia_media_{self.n_neighbors}nn'],
+                        dtype=object)
@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+from scipy import sparse
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from .dataset import (DATA_PATH, TARGET, build_preprocessor, file_sha256, fit_and_predict, load_data,
+                      regression_metrics, split_data)
+from ..instrumentation import medir
+from .registry import REGISTRY_DIR, save_artifacts
+
+MODELS = ['linear_regression', 'random_forest', 'neural_network']
+
+
+def matrices_key(filepath, spatial_features, test_size, random_state):
+    # Las matrices dependen del contenido del archivo fuente y de la configuración de la partición
+    config = {
+        'source_sha256': file_sha256(filepath),
+        'spatial_features': spatial_features,
+        'test_size': test_size,
+        'random_state': random_state,
+        'sklearn': sklearn.__version__,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def save_matrix(path, matrix):
+    if sparse.issparse(matrix):
+        sparse.save_npz(path.with_suffix('.npz'), matrix.tocsr(), compressed=False)
+    else:
+        np.save(path.with_suffix('.npy'), np.ascontiguousarray(matrix))
+
+
+def load_matrix(path, mmap_mode='r'):
+    if path.with_suffix('.npz').exists():
+        return sparse.load_npz(path.with_suffix('.npz'))
+    return np.load(path.with_suffix('.npy'), mmap_mode=mmap_mode)
+
+
+def prepare_matrices(filepath=DATA_PATH, spatial_features=False, test_size=0.2, random_state=42, cache_dir=None,
+                     use_cache=True):
+    """
+    Carga los datos, hace la partición y ajusta el preprocesador una sola vez para todos los modelos.
+
+    Las matrices transformadas de entrenamiento y prueba (densas en .npy o dispersas en .npz), los
+    objetivos, el preprocesador ajustado y el `target_scaler` de la red neuronal se guardan en
+    `.cache/matrices-<clave>/` junto al archivo fuente. La clave depende del contenido del archivo y
+    de la configuración, así que las siguientes ejecuciones reutilizan las matrices sin volver a
+    preprocesar.
+
+    Parámetros:
+    - filepath (str | Path): Archivo del conjunto de datos.
+    - spatial_features (bool): Incluir las características de vecindario.
+    - test_size (float): Proporción de prueba.
+    - random_state (int): Semilla de la partición.
+    - cache_dir (str | Path): Carpeta de la caché. Por defecto `.cache/` junto al archivo fuente.
+    - use_cache (bool): Si es False se vuelven a calcular las matrices.
+
+    Retorna:
+    - Path: Carpeta con las matrices (ver `load_matrices`).
+    """
+    filepath = Path(filepath)
+    cache_dir = Path(cache_dir) if cache_dir else filepath.parent / '.cache'
+    key = matrices_key(filepath, spatial_features, test_size, random_state)
+    matrices_dir = cache_dir / f'matrices-{key}'
+    if use_cache and (matrices_dir / 'meta.json').exists():
+        return matrices_dir
+
+    df = load_data(filepath)
+    X_train, X_test, y_train, y_test = split_data(df, test_size=test_size, random_state=random_state)
+    preprocessor = build_preprocessor(df, spatial_features)
+    with medir('preprocesamiento', spatial_features=spatial_features):
+        X_train_transformed = preprocessor.fit_transform(X_train, y_train)
+        X_test_transformed = preprocessor.transform(X_test)
+    # La red neuronal escala el objetivo con todos los datos (ver neural_network.preprocess_data)
+    target_scaler = StandardScaler().fit(df[TARGET].values.reshape(-1, 1))
+
+    tmp_dir = cache_dir / f'.matrices-{key}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    save_matrix(tmp_dir / 'X_train', X_train_transformed)
+    save_matrix(tmp_dir / 'X_test', X_test_transformed)
+    np.save(tmp_dir / 'y_train.npy', y_train.to_numpy())
+    np.save(tmp_dir / 'y_test.npy', y_test.to_numpy())
+    joblib.dump(preprocessor, tmp_dir / 'preprocessor.joblib')
+    joblib.dump(target_scaler, tmp_dir / 'target_scaler.joblib')
+    (tmp_dir / 'meta.json').write_text(json.dumps({
+        'source': str(filepath.resolve()),
+        'features': X_train.columns.tolist(),
+        'spatial_features': spatial_features,
+        'test_size': test_size,
+        'random_state': random_state,
+        'shape_train': list(X_train_transformed.shape),
+        'shape_test': list(X_test_transformed.shape),
+    }))
+    shutil.rmtree(matrices_dir, ignore_errors=True)
+    os.replace(tmp_dir, matrices_dir)
+    return matrices_dir
+
+
+def load_matrices(matrices_dir, mmap_mode='r'):
+    # Matrices y objetos guardados por prepare_matrices; los .npy densos se abren con memory-map
+    matrices_dir = Path(matrices_dir)
+    meta = json.loads((matrices_dir / 'meta.json').read_text())
+    return {
+        'X_train': load_matrix(matrices_dir / 'X_train', mmap_mode),
+        'X_test': load_matrix(matrices_dir / 'X_test', mmap_mode),
+        'y_train': np.load(matrices_dir / 'y_train.npy'),
+        'y_test': np.load(matrices_dir / 'y_test.npy'),
+        'preprocessor': joblib.load(matrices_dir / 'preprocessor.joblib'),
+        'target_scaler': joblib.load(matrices_dir / 'target_scaler.joblib'),
+        'features': meta['features'],
+    }
+
+
+def fit_model(name, matrices_dir, registry_dir=REGISTRY_DIR, save=True):
+    """
+    Entrena un modelo sobre las matrices ya transformadas, lo evalúa en precio y lo guarda en el
+    registro. El Pipeline guardado combina el preprocesador compartido con el regresor ajustado,
+    igual que el de `train_regressor` (el ajuste y la predicción usan el mismo `fit_and_predict`).
+
+    Retorna:
+    - dict: Nombre, versión del registro, métricas y segundos de entrenamiento.
+    """
+    start = time.perf_counter()
+    matrices = load_matrices(matrices_dir)
+    X_train, X_test = matrices['X_train'], matrices['X_test']
+    y_train, y_test = matrices['y_train'], matrices['y_test']
+    preprocessor, target_scaler = matrices['preprocessor'], matrices['target_scaler']
+
+    if name == 'neural_network':
+        from .neural_network import fit_neural_network, predict_neural_network
+
+        # fit_neural_network y predict_neural_network convierten las matrices a float32 una sola vez
+        model, _ = fit_neural_network(X_train, target_scaler.transform(y_train.reshape(-1, 1)))
+        predictions = predict_neural_network(model, X_test, target_scaler)
+        artifacts = {'preprocessor': preprocessor, 'target_scaler': target_scaler}
+    else:
+        if name == 'linear_regression':
+            from .linear_regression import build_linear_regression as build_model
+        elif name == 'random_forest':
+            from .random_forest import build_random_forest as build_model
+        else:
+            raise ValueError(f"Modelo desconocido: {name}")
+        regressor = build_model()
+        predictions = fit_and_predict(name, regressor, X_train, y_train, X_test)
+        model = Pipeline([('preprocessor', preprocessor), ('regressor', regressor)])
+        artifacts = {}
+
+    metrics = regression_metrics(np.expm1(y_test), predictions)
+    seconds = time.perf_counter() - start
+    version = None
+    if save:
+        version = save_artifacts(name, model, features=matrices['features'], metrics=metrics,
+                                 params={'matrices': Path(matrices_dir).name, 'train_seconds': seconds},
+                                 registry_dir=registry_dir, **artifacts)
+    return {'model': name, 'version': version, 'metrics': metrics, 'seconds': seconds}
+
+
+def train_all(models=MODELS, filepath=DATA_PATH, spatial_features=False, n_jobs=1, use_cache=True,
+              registry_dir=REGISTRY_DIR, save=True):
+    """
+    Compara los modelos con un solo preprocesamiento: prepara (o reutiliza) las matrices y entrena
+    cada modelo sobre ellas, en procesos separados si `n_jobs` > 1. Todos los modelos usan la misma
+    partición.
+
+    Retorna:
+    - list[dict]: Resultado de `fit_model` para cada modelo, en el orden de `models`.
+    """
+    matrices_dir = prepare_matrices(filepath, spatial_features=spatial_features, use_cache=use_cache)
+    if n_jobs == 1:
+        return [fit_model(name, matrices_dir, registry_dir, save) for name in models]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        futures = [pool.submit(fit_model, name, matrices_dir, registry_dir, save) for name in models]
+        return [future.result() for future in futures]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Entrena y compara los modelos con un solo preprocesamiento')
+    parser.add_argument('--data', default=str(DATA_PATH), help='Archivo del conjunto de datos')
+    parser.add_argument('--models', nargs='+', default=MODELS, choices=MODELS)
+    parser.add_argument('--spatial-features', action='store_true', help='Incluir características de vecindario')
+    parser.add_argument('--jobs', type=int, default=1, help='Modelos entrenados en paralelo')
+    parser.add_argument('--no-cache', action='store_true', help='Recalcular las matrices')
+    parser.add_argument('--no-save', action='store_true', help='No guardar los modelos en el registro')
+    args = parser.parse_args(argv)
+
+    results = train_all(args.models, args.data, args.spatial_features, args.jobs, not args.no_cache,
+                        save=not args.no_save)
+    print(f"{'Modelo':<20}{'MAE':>14}{'RMSE':>14}{'R2':>8}{'Segundos':>10}  Versión")
+    for result in results:
+        metrics = result['metrics']
+        print(f"{result['model']:<20}{metrics['mae']:>14.0f}{metrics['rmse']:>14.0f}{metrics['r2']:>8.4f}"
+              f"{result['seconds']:>10.1f}  {result['version'] or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import StandardScaler
+
+from .dataset import DATA_PATH, build_preprocessor, load_data, regression_metrics, split_data
+from .registry import REGISTRY_DIR
+from .training import load_matrix, matrices_key, save_matrix
+
+# Carpeta por defecto de los registros de ensayos
+TUNING_DIR = REGISTRY_DIR / 'tuning'
+
+# Espacios de búsqueda: lista de valores (elección) o (mínimo, máximo, 'log') para la tasa de aprendizaje
+RF_SPACE = {
+    'max_depth': [None, 10, 20, 30, 40],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'max_features': [1.0, 0.5, 0.3, 'sqrt'],
+}
+
+# Mismo espacio de la búsqueda con keras-tuner de 4_Red_Neuronal.ipynb
+NN_SPACE = {
+    'num_layers': [1, 2, 3, 4],
+    'units': list(range(32, 513, 32)),
+    'activation': ['relu', 'tanh', 'sigmoid', 'leaky_relu'],
+    'dropout': [0.0, 0.1, 0.2, 0.3, 0.4, 0.5],
+    'optimizer': ['adam', 'rmsprop', 'sgd', 'adadelta'],
+    'learning_rate': (1e-4, 2e-2, 'log'),
+}
+
+# Recurso de cada modelo en la búsqueda por etapas: árboles del bosque o épocas de la red
+RESOURCES = {
+    'random_forest': {'min_resource': 25, 'max_resource': 200, 'eta': 2},
+    'neural_network': {'min_resource': 4, 'max_resource': 36, 'eta': 3},
+}
+
+
+def sample_config(model, rng):
+    if model == 'random_forest':
+        return {name: values[rng.integers(len(values))] for name, values in RF_SPACE.items()}
+    params = {'num_layers': int(rng.choice(NN_SPACE['num_layers']))}
+    for i in range(params['num_layers']):
+        params[f'units_{i}'] = int(rng.choice(NN_SPACE['units']))
+        params[f'activation_{i}'] = str(rng.choice(NN_SPACE['activation']))
+        params[f'dropout_{i}'] = float(rng.choice(NN_SPACE['dropout']))
+    params['optimizer'] = str(rng.choice(NN_SPACE['optimizer']))
+    low, high, _ = NN_SPACE['learning_rate']
+    params['learning_rate'] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    return params
+
+
+def config_id(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def prepare_folds(filepath=DATA_PATH, n_splits=5, spatial_features=False, random_state=42, cache_dir=None):
+    """
+    Ajusta el preprocesador en cada partición de validación cruzada y guarda sus matrices.
+
+    Las particiones se hacen sobre el conjunto de entrenamiento de `split_data` (el de prueba no se
+    toca durante la búsqueda). Cada `fold_<i>/` tiene las matrices de entrenamiento y validación,
+    los objetivos y el `target_scaler` de la partición; si la carpeta ya existe (misma clave) se
+    reutiliza, así que el preprocesamiento se hace una sola vez por partición.
+
+    Retorna:
+    - list[Path]: Carpetas de las particiones.
+    """
+    filepath = Path(filepath)
+    cache_dir = Path(cache_dir) if cache_dir else filepath.parent / '.cache'
+    key = hashlib.sha256(
+        f'{matrices_key(filepath, spatial_features, 0.2, random_state)}-{n_splits}'.encode()).hexdigest()[:16]
+    folds_dir = cache_dir / f'folds-{key}'
+    fold_dirs = [folds_dir / f'fold_{i}' for i in range(n_splits)]
+    if all((fold_dir / 'y_val.npy').exists() for fold_dir in fold_dirs):
+        return fold_dirs
+
+    df = load_data(filepath)
+    X_train, _, y_train, _ = split_data(df, random_state=random_state)
+    folds = KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X_train)
+    for fold_dir, (train_index, val_index) in zip(fold_dirs, folds):
+        preprocessor = build_preprocessor(df, spatial_features)
+        X_fold, y_fold = X_train.iloc[train_index], y_train.iloc[train_index]
+        X_fold_transformed = preprocessor.fit_transform(X_fold, y_fold)
+        X_val_transformed = preprocessor.transform(X_train.iloc[val_index])
+
+        tmp_dir = fold_dir.with_name(fold_dir.name + '.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        save_matrix(tmp_dir / 'X_train', X_fold_transformed)
+        save_matrix(tmp_dir / 'X_val', X_val_transformed)
+        np.save(tmp_dir / 'y_train.npy', y_fold.to_numpy())
+        joblib.dump(StandardScaler().fit(y_fold.to_numpy().reshape(-1, 1)), tmp_dir / 'target_scaler.joblib')
+        # y_val se escribe al final: marca la partición como completa
+        np.save(tmp_dir / 'y_val.npy', y_train.iloc[val_index].to_numpy())
+        shutil.rmtree(fold_dir, ignore_errors=True)
+        os.replace(tmp_dir, fold_dir)
+    return fold_dirs
+
+
+def build_tunable_network(params, input_dim):
+    # Misma arquitectura parametrizada que build_model de 4_Red_Neuronal.ipynb
+    from tensorflow.keras.layers import BatchNormalization, Dense, Dropout, Input
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import SGD, Adadelta, Adam, RMSprop
+
+    model = Sequential([Input(shape=(input_dim,))])
+    for i in range(params['num_layers']):
+        model.add(Dense(params[f'units_{i}'], activation=params[f'activation_{i}']))
+        model.add(BatchNormalization())
+        model.add(Dropout(params[f'dropout_{i}']))
+    model.add(Dense(1))
+    optimizers = {'adam': Adam, 'rmsprop': RMSprop, 'sgd': SGD, 'adadelta': Adadelta}
+    model.compile(optimizer=optimizers[params['optimizer']](learning_rate=params['learning_rate']), loss='mse',
+                  metrics=['mae'])
+    return model
+
+
+def evaluate_trial(model, params, resource, fold_dir):
+    """
+    Entrena una configuración con `resource` árboles o épocas en una partición y la evalúa en su
+    conjunto de validación (métricas en pesos, como `evaluate_model`).
+    """
+    start = time.perf_counter()
+    fold_dir = Path(fold_dir)
+    X_train, X_val = load_matrix(fold_dir / 'X_train'), load_matrix(fold_dir / 'X_val')
+    y_train, y_val = np.load(fold_dir / 'y_train.npy'), np.load(fold_dir / 'y_val.npy')
+
+    if model == 'random_forest':
+        from sklearn.ensemble import RandomForestRegressor
+
+        regressor = RandomForestRegressor(n_estimators=resource, random_state=42, n_jobs=1, **params)
+        predictions = regressor.fit(X_train, y_train).predict(X_val)
+    else:
+        from .neural_network import PREDICT_BATCH_SIZE, make_dataset, to_float32
+
+        target_scaler = joblib.load(fold_dir / 'target_scaler.joblib')
+        network = build_tunable_network(params, X_train.shape[1])
+        network.fit(make_dataset(X_train, target_scaler.transform(y_train.reshape(-1, 1)), shuffle=True),
+                    epochs=resource, verbose=0)
+        predictions = network.predict(to_float32(X_val), batch_size=PREDICT_BATCH_SIZE, verbose=0)
+        predictions = target_scaler.inverse_transform(predictions.reshape(-1, 1)).ravel()
+
+    metrics = regression_metrics(np.expm1(y_val), np.expm1(predictions))
+    # Una red que diverge produce NaN o infinitos: se registra con el peor puntaje
+    metrics = {k: float(v) if np.isfinite(v) else float('inf') for k, v in metrics.items()}
+    return {**metrics, 'seconds': time.perf_counter() - start}
+
+
+def limit_threads():
+    # Con varios procesos, cada uno usa un solo hilo para no competir por los núcleos
+    for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS',
+                     'TF_NUM_INTEROP_THREADS'):
+        os.environ[variable] = '1'
+
+
+class TrialLog:
+    """
+    Registro JSONL de los ensayos (configuración, recurso, partición y métricas). Al reanudar una
+    búsqueda se leen los ensayos ya hechos y no se repiten.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.results = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        trial = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # línea incompleta de una ejecución interrumpida
+                    self.results[(trial['config_id'], trial['resource'], trial['fold'])] = trial
+
+    def get(self, cid, resource, fold):
+        return self.results.get((cid, resource, fold))
+
+    def add(self, trial):
+        self.results[(trial['config_id'], trial['resource'], trial['fold'])] = trial
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(trial, default=str) + '\n')
+
+
+def rung_resources(min_resource, max_resource, eta):
+    resources = []
+    resource = min_resource
+    while resource < max_resource:
+        resources.append(int(resource))
+        resource *= eta
+    return resources + [max_resource]
+
+
+def successive_halving(model, configs, fold_dirs, pool, log, min_resource, max_resource, eta, bracket=0):
+    """
+    Evalúa las configuraciones en todas las particiones con un recurso creciente y en cada etapa
+    conserva solo la mejor fracción 1/eta según el MAE medio de validación cruzada.
+
+    Retorna:
+    - list[dict]: Resumen de las configuraciones evaluadas en la última etapa que alcanzaron.
+    """
+    summaries = {}
+    survivors = list(configs)
+    resources = rung_resources(min_resource, max_resource, eta)
+    for rung, resource in enumerate(resources):
+        pending = {}
+        for params in survivors:
+            cid = config_id(params)
+            for fold, fold_dir in enumerate(fold_dirs):
+                if log.get(cid, resource, fold) is None:
+                    future = pool.submit(evaluate_trial, model, params, resource, str(fold_dir))
+                    pending[future] = (cid, params, fold)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                cid, params, fold = pending.pop(future)
+                log.add({'model': model, 'bracket': bracket, 'rung': rung, 'config_id': cid, 'params': params,
+                         'resource': resource, 'fold': fold, **future.result()})
+
+        for params in survivors:
+            cid = config_id(params)
+            trials = [log.get(cid, resource, fold) for fold in range(len(fold_dirs))]
+            mae = np.array([trial['mae'] for trial in trials])
+            summaries[cid] = {
+                'config_id': cid, 'params': params, 'resource': resource, 'bracket': bracket,
+                'mae_mean': float(mae.mean()), 'mae_std': float(mae.std()),
+                'rmse_mean': float(np.mean([trial['rmse'] for trial in trials])),
+                'rmse_std': float(np.std([trial['rmse'] for trial in trials])),
+                'r2_mean': float(np.mean([trial['r2'] for trial in trials])),
+                'r2_std': float(np.std([trial['r2'] for trial in trials])),
+            }
+        if rung < len(resources) - 1:
+            survivors.sort(key=lambda params: summaries[config_id(params)]['mae_mean'])
+            survivors = survivors[:max(1, len(survivors) // eta)]
+    return list(summaries.values())
+
+
+def tune(model, n_configs=None, n_splits=5, n_jobs=None, hyperband=False, filepath=DATA_PATH,
+         spatial_features=False, seed=42, log_dir=TUNING_DIR, **resources):
+    """
+    Búsqueda de hiperparámetros con validación cruzada de K particiones y eliminación temprana.
+
+    Las configuraciones se muestrean del espacio del modelo con una semilla fija y se evalúan con
+    successive halving: todas empiezan con pocos árboles (o épocas) y solo la mejor fracción pasa a
+    la siguiente etapa. Con `hyperband=True` se corren varias rondas de successive halving con
+    distintos compromisos entre número de configuraciones y recurso inicial. Cada (configuración,
+    recurso, partición) es una tarea de un pool de procesos; los resultados se agregan al registro
+    `<log_dir>/<model>_<clave>_trials.jsonl`, así que una búsqueda interrumpida se reanuda donde
+    quedó. La clave es la de las particiones de `prepare_folds` (contenido del archivo, `n_splits` y
+    `spatial_features`), así que al cambiar cualquiera de ellos la búsqueda empieza un registro nuevo.
+
+    Parámetros:
+    - model (str): 'random_forest' o 'neural_network'.
+    - n_configs (int): Configuraciones iniciales (por ronda). Por defecto eta^(etapas - 1).
+    - n_splits (int): Número de particiones.
+    - n_jobs (int): Procesos del pool. Por defecto el número de CPUs.
+    - hyperband (bool): Usar Hyperband en lugar de una sola ronda de successive halving.
+    - filepath (str | Path): Archivo del conjunto de datos.
+    - spatial_features (bool): Incluir las características de vecindario.
+    - seed (int): Semilla del muestreo de configuraciones.
+    - log_dir (str | Path): Carpeta de los registros de ensayos.
+    - **resources: `min_resource`, `max_resource` y `eta` (por defecto los de `RESOURCES`).
+
+    Retorna:
+    - list[dict]: Configuraciones ordenadas por MAE medio (primero las que llegaron al recurso
+      máximo), con media y desviación estándar de las métricas entre particiones.
+    """
+    settings = {**RESOURCES[model], **resources}
+    min_resource, max_resource, eta = settings['min_resource'], settings['max_resource'], settings['eta']
+    fold_dirs = prepare_folds(filepath, n_splits=n_splits, spatial_features=spatial_features)
+    # El registro lleva la clave de las particiones (datos, n_splits, spatial_features): los ensayos
+    # de otras particiones no se reutilizan
+    folds_key = fold_dirs[0].parent.name.removeprefix('folds-')
+    log = TrialLog(Path(log_dir) / f'{model}_{folds_key}_trials.jsonl')
+    rng = np.random.default_rng(seed)
+
+    n_rungs = len(rung_resources(min_resource, max_resource, eta))
+    if hyperband:
+        # Ronda s: empieza en max_resource / eta^s con más configuraciones cuanto mayor es s
+        brackets = [(s, math.ceil(n_rungs / (s + 1) * eta ** s), max(min_resource, max_resource // eta ** s))
+                    for s in reversed(range(n_rungs))]
+    else:
+        brackets = [(n_rungs - 1, n_configs or eta ** (n_rungs - 1), min_resource)]
+
+    summaries = []
+    n_jobs = n_jobs or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=limit_threads if n_jobs > 1 else None) as pool:
+        for bracket, count, start_resource in brackets:
+            configs = [sample_config(model, rng) for _ in range(n_configs or count)]
+            summaries += successive_halving(model, configs, fold_dirs, pool, log, start_resource, max_resource,
+                                            eta, bracket=bracket)
+
+    summaries.sort(key=lambda summary: (-summary['resource'], summary['mae_mean']))
+    (Path(log_dir) / f'{model}_summary.json').write_text(json.dumps(summaries, indent=2, default=str))
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Búsqueda de hiperparámetros con validación cruzada')
+    parser.add_argument('model', choices=list(RESOURCES))
+    parser.add_argument('--configs', type=int, help='Configuraciones iniciales')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, help='Procesos (por defecto todos los núcleos)')
+    parser.add_argument('--hyperband', action='store_true')
+    parser.add_argument('--min-resource', type=int)
+    parser.add_argument('--max-resource', type=int)
+    parser.add_argument('--eta', type=int)
+    parser.add_argument('--spatial-features', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data', default=str(DATA_PATH))
+    args = parser.parse_args(argv)
+
+    resources = {name: value for name, value in (('min_resource', args.min_resource),
+                                                 ('max_resource', args.max_resource),
+                                                 ('eta', args.eta)) if value is not None}
+    summaries = tune(args.model, args.configs, args.folds, args.jobs, args.hyperband, args.data,
+                     args.spatial_features, args.seed, **resources)
+    print(f"{'Configuración':<14}{'Recurso':>8}{'MAE medio':>14}{'± desv.':>12}{'R2 medio':>10}{'± desv.':>9}")
+    for summary in summaries[:10]:
+        print(f"{summary['config_id']:<14}{summary['resource']:>8}{summary['mae_mean']:>14.0f}"
+              f"{summary['mae_std']:>12.0f}{summary['r2_mean']:>10.4f}{summary['r2_std']:>9.4f}")
+    print("Mejor configuración:", json.dumps(summaries[0]['params'], default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,417 @@
-# import pandas as pd
-# from sklearn.model_selection import train_test_split
-# from sklearn.preprocessing import StandardScaler
-
-# def load_data(file_path):
-#     """Load the dataset from a specified file path."""
-#     data = pd.read_csv(file_path)
-#     return data
-
-# def clean_data(data):
-#     """Clean the dataset by handling missing values and duplicates."""
-#     data = data.drop_duplicates()
-#     data = data.dropna()
-#     return data
-
-# def feature_engineering(data):
-#     """Perform feature engineering on the dataset."""
-#     # Example: Convert categorical variables to dummy variables
-#     data = pd.get_dummies(data, drop_first=True)
-#     return data
-
-# def preprocess_data(file_path):
-#     """Load, clean, and preprocess the data."""
-#     data = load_data(file_path)
-#     data = clean_data(data)
-#     data = feature_engineering(data)
-#     return data
-
-# def scale_features(X):
-#     """Scale features using StandardScaler."""
-#     scaler = StandardScaler()
-#     X_scaled = scaler.fit_transform(X)
-#     return X_scaled
-
-# def split_data(data, target_column):
-#     """Split the data into features and target variable."""
-#     X = data.drop(columns=[target_column])
-#     y = data[target_column]
-#     X_scaled = scale_features(X)
-#     X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
-#     return X_train, X_test, y_train, y_test
\ No newline at end of file
+import argparse
+import re
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import unidecode
+
+from .data_collection import CIUDADES
+from .dedup import agrupar_duplicados
+from .imputation import COLUMNAS_IMPUTADAS, ImputadorKNN, guardar_imputador
+from .instrumentation import medir
+from .keyword_flags import DetectorPalabrasClave, leer_condiciones
+from .rutas import DIR_DATOS_CRUDOS, DIR_DATOS_PROCESADOS
+
+# Columnas del CSV crudo que no se usan en el modelo
+COLUMNAS_DESCARTADAS = ['redes_sociales', 'video', 'telefono', 'direccion_propietario', 'tipo_propietario', 'propietario',
+                        'url_anuncio', 'imagenes', 'moneda', 'direccion', 'id', 'titulo', 'departamento', 'barrio']
+
+# Agrupación de las facilidades de la API en categorías más generales
+CATEGORIAS_FACILIDADES = {
+    "Infraestructura y Accesibilidad": ["Acceso Pavimentado", "Cómodas vías de acceso", "Sobre vía principal", "Sobre vía secundaria", "Trans. Público cercano"],
+    "Parqueadero": ["Garaje", "Garaje Cubierto", "Parqueadero(s)", "Parqueadero Subterráneo", "Parqueadero Visitantes", "Parqueadero inteligente", "Bahía exterior de parqueo"],
+    "Seguridad": ["Alarma", "Alarma Contra Incendio", "Circuito cerrado de TV", "Control de acceso digital", "Reja de Seguridad", "Puerta de seguridad", "Vigilancia 24x7", "Seguridad", "Estación de Policía", "Guardia"],
+    "Ascensores": ["Ascensor", "Ascensores Comunales", "Ascensor(es) inteligente(s)", "Ascensor Privado"],
+    "Servicios Públicos": ["Alcantarillado", "Tanques de Agua", "Planta Eléctrica", "Shut de basura"],
+    "Tecnología y Conectividad": ["Disponibilidad WiFi", "Cableado de Red", "Detector de Metales", "Sensor de movimiento", "Edificio Inteligente"],
+    "Distribución": ["Balcones", "Terraza", "Patio", "Patio Interno"],
+    "Baños": ["Baño Auxiliar", "Baño de Servicio", "Baño Independiente", "Baño compartido"],
+    "Cocina": ["Cocina Equipada", "Cocina Integral", "Cocina tipo Americano", "Cocineta", "Barra estilo americano"],
+    "Zonas Sociales": ["Salón Comunal", "Salón de Juegos", "Salón de conferencias", "Salón de videoconferencias", "Gimnasio"],
+    "Otras Características": ["Chimenea", "Estudio", "Mezzanine", "Loft", "Duplex"],
+    "Zona Residencial": ["Zona Residencial", "En zona residencial", "Ubicada en edificio", "En conjunto cerrado", "En condominio"],
+    "Zona Comercial": ["Zona Comercial", "Cerca a sector comercial", "Pasaje Comercial", "En centro Comercial", "Locales comerciales", "Oficinas administrativas"],
+    "Zona Industrial": ["Zona Industrial", "Parque industrial", "Bodega", "Galpón", "Soporte de grúas"],
+    "Zona Campestre": ["Zona Campestre", "Área Rural", "Finca cafetera", "Nacimientos de agua", "Río / Quebrada cercano(a)"],
+    "Deportes": ["Cancha de Baloncesto", "Cancha de Futbol", "Cancha de Squash", "Cancha de Tennis", "Canchas Deportivas"],
+    "Piscina y Spa": ["Piscina", "Sauna / Turco / Jacuzzi"],
+    "Zonas Verdes": ["Jardines Exteriores", "Zonas Verdes", "Senderos ecológicos", "Árboles frutales"],
+    "BBQ y Entretenimiento": ["Zona de BBQ", "Kiosko", "Zona de Camping", "Zona de Hamacas"],
+    "Condiciones del Inmueble": ["Remodelado", "Para estrenar", "Amoblado", "Moderno"],
+    "Exclusividad y Lujo": ["Exclusivo", "Lujoso", "Premium", "Alta Gama", "Penthouse"],
+    "Vista Panorámica": ["Vista panorámica", "Hermosa vista", "Vista a la ciudad", "Vista a las montañas"],
+    "Confortabilidad": ["Espacioso", "Amplio", "Luminoso", "Acogedor"],
+    "Transporte": ["Proximo al metro", "Transporte público", "vías principales","cerca del metro", "cercano al metro", "metroplus", "ruta integrada", "transporte publico"]
+}
+
+# Condiciones de la vivienda (sección `condiciones` de keyword_vocabulary.json)
+CONDICIONES = leer_condiciones()
+
+# Facilidades con frecuencia menor o igual a este umbral se descartan
+FRECUENCIA_MINIMA_FACILIDADES = 0.01
+
+# Expresión para extraer los elementos de una lista serializada ("['Piscina', 'Gimnasio']")
+PATRON_ELEMENTOS = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+
+
+def limpiar_area(serie):
+    """
+    Convierte las áreas de la API ("80 m2") a número. Los valores no numéricos quedan como NaN.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    es_texto = serie.map(type).eq(str)
+    texto = serie.where(es_texto).str.replace(" m2", "", regex=False).str.strip()
+    numeros = pd.to_numeric(texto, errors='coerce')
+    return numeros.where(es_texto, pd.to_numeric(serie.where(~es_texto), errors='coerce'))
+
+
+def normalizar_texto(serie):
+    """
+    Convierte el texto a minúsculas, sin tildes y sin signos de puntuación.
+    """
+    return (serie.fillna('').astype(str).str.lower()
+            .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('utf-8')
+            .str.replace(r'[^\w\s]', '', regex=True))
+
+
+def primer_digito_si_mayor_a_100(serie):
+    # Reemplazar en piso si es mayor a 100 tomar el primer numero (401 y 503 por 4, 5)
+    mayor = serie > 100
+    digitos = np.floor(np.log10(serie.where(mayor, 1)))
+    return serie.where(~mayor, serie // 10 ** digitos)
+
+
+def separar_facilidades(serie):
+    """
+    Convierte la columna de facilidades (listas o listas serializadas como texto) en una serie larga
+    con un elemento por fila, indexada por la fila original.
+    """
+    es_lista = serie.map(type).eq(list)
+    listas = serie[es_lista].explode().dropna()
+    texto = serie[~es_lista & serie.notna()].astype(str)
+    extraidos = texto.str.extractall(PATRON_ELEMENTOS)
+    extraidos = extraidos[0].fillna(extraidos[1]).droplevel('match')
+    return pd.concat([listas.astype(str), extraidos])
+
+
+def agrupar_facilidades(serie):
+    """
+    Genera una columna binaria por cada categoría de `CATEGORIAS_FACILIDADES` (1 si al menos una
+    facilidad de la categoría está presente). La normalización con unidecode se aplica solo sobre
+    los valores distintos.
+    """
+    elementos = separar_facilidades(serie)
+    categorias_por_elemento = {}
+    for categoria, items in CATEGORIAS_FACILIDADES.items():
+        for item in items:
+            categorias_por_elemento.setdefault(unidecode.unidecode(item.lower()), []).append(categoria)
+
+    nombres = list(CATEGORIAS_FACILIDADES)
+    posicion_categoria = {categoria: i for i, categoria in enumerate(nombres)}
+    unicos = pd.Series(elementos.unique())
+    normalizados = unicos.map(lambda item: unidecode.unidecode(item.lower()))
+    categorias = dict(zip(unicos, normalizados.map(categorias_por_elemento)))
+    categorias = elementos.map(categorias).dropna().explode()
+
+    # Matriz de banderas llenada por índice: fila de la propiedad y columna de la categoría
+    banderas = np.zeros((len(serie), len(nombres)), dtype=np.uint8)
+    filas = serie.index.get_indexer(categorias.index)
+    columnas = categorias.map(posicion_categoria).to_numpy(dtype=np.intp)
+    banderas[filas, columnas] = 1
+    return pd.DataFrame(banderas, index=serie.index, columns=nombres)
+
+
+def detectar_caracteristicas(descripcion_normalizada, detector=None):
+    """
+    Marca en la descripción normalizada los sinónimos y las condiciones del vocabulario
+    (keyword_vocabulary.json) con una sola pasada por descripción.
+    """
+    detector = detector or DetectorPalabrasClave()
+    banderas = detector.banderas(descripcion_normalizada)
+    return pd.DataFrame(banderas, index=descripcion_normalizada.index, columns=detector.categorias)
+
+
+def calcular_sentimiento(descripcion_normalizada):
+    # TextBlob (y NLTK) tardan segundos en importarse, por eso se importan solo aquí
+    from textblob import TextBlob
+
+    # TextBlob se evalúa una sola vez por cada descripción distinta
+    unicas = descripcion_normalizada.drop_duplicates()
+    polaridad = dict(zip(unicas, (TextBlob(texto).sentiment.polarity for texto in unicas)))
+    return descripcion_normalizada.map(polaridad)
+
+
+def limpiar_bloque(df, fecha_referencia=None):
+    """
+    Aplica a un bloque del CSV crudo todos los pasos de limpieza que dependen solo de cada fila.
+
+    Parámetros:
+    - df (pd.DataFrame): Bloque de `propiedades_fincaraiz_completas.csv`.
+    - fecha_referencia (datetime): Fecha para `dias_desde_actualizado`. Por defecto la fecha actual.
+
+    Retorna:
+    - pd.DataFrame: Bloque limpio, sin las columnas de texto y con las banderas de facilidades y
+      descripción. Falta aplicar `finalizar_limpieza` sobre todos los bloques unidos.
+    """
+    fecha_referencia = fecha_referencia or datetime.now()
+
+    with medir('limpieza', paso='filtros'):
+        # Eliminar donde departamento es diferente de antioquia y precios mayores a 50 millones
+        df = df[(df['departamento'] == 'Antioquia') & (df['precio'] <= 50000000)].copy()
+
+        # Si estrato es 100 es campestre se reemplaza por 3, si es 110 ('sin definir') o 0 por np.nan
+        df['estrato'] = df['estrato'].replace({100: 3, 110: np.nan, 0: np.nan})
+        df['antigüedad'] = df['antigüedad'].fillna('No disponible')
+
+        df = df.drop(columns=COLUMNAS_DESCARTADAS, errors='ignore')
+        df = df.dropna(subset=['precio'])
+
+    with medir('limpieza', paso='areas'):
+        # Áreas a numérico; la privada toma la construida si falta
+        df['area_construida_m2'] = limpiar_area(df['area_construida_m2'])
+        df['area_privada_m2'] = limpiar_area(df['area_privada_m2'])
+        df = df.dropna(subset=['area_construida_m2'])
+        df['area_privada_m2'] = df['area_privada_m2'].fillna(df['area_construida_m2'])
+
+        # Para habitaciones de mas de 5 el area debe ser mayor a habitaciones*10, precio mínimo 500 mil
+        # y áreas de al menos 9 m2
+        df = df[~((df['habitaciones'] > 5) & (df['area_construida_m2'] < df['habitaciones'] * 10))
+                & (df['precio'] >= 500000)
+                & (df['area_construida_m2'] >= 9)
+                & (df['area_privada_m2'] >= 9)].copy()
+
+        # Baños y habitaciones en cero son faltantes
+        df['baños'] = df['baños'].replace(0, np.nan)
+        df['habitaciones'] = df['habitaciones'].replace(0, np.nan)
+
+        # El área construida es al menos la privada; la privada es al menos la mitad de la construida
+        construida = np.maximum(df['area_construida_m2'], df['area_privada_m2'])
+        privada = df['area_privada_m2']
+        df['area_construida_m2'] = construida
+        df['area_privada_m2'] = privada.where(privada >= construida / 2, construida)
+
+    with medir('limpieza', paso='pisos_parqueaderos'):
+        # Pisos: si el edificio no tiene pisos se toma el piso de ubicación (o 1), y la ubicación no
+        # puede superar los pisos del edificio. Como en el notebook, piso_ubicacion en 0 se conserva.
+        pisos, piso = df['pisos_edificio'], df['piso_ubicacion']
+        pisos = pisos.mask((pisos == 0) & (piso > 0), piso)
+        pisos = pisos.mask((pisos == 0) & (piso == 0), 1)
+        piso = piso.mask(piso > pisos, pisos)
+        df['piso_ubicacion'] = primer_digito_si_mayor_a_100(piso)
+        df['pisos_edificio'] = primer_digito_si_mayor_a_100(pisos)
+
+        # Parqueaderos: apartamentos de menos de 5 millones con 5 o más quedan en 2; más de 5 quedan en 6
+        parqueaderos = df['parqueaderos']
+        parqueaderos = parqueaderos.mask((df['precio'] < 5000000) & (parqueaderos >= 5) & (df['tipo_de_inmueble'] == 'Apartamento'), 2)
+        df['parqueaderos'] = parqueaderos.mask((df['precio'] >= 5000000) & (parqueaderos > 5), 6)
+
+        df['estado'] = df['estado'].fillna('Estandar')
+
+    with medir('limpieza', paso='fechas'):
+        # Días desde la última actualización
+        fecha_actualizacion = pd.to_datetime(df['fecha_actualizacion'], errors='coerce')
+        df['dias_desde_actualizado'] = (fecha_referencia - fecha_actualizacion).dt.days
+        df = df.drop(columns=['fecha_publicacion', 'fecha_actualizacion'])
+
+        df['gastos_comunes'] = df['gastos_comunes'].fillna(0)
+
+    with medir('limpieza', paso='facilidades'):
+        # Facilidades agrupadas en categorías
+        df['facilidades'] = df['facilidades'].fillna('No disponible')
+        df = df.join(agrupar_facilidades(df['facilidades']))
+
+    with medir('limpieza', paso='descripcion'):
+        # Banderas y sentimiento a partir de la descripción
+        descripcion = normalizar_texto(df['descripcion'])
+        banderas = detectar_caracteristicas(descripcion)
+        df['sentimiento'] = calcular_sentimiento(descripcion)
+        df = df.drop(columns=['descripcion'])
+
+        df['Seguridad'] = np.maximum(df['Seguridad'], banderas['Seguridad 2'])
+        df['Transporte'] = np.maximum(df['Transporte'], banderas['Transporte 2'])
+        df['Vista Panorámica'] = np.maximum(df['Vista Panorámica'], banderas['Vista Panorámica 2'])
+        df['Exclusividad'] = np.maximum(df['Exclusividad y Lujo'], banderas['Exclusividad 2'])
+        df['Confortabilidad'] = np.maximum(df['Confortabilidad'], banderas['Confortabilidad 2'])
+        df['amenidades'] = banderas[CONDICIONES].max(axis=1)
+    return df
+
+
+def imputar_habitaciones_banos_estrato(df, columnas_estrato=None, ruta_imputador=None):
+    """
+    Imputa `habitaciones`, `baños` y `estrato` con 5 vecinos (`ImputadorKNN`, con índices KD-tree).
+
+    Parámetros:
+    - df (pd.DataFrame): Datos a imputar.
+    - columnas_estrato (list[str]): Si se indica (p. ej. ['ciudad', 'tipo_de_inmueble']), los vecinos
+      se buscan dentro de cada partición.
+    - ruta_imputador (str): Si se indica, se guarda el imputador ajustado para aplicarlo a
+      propiedades nuevas con `imputation.aplicar_imputador`.
+    """
+    imputador = ImputadorKNN(COLUMNAS_IMPUTADAS, n_neighbors=5, columnas_estrato=columnas_estrato).fit(df)
+    if ruta_imputador:
+        guardar_imputador(imputador, ruta_imputador)
+    df[COLUMNAS_IMPUTADAS] = np.floor(imputador.transform(df)).astype(int)
+    return df
+
+
+def normalizar_nombres_columnas(columnas):
+    """
+    Nombres en minúsculas, sin tildes y con '_' en lugar de caracteres no alfanuméricos. Los nombres
+    repetidos ('banos' de la columna y de la categoría de facilidades) reciben el sufijo '.1' como al
+    leer el Excel del notebook.
+    """
+    nombres = [re.sub(r'\W+', '_', unidecode.unidecode(columna.strip().lower())) for columna in columnas]
+    vistos = {}
+    unicos = []
+    for nombre in nombres:
+        unicos.append(f'{nombre}.{vistos[nombre]}' if nombre in vistos else nombre)
+        vistos[nombre] = vistos.get(nombre, 0) + 1
+    return unicos
+
+
+def finalizar_limpieza(df, columnas_estrato=None, ruta_imputador=None):
+    """
+    Pasos de limpieza que necesitan todas las filas: casi duplicados, imputación KNN, filtro de
+    ciudades, selección de facilidades por frecuencia, nombres de columnas, nulos y duplicados.
+
+    Parámetros:
+    - df (pd.DataFrame): Bloques de `limpiar_bloque` unidos. Si tienen la columna `grupo_duplicado`
+      (ver `marcar_duplicados`) se conserva solo la primera fila de cada grupo.
+    - columnas_estrato, ruta_imputador: Ver `imputar_habitaciones_banos_estrato`.
+
+    Retorna:
+    - pd.DataFrame: Datos con las columnas de `data_arriendos_model.xlsx`.
+    """
+    if 'grupo_duplicado' in df.columns:
+        with medir('limpieza', paso='duplicados_aproximados'):
+            df = df.drop_duplicates(subset='grupo_duplicado').drop(columns='grupo_duplicado')
+
+    with medir('limpieza', paso='imputacion'):
+        df = imputar_habitaciones_banos_estrato(df, columnas_estrato, ruta_imputador)
+
+    with medir('limpieza', paso='seleccion_columnas'):
+        # Filtramos si la ciudad esta en ciudades definidas
+        df = df[df['ciudad'].isin(CIUDADES)]
+
+        # Facilidades que aparecen en más del 1% de los registros
+        categorias = list(CATEGORIAS_FACILIDADES)
+        frecuencia = df[categorias].mean()
+        facilidades_filtradas = frecuencia[frecuencia > FRECUENCIA_MINIMA_FACILIDADES].index.tolist()
+        df = df[[columna for columna in df.columns if columna not in categorias + ['facilidades']] + facilidades_filtradas]
+
+        df.columns = normalizar_nombres_columnas(df.columns)
+
+    with medir('limpieza', paso='nulos_duplicados'):
+        #Eliminar nulos y duplicados
+        df = df.dropna()
+        df = df.drop_duplicates()
+    return df
+
+
+def leer_bloques(ruta, tamano_bloque):
+    if str(ruta).endswith('.parquet'):
+        from .columnar import iterar_lotes_parquet
+        return iterar_lotes_parquet(ruta, filas_por_lote=tamano_bloque)
+    return pd.read_csv(ruta, sep=';', encoding='utf-8-sig', chunksize=tamano_bloque)
+
+
+def marcar_duplicados(df, conexion):
+    """
+    Agrega al bloque crudo la columna `grupo_duplicado` con el grupo de anuncios casi duplicados de
+    cada fila (ver `dedup.agrupar_duplicados`). Los grupos se comparten entre los bloques que usan
+    la misma conexión.
+    """
+    df = df.copy()
+    df['grupo_duplicado'] = agrupar_duplicados(conexion, df, columna_area='area_construida_m2')
+    return df
+
+
+def limpiar_datos(df, fecha_referencia=None, deduplicar=True, **kwargs):
+    """
+    Limpia en memoria un DataFrame con el formato de `propiedades_fincaraiz_completas.csv`.
+    Con `deduplicar` se descartan los anuncios casi duplicados. Los argumentos adicionales se pasan
+    a `finalizar_limpieza`.
+    """
+    if deduplicar:
+        df = marcar_duplicados(df, sqlite3.connect(':memory:'))
+    return finalizar_limpieza(limpiar_bloque(df, fecha_referencia), **kwargs)
+
+
+def limpiar_archivo(ruta_entrada, ruta_salida=None, tamano_bloque=50_000, fecha_referencia=None, n_procesos=1,
+                    columnas_estrato=None, ruta_imputador=None, deduplicar=True):
+    """
+    Limpia el archivo crudo por bloques para acotar la memoria.
+
+    Cada bloque pasa por `limpiar_bloque`, que descarta las columnas de texto, así que solo se
+    acumulan las columnas numéricas y categóricas antes de `finalizar_limpieza`. Con `deduplicar`,
+    cada bloque se marca antes con `marcar_duplicados` en el proceso principal (el índice de
+    duplicados se comparte entre bloques) y al final se conserva un anuncio por grupo.
+
+    Parámetros:
+    - ruta_entrada (str): `propiedades_fincaraiz_completas.csv` (separado por ';') o su versión Parquet.
+    - ruta_salida (str): Si se indica, se guarda el resultado (.xlsx, .csv o .parquet).
+    - tamano_bloque (int): Filas leídas por bloque.
+    - fecha_referencia (datetime): Fecha para `dias_desde_actualizado`. Por defecto la fecha actual.
+    - n_procesos (int): Procesos para limpiar bloques en paralelo (el sentimiento con TextBlob se
+      calcula fila a fila y es el paso más costoso de cada bloque).
+    - columnas_estrato, ruta_imputador: Ver `imputar_habitaciones_banos_estrato`.
+    - deduplicar (bool): Si es True se descartan los anuncios casi duplicados.
+
+    Retorna:
+    - pd.DataFrame: Datos con las columnas de `data_arriendos_model.xlsx`.
+    """
+    fecha_referencia = fecha_referencia or datetime.now()
+    bloques = leer_bloques(ruta_entrada, tamano_bloque)
+    if deduplicar:
+        conexion = sqlite3.connect(':memory:')
+        bloques = (marcar_duplicados(bloque, conexion) for bloque in bloques)
+    if n_procesos > 1:
+        limpios = []
+        with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+            # Solo se leen por adelantado unos pocos bloques para no cargar todo el archivo
+            pendientes = deque()
+            for bloque in bloques:
+                pendientes.append(pool.submit(limpiar_bloque, bloque, fecha_referencia))
+                if len(pendientes) >= 2 * n_procesos:
+                    limpios.append(pendientes.popleft().result())
+            limpios.extend(futuro.result() for futuro in pendientes)
+    else:
+        limpios = [limpiar_bloque(bloque, fecha_referencia) for bloque in bloques]
+    df = finalizar_limpieza(pd.concat(limpios, ignore_index=True), columnas_estrato, ruta_imputador)
+
+    if ruta_salida:
+        ruta_salida = str(ruta_salida)
+        if ruta_salida.endswith('.parquet'):
+            df.to_parquet(ruta_salida, index=False)
+        elif ruta_salida.endswith('.csv'):
+            df.to_csv(ruta_salida, index=False)
+        else:
+            df.to_excel(ruta_salida, index=False)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Limpia los datos crudos y genera el conjunto del modelo')
+    parser.add_argument('--entrada', default=str(DIR_DATOS_CRUDOS / 'propiedades_fincaraiz_completas.csv'),
+                        help='CSV crudo (separado por ;) o su versión Parquet')
+    parser.add_argument('--salida', default=str(DIR_DATOS_PROCESADOS / 'data_arriendos_model.xlsx'),
+                        help='Archivo de salida (.xlsx, .csv o .parquet)')
+    parser.add_argument('--imputador', default=str(DIR_DATOS_PROCESADOS / 'imputador_knn.joblib'),
+                        help='Dónde guardar el imputador KNN ajustado')
+    parser.add_argument('--tamano-bloque', type=int, default=50_000, help='Filas leídas por bloque')
+    parser.add_argument('--procesos', type=int, default=1, help='Procesos para limpiar bloques en paralelo')
+    parser.add_argument('--sin-deduplicar', action='store_true', help='Conservar los anuncios casi duplicados')
+    args = parser.parse_args(argv)
+
+    df = limpiar_archivo(args.entrada, args.salida, tamano_bloque=args.tamano_bloque, n_procesos=args.procesos,
+                         ruta_imputador=args.imputador, deduplicar=not args.sin_deduplicar)
+    print(f"{len(df)} propiedades limpias guardadas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Rutas del proyecto, resueltas desde la raíz del repositorio para que los comandos funcionen desde
+cualquier directorio.
+"""
+from pathlib import Path
+
+RAIZ_PROYECTO = Path(__file__).resolve().parents[1]
+DIR_DATOS_CRUDOS = RAIZ_PROYECTO / 'data' / 'raw'
+DIR_DATOS_PROCESADOS = RAIZ_PROYECTO / 'data' / 'processed'
+DIR_FIGURAS = RAIZ_PROYECTO / 'reports' / 'figures'
+DIR_ARTEFACTOS = RAIZ_PROYECTO / 'artifacts'
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Raíz del repositorio en el path para importar `src` también al ejecutar `pytest` sin `python -m`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,229 @@
+"""
+Pruebas del recorrido concurrente de páginas contra un servidor HTTP local que imita la API de
+búsqueda: páginas por ciudad, respuestas 429/5xx inyectadas y latencias que desordenan las respuestas.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.data_collection import (crear_sesion, iterar_detalles_concurrente, iterar_paginas_concurrente,
+                                 obtener_todas_las_propiedades)
+
+# Páginas con resultados por ciudad; la siguiente llega vacía
+PAGINAS = {"Medellín": 6, "Sabaneta": 3}
+
+
+class ServidorFalso:
+    """
+    Servidor de la API de búsqueda con fallas programables por (ciudad, página).
+
+    - fallas: {(ciudad, página): [respuestas]} con respuestas `(estado, encabezados)` que se
+      devuelven en orden antes de la respuesta correcta.
+    - demoras: {(ciudad, página): segundos} antes de responder.
+    - cuerpos: {(ciudad, página) o id: cuerpo} que reemplaza la respuesta correcta (bytes o JSON).
+    - detalles: {id: ficha técnica} de las consultas de detalle por id.
+    """
+
+    def __init__(self, fallas=None, demoras=None, demora_base=0.02, cuerpos=None, detalles=None):
+        self.fallas = {llave: list(respuestas) for llave, respuestas in (fallas or {}).items()}
+        self.cuerpos = cuerpos or {}
+        self.detalles = detalles or {}
+        self.demoras = demoras or {}
+        self.demora_base = demora_base
+        self.solicitudes = []
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.candado = threading.Lock()
+
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                params = cuerpo["variables"]["params"]
+                llave = (params["locations"][0]["name"], params["page"]) if "locations" in params else params["id"]
+                with servidor.candado:
+                    servidor.solicitudes.append((llave, time.perf_counter()))
+                    servidor.en_vuelo += 1
+                    servidor.max_en_vuelo = max(servidor.max_en_vuelo, servidor.en_vuelo)
+                    falla = servidor.fallas[llave].pop(0) if servidor.fallas.get(llave) else None
+                try:
+                    time.sleep(servidor.demoras.get(llave, servidor.demora_base))
+                    if falla is not None:
+                        estado, encabezados = falla
+                        self.send_response(estado)
+                        for nombre, valor in encabezados.items():
+                            self.send_header(nombre, valor)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    if llave in servidor.cuerpos:
+                        datos = servidor.cuerpos[llave]
+                    elif isinstance(llave, tuple):
+                        datos = respuesta_pagina(*llave)
+                    else:
+                        datos = respuesta_detalle(llave, servidor.detalles[llave])
+                    datos = datos if isinstance(datos, bytes) else json.dumps(datos).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(datos)))
+                    self.end_headers()
+                    self.wfile.write(datos)
+                finally:
+                    with servidor.candado:
+                        servidor.en_vuelo -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.http.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.http.server_address[1]}/api/v1/properties/search"
+
+    def __enter__(self):
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.http.shutdown()
+        self.http.server_close()
+
+    def contar(self, llave):
+        return sum(1 for solicitud, _ in self.solicitudes if solicitud == llave)
+
+    def tiempos(self, llave):
+        return [momento for solicitud, momento in self.solicitudes if solicitud == llave]
+
+
+def respuesta_pagina(ciudad, pagina):
+    # Dos inmuebles por página hasta PAGINAS[ciudad]; después una página vacía
+    if pagina > PAGINAS[ciudad]:
+        return {"hits": {"hits": []}}
+    return {"hits": {"hits": [
+        {"_source": {"listing": {"id": f"{ciudad}-{pagina}-{i}", "locations": {}}}} for i in range(2)
+    ]}}
+
+
+def respuesta_detalle(id, ficha_tecnica):
+    listing = {"id": id, "locations": {}, "technicalSheet": [{"value": valor} for valor in ficha_tecnica]}
+    return {"hits": {"hits": [{"_source": {"listing": listing}}]}}
+
+
+def recorrer(servidor, **kwargs):
+    kwargs.setdefault("sesion", crear_sesion(max_conexiones=8, factor_espera=0.01))
+    return list(iterar_paginas_concurrente(url=servidor.url, ciudades=list(PAGINAS), **kwargs))
+
+
+def test_paginas_en_orden_por_ciudad():
+    # Las primeras páginas son las más lentas, así que las siguientes terminan antes
+    demoras = {("Medellín", 1): 0.3, ("Medellín", 2): 0.2, ("Sabaneta", 1): 0.25}
+    with ServidorFalso(demoras=demoras) as servidor:
+        paginas = recorrer(servidor, paginas_en_vuelo=4)
+
+    for ciudad, total in PAGINAS.items():
+        entregadas = [pagina for nombre, pagina, _ in paginas if nombre == ciudad]
+        assert entregadas == list(range(1, total + 1))
+        ids = [propiedad["id"] for nombre, _, propiedades in paginas if nombre == ciudad for propiedad in propiedades]
+        assert ids == [f"{ciudad}-{pagina}-{i}" for pagina in range(1, total + 1) for i in range(2)]
+
+
+@pytest.mark.parametrize("estado", [500, 502, 503])
+def test_reintenta_errores_del_servidor(estado):
+    fallas = {("Medellín", 2): [(estado, {}), (estado, {})]}
+    with ServidorFalso(fallas=fallas) as servidor:
+        paginas = recorrer(servidor)
+
+    assert servidor.contar(("Medellín", 2)) == 3
+    assert [pagina for ciudad, pagina, _ in paginas if ciudad == "Medellín"] == list(range(1, PAGINAS["Medellín"] + 1))
+
+
+def test_respeta_retry_after():
+    fallas = {("Sabaneta", 1): [(429, {"Retry-After": "1"})]}
+    with ServidorFalso(fallas=fallas) as servidor:
+        paginas = recorrer(servidor)
+
+    primero, segundo = servidor.tiempos(("Sabaneta", 1))
+    # La espera de Retry-After (1 s) domina sobre la espera exponencial de la sesión (0.01 s)
+    assert segundo - primero >= 0.9
+    assert [pagina for ciudad, pagina, _ in paginas if ciudad == "Sabaneta"] == list(range(1, PAGINAS["Sabaneta"] + 1))
+
+
+def test_pagina_fallida_detiene_la_ciudad(capsys):
+    # Con los reintentos agotados no se entregan las páginas siguientes y la falla queda reportada
+    fallas = {("Medellín", 3): [(503, {})] * 10}
+    estadisticas = {}
+    with ServidorFalso(fallas=fallas) as servidor:
+        paginas = recorrer(servidor, sesion=crear_sesion(max_conexiones=8, reintentos=1, factor_espera=0.01),
+                           estadisticas=estadisticas)
+
+    assert [pagina for ciudad, pagina, _ in paginas if ciudad == "Medellín"] == [1, 2]
+    assert [pagina for ciudad, pagina, _ in paginas if ciudad == "Sabaneta"] == list(range(1, PAGINAS["Sabaneta"] + 1))
+    assert estadisticas["paginas_fallidas"] == [("Medellín", 3)]
+    assert estadisticas["ciudades_fallidas"] == ["Medellín"]
+    assert estadisticas["ciudades_completas"] == ["Sabaneta"]
+    assert "Se detiene Medellín en la página 3" in capsys.readouterr().out
+
+
+def test_ciudades_completas_sin_fallas():
+    estadisticas = {}
+    with ServidorFalso() as servidor:
+        recorrer(servidor, estadisticas=estadisticas)
+
+    assert estadisticas["paginas"] == sum(PAGINAS.values())
+    assert estadisticas["ciudades_completas"] == list(PAGINAS)
+    assert estadisticas["paginas_fallidas"] == estadisticas["ciudades_fallidas"] == []
+
+
+def test_max_paginas_no_cuenta_como_recorrido_completo():
+    estadisticas = {}
+    with ServidorFalso() as servidor:
+        recorrer(servidor, max_paginas=2, estadisticas=estadisticas)
+
+    assert estadisticas["ciudades_truncadas"] == list(PAGINAS)
+    assert estadisticas["ciudades_completas"] == []
+
+
+@pytest.mark.parametrize("max_por_host", [1, 3])
+def test_limite_de_solicitudes_por_host(max_por_host):
+    with ServidorFalso(demora_base=0.05) as servidor:
+        recorrer(servidor, max_hilos=16, max_por_host=max_por_host, paginas_en_vuelo=4)
+
+    assert servidor.max_en_vuelo == max_por_host
+
+
+def test_pagina_mal_formada_cuenta_como_fallida():
+    cuerpos = {("Sabaneta", 2): b"{no es json", ("Medellín", 4): {"hits": None}}
+    estadisticas = {}
+    with ServidorFalso(cuerpos=cuerpos) as servidor:
+        paginas = recorrer(servidor, estadisticas=estadisticas)
+
+    assert [pagina for ciudad, pagina, _ in paginas if ciudad == "Medellín"] == [1, 2, 3]
+    assert [pagina for ciudad, pagina, _ in paginas if ciudad == "Sabaneta"] == [1]
+    assert sorted(estadisticas["paginas_fallidas"]) == [("Medellín", 4), ("Sabaneta", 2)]
+
+
+def test_detalle_mal_formado_no_detiene_la_descarga():
+    ficha = ["", "Apartamento", "Usado", "", "80", "75", "1 a 8 años"]
+    detalles = {"a": ficha, "corta": ficha[:3], "b": ficha}
+    estadisticas = {}
+    with ServidorFalso(detalles=detalles, cuerpos={"roto": b"<html>"}) as servidor:
+        registros = list(iterar_detalles_concurrente(["a", "corta", "roto", "b"], url=servidor.url, max_hilos=2,
+                                                     estadisticas=estadisticas))
+
+    assert sorted(registro["id"] for registro in registros) == ["a", "b"]
+    assert sorted(estadisticas["ids_fallidos"]) == ["corta", "roto"]
+
+
+def test_recorrido_secuencial_una_solicitud_a_la_vez():
+    estadisticas = {}
+    with ServidorFalso() as servidor:
+        propiedades = obtener_todas_las_propiedades(url=servidor.url, ciudades=list(PAGINAS),
+                                                    estadisticas=estadisticas)
+
+    assert servidor.max_en_vuelo == 1
+    assert [propiedad["id"] for propiedad in propiedades] == [
+        f"{ciudad}-{pagina}-{i}" for ciudad, total in PAGINAS.items() for pagina in range(1, total + 1) for i in range(2)]
+    assert estadisticas["ciudades_completas"] == list(PAGINAS)
@@ -0,0 +1,75 @@
+"""
+Pruebas de la actualización incremental del almacén con un recorrido simulado de la API.
+"""
+import pytest
+
+from src import listing_store
+from src.listing_store import (ESTADO_ACTIVO, ESTADO_DESLISTADO, abrir_almacen, actualizar_incremental,
+                               guardar_detalles, leer_propiedades)
+
+FECHA = "2024-05-01T00:00:00"
+
+# Anuncios guardados de una ejecución anterior
+ALMACEN = {
+    "Medellín": ["m1", "m2", "m3"],
+    "Sabaneta": ["s1", "s2"],
+}
+
+
+def detalle(id, ciudad):
+    return {"id": id, "ciudad": ciudad, "titulo": f"Anuncio {id}", "fecha_actualizacion": FECHA}
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    ruta = tmp_path / "propiedades.sqlite"
+    conexion = abrir_almacen(ruta)
+    guardar_detalles(conexion, [detalle(id, ciudad) for ciudad, ids in ALMACEN.items() for id in ids], FECHA)
+    conexion.close()
+    return ruta
+
+
+def simular_recorrido(monkeypatch, vigentes, fallidas=()):
+    """
+    Reemplaza el recorrido de la API: `vigentes` son los ids que aparecen en el resumen por ciudad y
+    las ciudades de `fallidas` se detienen en una página fallida.
+    """
+    def recorrido(url, estadisticas):
+        estadisticas.update({
+            "paginas_fallidas": [(ciudad, 1) for ciudad in fallidas],
+            "ciudades_completas": [ciudad for ciudad in ALMACEN if ciudad not in fallidas],
+            "ciudades_fallidas": list(fallidas),
+            "ciudades_truncadas": [],
+        })
+        return [{"id": id, "fecha_actualizacion": FECHA} for ciudad in ALMACEN
+                if ciudad not in fallidas for id in vigentes[ciudad]]
+
+    monkeypatch.setattr(listing_store, "obtener_todas_las_propiedades_concurrente", recorrido)
+    monkeypatch.setattr(listing_store, "extraer_todas_propiedades_concurrente",
+                        lambda ids, **kwargs: ([], {"fallidos": 0}))
+
+
+def estados(ruta):
+    conexion = abrir_almacen(ruta)
+    propiedades = leer_propiedades(conexion, incluir_deslistados=True)
+    conexion.close()
+    return dict(zip(propiedades["id"], propiedades["estado_listado"]))
+
+
+def test_deslista_los_anuncios_ausentes_de_un_recorrido_completo(almacen, monkeypatch):
+    simular_recorrido(monkeypatch, {"Medellín": ["m1", "m2"], "Sabaneta": ["s1", "s2"]})
+
+    resultado = actualizar_incremental(almacen)
+
+    assert resultado["deslistados"] == 1
+    assert estados(almacen)["m3"] == ESTADO_DESLISTADO
+
+
+def test_ciudad_fallida_no_deslista_sus_anuncios(almacen, monkeypatch):
+    simular_recorrido(monkeypatch, {"Medellín": ["m1", "m2", "m3"]}, fallidas=["Sabaneta"])
+
+    resultado = actualizar_incremental(almacen)
+
+    assert resultado["deslistados"] == 0
+    assert resultado["ciudades_incompletas"] == ["Sabaneta"]
+    assert all(estados(almacen)[id] == ESTADO_ACTIVO for id in ALMACEN["Sabaneta"])
@@ -0,0 +1,109 @@
+"""
+Pruebas de equivalencia numérica de los modelos con datos sintéticos pequeños.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.dataset import CATEGORICAL_FEATURES, TARGET, build_preprocessor
+
+
+def datos_modelo(n, semilla, ciudades=("Medellín", "Envigado", "Sabaneta")):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        'area': rng.uniform(30, 200, n),
+        'habitaciones': rng.integers(1, 5, n).astype(float),
+        'banos': rng.integers(1, 4, n).astype(float),
+        'estrato': rng.integers(1, 7, n).astype(float),
+        'ciudad': rng.choice(ciudades, n),
+        'antiguedad': rng.choice(['Menos de 1 año', '1 a 8 años', '9 a 15 años'], n),
+        'comuna': rng.choice([f'Comuna {i}' for i in range(1, 6)], n),
+        'zona': rng.choice(['Norte', 'Sur', 'Centro'], n),
+        'tipo_de_inmueble': rng.choice(['Apartamento', 'Casa'], n),
+        'estado': rng.choice(['Usado', 'Nuevo'], n),
+    })
+    df[TARGET] = (14 + 0.006 * df['area'] + 0.1 * df['estrato'] + 0.2 * (df['ciudad'] == 'Envigado')
+                  + rng.normal(0, 0.1, n))
+    return df
+
+
+def test_regresion_incremental_igual_al_ajuste_en_lote():
+    from sklearn.linear_model import LinearRegression
+    from sklearn.pipeline import Pipeline
+
+    from src.models.incremental_linear import IncrementalLinearRegression
+
+    # 'Bello' aparece por primera vez en el último bloque
+    bloques = [datos_modelo(200, 1), datos_modelo(200, 2), datos_modelo(200, 3, ciudades=("Medellín", "Bello"))]
+    completo = pd.concat(bloques, ignore_index=True)
+    X, y = completo.drop(columns=[TARGET]), completo[TARGET].to_numpy()
+
+    incremental = IncrementalLinearRegression().fit(
+        (bloque.drop(columns=[TARGET]), bloque[TARGET].to_numpy()) for bloque in bloques)
+    lote = Pipeline([('preprocessor', build_preprocessor(completo)), ('regressor', LinearRegression())]).fit(X, y)
+
+    np.testing.assert_allclose(incremental.predict(X), lote.predict(X), rtol=0, atol=1e-9)
+
+    # 'Caldas' no se vio al ajustar: ambos modelos la ignoran
+    nuevos = datos_modelo(50, 4, ciudades=("Caldas", "Bello")).drop(columns=[TARGET])
+    np.testing.assert_allclose(incremental.predict(nuevos), lote.predict(nuevos), rtol=0, atol=1e-9)
+    assert incremental.features == X.drop(columns=CATEGORICAL_FEATURES).columns.tolist() + CATEGORICAL_FEATURES
+
+
+@pytest.mark.parametrize("weight_dtype, tolerancia", [("float32", 1e-5), ("float16", 2e-3), ("int8", 2e-2)])
+def test_red_numpy_reproduce_keras(tmp_path, weight_dtype, tolerancia):
+    pytest.importorskip("tensorflow")
+    import keras
+    from sklearn.preprocessing import StandardScaler
+
+    from src.models.nn_export import NumpyNetwork, export_neural_network
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(256, 12)).astype(np.float32)
+    y = (X[:, :3].sum(axis=1) + rng.normal(0, 0.1, 256)).reshape(-1, 1)
+    target_scaler = StandardScaler().fit(y)
+
+    # Las mismas capas que `build_neural_network`: BatchNormalization después de la activación
+    keras.utils.set_random_seed(0)
+    model = keras.Sequential([
+        keras.Input(shape=(X.shape[1],)),
+        keras.layers.Dense(32, activation='relu'),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dropout(0.2),
+        keras.layers.Dense(16, activation='leaky_relu'),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dense(8, activation='tanh'),
+        keras.layers.Dense(1, activation='linear'),
+    ])
+    model.compile(optimizer='adam', loss='mse')
+    model.fit(X, target_scaler.transform(y), epochs=3, batch_size=32, verbose=0)
+
+    red = NumpyNetwork.load(export_neural_network(model, target_scaler, tmp_path / 'red.npz', weight_dtype))
+    esperado = model.predict(X, verbose=0).ravel()
+    np.testing.assert_allclose(red.predict(X), esperado, rtol=0, atol=tolerancia * np.abs(esperado).max())
+
+
+def test_registro_mapea_los_arreglos_de_los_modelos_compartidos(tmp_path):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.pipeline import Pipeline
+
+    from src.models.compact_forest import CompactForest
+    from src.models.registry import load_artifacts, save_artifacts
+
+    df = datos_modelo(300, 1)
+    X, y = df.drop(columns=[TARGET]), df[TARGET].to_numpy()
+    preprocessor = build_preprocessor(df).fit(X)
+    X_transformed = preprocessor.transform(X)
+
+    lineal = Pipeline([('preprocessor', preprocessor), ('regressor', LinearRegression())]).fit(X, y)
+    save_artifacts('linear_regression', lineal, registry_dir=tmp_path)
+    compacto = CompactForest.from_forest(RandomForestRegressor(10, random_state=0).fit(X_transformed, y))
+    save_artifacts('random_forest_compact', compacto, registry_dir=tmp_path)
+
+    cargado = load_artifacts('linear_regression', registry_dir=tmp_path).model
+    assert isinstance(cargado.named_steps['regressor'].coef_, np.memmap)
+    cargado = load_artifacts('random_forest_compact', registry_dir=tmp_path).model
+    for arreglo in ('feature', 'threshold', 'right', 'value', 'roots', 'depths'):
+        assert isinstance(getattr(cargado, arreglo), np.memmap)
+    np.testing.assert_array_equal(cargado.predict(X_transformed), compacto.predict(X_transformed))
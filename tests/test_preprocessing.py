@@ -0,0 +1,52 @@
+"""
+Pruebas de la limpieza de datos contra el comportamiento del notebook 2_Limpieza_Datos.
+"""
+import json
+
+import pandas as pd
+
+from src.keyword_flags import RUTA_VOCABULARIO, DetectorPalabrasClave
+from src.preprocessing import detectar_caracteristicas, normalizar_texto
+
+DESCRIPCIONES = [
+    "Apartamento AMOBLADO, cerca del metro y con vigilancia 24 horas.",
+    "Hermosa vista panorámica desde el Penthouse; acabados de lujo.",
+    "Casa para estrenar en zona exclusiva, muy luminosa y de espacios amplios.",
+    "Remodelado recientemente. Estación de Policía a dos cuadras.",
+    "Apartaestudio moderno sobre la vía principal, buses en la puerta.",
+    "",
+    None,
+]
+
+
+def banderas_notebook(descripcion_normalizada):
+    # Mismas operaciones del notebook: `in` por frase para los sinónimos y `str.contains` para las condiciones
+    with open(RUTA_VOCABULARIO, encoding='utf-8') as archivo:
+        vocabulario = json.load(archivo)
+    banderas = {}
+    for categoria, palabras in vocabulario['sinonimos'].items():
+        banderas[categoria] = descripcion_normalizada.apply(
+            lambda texto: int(any(palabra in texto.lower() for palabra in palabras)))
+    for condicion in vocabulario['condiciones']:
+        banderas[condicion] = descripcion_normalizada.str.contains(condicion, case=False, na=False).astype(int)
+    return pd.DataFrame(banderas)
+
+
+def test_detector_igual_al_notebook():
+    descripcion = normalizar_texto(pd.Series(DESCRIPCIONES))
+    esperado = banderas_notebook(descripcion)
+
+    obtenido = detectar_caracteristicas(descripcion)
+
+    assert list(obtenido.columns) == list(esperado.columns)
+    pd.testing.assert_frame_equal(obtenido.astype(int), esperado, check_dtype=False)
+
+
+def test_penthouse_no_se_marca_como_en_el_notebook():
+    # La frase 'Penthouse' del vocabulario tiene mayúscula y la descripción normalizada no, así que
+    # en el notebook nunca coincide; solo 'de lujo' marca la exclusividad
+    detector = DetectorPalabrasClave()
+    columna = detector.categorias.index('Exclusividad 2')
+    textos = normalizar_texto(pd.Series(["penthouse con terraza", "penthouse de lujo"])).tolist()
+
+    assert detector.banderas(textos)[:, columna].tolist() == [0, 1]